@@ -0,0 +1,41 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
+
+from app import state
+from app.auth import get_current_user
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(get_current_user)], tags=["Administração"])
+
+
+def _get_manager():
+    if state.MODEL_MANAGER is None:
+        raise HTTPException(status_code=503, detail="Registro de modelos não inicializado")
+    return state.MODEL_MANAGER
+
+@router.get("/models",
+    summary="Versões do Modelo",
+    description="Lista as versões publicadas no registro e indica a versão em uso."
+)
+def list_models():
+    return _get_manager().status()
+
+@router.post("/models/reload",
+    status_code=202,
+    summary="Trocar Versão do Modelo",
+    description="Carrega, valida e ativa uma versão do registro em background, sem interromper as predições."
+)
+def reload_model(version: Optional[str] = None):
+    """
+    Dispara a troca do modelo em uso.
+
+    A API continua respondendo com o modelo atual até a nova versão ser carregada, aquecida e
+    validada. Acompanhe o resultado em `GET /admin/models` (`active_version` / `last_error`).
+    Args:
+        version (str, optional): Versão desejada. Padrão: a mais recente do registro.
+    """
+    manager = _get_manager()
+    try:
+        target = manager.reload_in_background(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": "Troca de modelo iniciada", "target_version": target, "active_version": state.MODEL_VERSION}
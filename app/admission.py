@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from prometheus_client import Counter, Gauge, Histogram
+
+# Máximo de predições processadas ao mesmo tempo por processo (0 desativa o controle de admissão)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", 0))
+# Requisições que podem aguardar uma vaga; acima disso, a resposta é 429 imediata
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 64))
+# Espera máxima na fila antes de desistir com 503 (ms)
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 500))
+# Valor do header Retry-After (segundos) nas rejeições
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+# Rotas sujeitas ao controle (separadas por vírgula)
+ADMISSION_PATHS = tuple(p.strip() for p in os.getenv("ADMISSION_PATHS", "/predict,/predict/batch,/predict/batch/columnar").split(",") if p.strip())
+
+# --- Métricas Prometheus ---
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Predições em processamento (vagas ocupadas)")
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Requisições aguardando uma vaga")
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requisições rejeitadas pelo controle de admissão",
+    ["reason"]
+)
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds", "Tempo de espera por uma vaga (requisições admitidas)",
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada por sobrecarga (`reason`: 'queue_full' ou 'timeout')."""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Limita a concorrência das predições e o tamanho da fila de espera (por processo).
+
+    Até `max_concurrency` requisições são processadas ao mesmo tempo; as seguintes aguardam em
+    uma fila FIFO de até `max_queue` posições, por no máximo `queue_timeout` segundos. Quando a
+    fila está cheia a rejeição é imediata. Assim, em uma rajada, as requisições excedentes
+    recebem uma resposta rápida em vez de se acumularem no threadpool até o timeout do cliente.
+
+    Roda no event loop (sem locks): `acquire`/`release` nunca são chamados em paralelo.
+
+    Attributes:
+        max_concurrency (int): Vagas simultâneas.
+        max_queue (int): Posições na fila de espera.
+        queue_timeout (float): Espera máxima por uma vaga, em segundos.
+    """
+    def __init__(self, max_concurrency, max_queue=64, queue_timeout=0.5):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    async def acquire(self):
+        """
+        Ocupa uma vaga, aguardando na fila se necessário.
+
+        Raises:
+            AdmissionRejected: Se a fila estiver cheia ou a espera exceder `queue_timeout`.
+        """
+        start_time = time.perf_counter()
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self._update_gauges()
+            ADMISSION_WAIT.observe(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTED.labels(reason="queue_full").inc()
+            raise AdmissionRejected("queue_full")
+
+        # A vaga é repassada diretamente pelo `release` (o future é resolvido com a vaga já ocupada)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Cliente desconectou durante a espera
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            ADMISSION_REJECTED.labels(reason="timeout").inc()
+            raise AdmissionRejected("timeout")
+        ADMISSION_WAIT.observe(time.perf_counter() - start_time)
+
+    def _abandon(self, waiter):
+        if waiter.done():
+            # A vaga chegou junto com a desistência: devolve para o próximo da fila
+            self.release()
+        else:
+            self._waiters.remove(waiter)
+            waiter.cancel()
+        self._update_gauges()
+
+    def release(self):
+        """Libera a vaga, repassando-a ao primeiro da fila (se houver)."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                self._update_gauges()
+                return
+        self.in_flight -= 1
+        self._update_gauges()
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI que aplica o `AdmissionController` às rotas de predição.
+
+    A admissão acontece antes da leitura do corpo e do envio ao threadpool. Rejeições por fila
+    cheia respondem 429 e por tempo de espera esgotado respondem 503, ambas com `Retry-After`.
+    """
+    def __init__(self, app, controller: AdmissionController, paths=ADMISSION_PATHS, retry_after=ADMISSION_RETRY_AFTER):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire()
+        except AdmissionRejected as e:
+            await self._reject(send, e.reason)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _reject(self, send, reason):
+        status_code = 429 if reason == "queue_full" else 503
+        body = json.dumps({"detail": "API sobrecarregada, tente novamente em instantes", "reason": reason}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
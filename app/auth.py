@@ -1,11 +1,17 @@
 import os
 import jwt
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from prometheus_client import Counter
+
+from app.timing import stage
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -17,6 +23,12 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 APP_USER = os.getenv("APP_USER")
 APP_PASS = os.getenv("APP_PASS")
+# Quantidade máxima de tokens já verificados mantidos em memória (0 desativa o cache)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+
+# --- Métricas Prometheus ---
+TOKEN_CACHE_HITS = Counter("jwt_cache_hits_total", "Tokens JWT aceitos a partir do cache de tokens verificados")
+TOKEN_CACHE_MISSES = Counter("jwt_cache_misses_total", "Tokens JWT que precisaram de verificação da assinatura")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -30,6 +42,57 @@ class TokenData(BaseModel):
     """
     username: Optional[str] = None
 
+
+class VerifiedTokenCache:
+    """
+    Cache LRU de tokens JWT cuja assinatura já foi verificada.
+
+    Clientes em lote reutilizam o mesmo token milhares de vezes; com o cache, a verificação HMAC
+    (`jwt.decode`) acontece uma vez por token e não uma vez por requisição. Cada entrada expira
+    no `exp` do próprio token, então um token vencido nunca é aceito pelo cache.
+    Tokens sem `exp` não são armazenados.
+
+    Attributes:
+        max_size (int): Quantidade máxima de tokens em memória.
+    """
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        """Retorna o payload do token se ele estiver no cache e ainda não tiver expirado."""
+        with self._lock:
+            entry = self._data.get(token)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[token]
+                return None
+            self._data.move_to_end(token)
+            return payload
+
+    def put(self, token: str, payload: dict):
+        """Armazena o payload de um token verificado, até o seu `exp`."""
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)) or self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[token] = (payload, expires_at)
+            self._data.move_to_end(token)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+TOKEN_CACHE = VerifiedTokenCache(TOKEN_CACHE_SIZE)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Cria um token de acesso JWT com um tempo de expiração.
@@ -68,6 +131,22 @@ async def authenticate_user(username: str, password: str):
         return {"username": username}
     return False
 
+def decode_token(token: str):
+    """
+    Valida e decodifica um token JWT, consultando antes o cache de tokens já verificados.
+
+    Raises:
+        jwt.PyJWTError: Se a assinatura for inválida ou o token estiver expirado.
+    """
+    payload = TOKEN_CACHE.get(token)
+    if payload is not None:
+        TOKEN_CACHE_HITS.inc()
+        return payload
+    TOKEN_CACHE_MISSES.inc()
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    TOKEN_CACHE.put(token, payload)
+    return payload
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Valida e decodifica o token JWT para obter o usuário atual.
@@ -87,7 +166,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with stage("auth"):
+            payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from prometheus_client import Histogram, Counter
+
+from app.timing import collect_stages, add_request_timings
+
+# --- Métricas Prometheus ---
+MICROBATCH_SIZE = Histogram(
+    "microbatch_size", "Quantidade de requisições pontuadas em cada chamada ao modelo",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+MICROBATCH_QUEUE_WAIT = Histogram(
+    "microbatch_queue_wait_seconds", "Tempo que cada requisição aguardou na fila do micro-batcher",
+    buckets=(0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+MICROBATCH_REJECTED = Counter(
+    "microbatch_rejected_total", "Requisições não aceitas pelo micro-batcher (fila cheia ou parado)"
+)
+
+
+class MicroBatcher:
+    """
+    Agrupa requisições individuais concorrentes em uma única chamada ao modelo.
+
+    Cada requisição enfileira seu registro (`submit`) junto com o modelo que ela já obteve, e
+    recebe um Future. Uma thread dedicada aguarda até `max_wait_ms` milissegundos (contados a
+    partir do primeiro registro) ou até juntar `max_batch_size` registros, chama
+    `score_fn(registros, modelo)` uma vez por modelo presente no lote e entrega a cada requisição
+    a sua própria probabilidade. Assim, durante uma troca de modelo, cada registro é pontuado
+    pela mesma versão usada na chave do cache e no log. Se o lote falhar, os registros são
+    pontuados individualmente para que o erro chegue apenas à requisição problemática.
+
+    As etapas medidas na thread do micro-batcher (frame, imputer, scaler, classifier) e a espera
+    na fila (`queue_wait`) são devolvidas junto com o Future (`stage_timings`) e somadas aos
+    tempos da requisição em `predict`, aparecendo no header `Server-Timing`.
+
+    Attributes:
+        score_fn (callable): Recebe uma lista de registros (dict) e o modelo, e retorna as probabilidades.
+        max_batch_size (int): Tamanho máximo do lote.
+        max_wait_ms (float): Espera máxima para completar um lote, em milissegundos.
+    """
+    def __init__(self, score_fn, max_batch_size=32, max_wait_ms=2.0, max_queue_size=10000):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread que monta e pontua os lotes."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Encerra a thread após pontuar o que já estava na fila.
+
+        Registros que continuarem na fila depois do `timeout` (ou enfileirados durante o
+        encerramento) recebem um RuntimeError, em vez de deixar a requisição esperando até o
+        timeout do `predict`.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        while True:
+            try:
+                _, _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher encerrado antes de pontuar o registro"))
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stopping.is_set()
+
+    def submit(self, row: dict, model=None):
+        """
+        Enfileira um registro para pontuação.
+
+        Args:
+            row (dict): Registro já validado.
+            model (optional): Modelo a usar (o mesmo da chave do cache e do log da requisição).
+
+        Returns:
+            Future: Resolvido com a probabilidade (float) do registro.
+
+        Raises:
+            RuntimeError: Se o micro-batcher não estiver rodando ou a fila estiver cheia.
+        """
+        if not self.running:
+            MICROBATCH_REJECTED.inc()
+            raise RuntimeError("Micro-batcher não está em execução")
+        future = Future()
+        try:
+            self._queue.put_nowait((row, model, future, time.perf_counter()))
+        except queue.Full:
+            MICROBATCH_REJECTED.inc()
+            raise RuntimeError("Fila do micro-batcher cheia")
+        return future
+
+    def predict(self, row: dict, model=None, timeout: float = 30.0):
+        """Enfileira um registro, aguarda a sua probabilidade e registra as etapas na requisição atual."""
+        future = self.submit(row, model)
+        probability = future.result(timeout)
+        add_request_timings(getattr(future, "stage_timings", {}))
+        return probability
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = first[3] + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        now = time.perf_counter()
+        MICROBATCH_SIZE.observe(len(batch))
+        # Uma chamada por modelo (normalmente um só; dois durante uma troca de versão)
+        groups = {}
+        for row, model, future, enqueued_at in batch:
+            MICROBATCH_QUEUE_WAIT.observe(now - enqueued_at)
+            future.stage_timings = {"queue_wait": now - enqueued_at}
+            groups.setdefault(id(model), (model, []))[1].append((row, future))
+        for model, items in groups.values():
+            self._score_group(model, items)
+
+    def _score_group(self, model, items):
+        try:
+            with collect_stages() as timings:
+                probabilities = self.score_fn([row for row, _ in items], model)
+            for (_, future), probability in zip(items, probabilities):
+                future.stage_timings.update(timings)
+                future.set_result(float(probability))
+        except Exception:
+            # Isola o registro problemático pontuando um a um
+            for row, future in items:
+                if future.done():
+                    continue
+                try:
+                    with collect_stages() as timings:
+                        probability = float(self.score_fn([row], model)[0])
+                    future.stage_timings.update(timings)
+                    future.set_result(probability)
+                except Exception as e:
+                    future.set_exception(e)
@@ -0,0 +1,138 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from prometheus_client import Counter, Gauge
+
+from src.config import FEATURE_COLS
+
+# --- Métricas Prometheus ---
+CACHE_HITS = Counter("prediction_cache_hits_total", "Probabilidades servidas pelo cache de predições")
+CACHE_MISSES = Counter("prediction_cache_misses_total", "Consultas ao cache de predições sem resultado")
+CACHE_EVICTIONS = Counter(
+    "prediction_cache_evictions_total", "Entradas removidas do cache de predições",
+    ["reason"]
+)
+CACHE_SIZE = Gauge("prediction_cache_size", "Quantidade de entradas no cache de predições")
+
+
+def make_cache_key(record: dict):
+    """
+    Normaliza as nove features de um registro em uma tupla usada como chave do cache.
+
+    Valores ausentes (None/NaN) viram None e números viram float, de forma que `5`, `5.0`
+    e `-0.0`/`0.0` geram a mesma chave. Campos que não são features (ex: threshold) são ignorados.
+    """
+    key = []
+    for col in FEATURE_COLS:
+        value = record.get(col)
+        if value is None:
+            key.append(None)
+            continue
+        value = float(value)
+        key.append(None if math.isnan(value) else value + 0.0)
+    return tuple(key)
+
+
+class PredictionCache:
+    """
+    Cache LRU com expiração (TTL) das probabilidades calculadas pelo modelo.
+
+    Guarda apenas a probabilidade (saída do `predict_proba`); o threshold do usuário é aplicado
+    depois da consulta, então requisições com limiares diferentes compartilham a mesma entrada.
+    O cache é associado ao objeto do modelo em uso: quando `state.MODEL` é substituído
+    (novo artefato), todas as entradas são descartadas automaticamente.
+
+    Attributes:
+        max_size (int): Quantidade máxima de entradas (LRU).
+        ttl (float): Tempo de vida de cada entrada, em segundos (0 = sem expiração).
+    """
+    def __init__(self, max_size=10000, ttl=3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _check_model(self, model):
+        """Descarta o cache se o modelo em uso mudou. Deve ser chamado com o lock adquirido."""
+        if model is not self._model:
+            if self._data:
+                CACHE_EVICTIONS.labels(reason="model_changed").inc(len(self._data))
+                self._data.clear()
+            self._model = model
+
+    def get_many(self, model, keys):
+        """
+        Consulta várias chaves de uma vez.
+
+        Args:
+            model: Modelo em uso (`state.MODEL`).
+            keys (list): Chaves geradas por `make_cache_key`.
+
+        Returns:
+            list: Probabilidade de cada chave, ou None quando não estiver no cache.
+        """
+        now = time.monotonic()
+        results = []
+        expired = 0
+        with self._lock:
+            self._check_model(model)
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and self.ttl > 0 and entry[1] <= now:
+                    del self._data[key]
+                    expired += 1
+                    entry = None
+                if entry is None:
+                    results.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    results.append(entry[0])
+            CACHE_SIZE.set(len(self._data))
+
+        hits = sum(r is not None for r in results)
+        CACHE_HITS.inc(hits)
+        CACHE_MISSES.inc(len(results) - hits)
+        if expired:
+            CACHE_EVICTIONS.labels(reason="ttl").inc(expired)
+        return results
+
+    def get(self, model, key):
+        """Consulta uma única chave (ver `get_many`)."""
+        return self.get_many(model, [key])[0]
+
+    def put_many(self, model, items):
+        """
+        Armazena probabilidades calculadas.
+
+        Args:
+            model: Modelo que gerou as probabilidades.
+            items (iterable): Pares (chave, probabilidade).
+        """
+        expires_at = time.monotonic() + self.ttl
+        evicted = 0
+        with self._lock:
+            self._check_model(model)
+            for key, probability in items:
+                self._data[key] = (probability, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+            CACHE_SIZE.set(len(self._data))
+        if evicted:
+            CACHE_EVICTIONS.labels(reason="capacity").inc(evicted)
+
+    def put(self, model, key, probability):
+        """Armazena uma única probabilidade (ver `put_many`)."""
+        self.put_many(model, [(key, probability)])
+
+    def clear(self):
+        """Remove todas as entradas."""
+        with self._lock:
+            self._data.clear()
+            CACHE_SIZE.set(0)
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,203 @@
+import io
+import orjson
+import numpy as np
+import pandas as pd
+
+from datetime import datetime
+
+from src.config import FEATURE_COLS, FEATURE_RANGES
+from src.feature_engineering import compute_defasagem
+from app.schemas import NON_FINITE_ERROR, out_of_range_error
+
+# pyarrow é opcional: sem ele, o upload em Arrow IPC fica indisponível
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+NPY_MEDIA_TYPES = ("application/x-npy", "application/octet-stream")
+# Colunas brutas usadas para calcular a Defasagem no servidor (mantidas sem conversão para float)
+RAW_COLUMNS = ("idade", "fase")
+
+
+class ColumnarInputError(ValueError):
+    """Corpo columnar inválido como um todo (formato, colunas ou tamanhos)."""
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_columns(body: bytes, content_type: str):
+    """
+    Converte o corpo da requisição em um array float64 por feature.
+
+    As colunas brutas `idade` e `fase` (ver `RAW_COLUMNS`) são mantidas como recebidas (a fase
+    pode ser texto, ex: 'ALFA' ou '4B') para o cálculo da Defasagem em `validate_columns`.
+
+    Formatos aceitos (pelo `Content-Type`):
+        - `application/json`: `{"columns": {"IAA": [...], ...}, "threshold": 0.5}` (null vira NaN).
+        - `application/vnd.apache.arrow.stream`: tabela Arrow IPC (valores nulos viram NaN).
+        - `application/x-npy`: array `.npy` estruturado (um campo por feature) ou 2D com as
+          colunas na ordem de `FEATURE_COLS`.
+
+    Returns:
+        tuple: (dict coluna -> np.ndarray, threshold do corpo JSON ou None).
+
+    Raises:
+        ColumnarInputError: Formato não suportado, colunas desconhecidas ou de tamanhos diferentes.
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    threshold = None
+    if media_type == JSON_MEDIA_TYPE:
+        columns, threshold = _parse_json(body)
+    elif media_type in ARROW_MEDIA_TYPES:
+        columns = _parse_arrow(body, media_type)
+    elif media_type in NPY_MEDIA_TYPES:
+        columns = _parse_npy(body)
+    else:
+        raise ColumnarInputError(f"Content-Type não suportado: '{media_type}'", status_code=415)
+
+    unknown = sorted(set(columns) - set(FEATURE_COLS) - set(RAW_COLUMNS))
+    if unknown:
+        raise ColumnarInputError(f"Colunas desconhecidas: {unknown}")
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ColumnarInputError(f"Colunas com tamanhos diferentes: {sorted(lengths)}")
+    return columns, threshold
+
+def _to_column(name, values):
+    if name in RAW_COLUMNS:
+        array = np.asarray(values, dtype=object)
+        if array.ndim != 1:
+            raise ColumnarInputError(f"Coluna '{name}' deve ser unidimensional")
+        return array
+    return _to_float_column(name, values)
+
+def _to_float_column(name, values):
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ColumnarInputError(f"Coluna '{name}' contém valores não numéricos")
+    if array.ndim != 1:
+        raise ColumnarInputError(f"Coluna '{name}' deve ser unidimensional")
+    return array
+
+def _parse_json(body):
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise ColumnarInputError(f"JSON inválido: {e}")
+    if not isinstance(payload, dict) or not isinstance(payload.get("columns"), dict):
+        raise ColumnarInputError("O corpo deve ter o formato {\"columns\": {\"IAA\": [...], ...}}")
+    # np.asarray(..., dtype=float64) converte null (None) em NaN sem laço em Python
+    columns = {name: _to_column(name, values) for name, values in payload["columns"].items()}
+    return columns, payload.get("threshold")
+
+def _parse_arrow(body, media_type):
+    if pa is None:
+        raise ColumnarInputError("Upload em Arrow indisponível: pyarrow não instalado", status_code=415)
+    try:
+        reader = pa.ipc.open_file(body) if media_type.endswith(".file") else pa.ipc.open_stream(body)
+        table = reader.read_all()
+    except pa.ArrowInvalid as e:
+        raise ColumnarInputError(f"Arrow IPC inválido: {e}")
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if name in RAW_COLUMNS:
+            columns[name] = _to_column(name, column.to_pylist())
+            continue
+        try:
+            column = column.cast(pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ColumnarInputError(f"Coluna '{name}' contém valores não numéricos")
+        columns[name] = column.to_numpy(zero_copy_only=False)
+    return columns
+
+def _parse_npy(body):
+    try:
+        array = np.load(io.BytesIO(body), allow_pickle=False)
+    except ValueError as e:
+        raise ColumnarInputError(f"Arquivo .npy inválido: {e}")
+    if array.dtype.names:
+        return {name: _to_column(name, array[name].tolist() if name in RAW_COLUMNS else array[name])
+                for name in array.dtype.names}
+    if array.ndim != 2 or array.shape[1] != len(FEATURE_COLS):
+        raise ColumnarInputError(
+            f"Array .npy sem nomes de campos deve ter formato (n, {len(FEATURE_COLS)}) na ordem {FEATURE_COLS}"
+        )
+    array = array.astype(np.float64, copy=False)
+    return {col: array[:, j] for j, col in enumerate(FEATURE_COLS)}
+
+
+def validate_columns(columns: dict, ranges=FEATURE_RANGES, reference_year=None):
+    """
+    Validação vetorizada: valores infinitos e fora da faixa invalidam apenas a própria linha.
+
+    Aplica as mesmas regras e mensagens do `PredictionInput` (`check_feature_value`), usado
+    pelo `/predict` e pelo `/predict/batch`, sobre as colunas inteiras.
+
+    Features ausentes viram colunas de NaN (imputadas pela mediana, como no `/predict`). Com as
+    colunas `idade` e `fase`, a Defasagem é calculada pelo motor do treino
+    (`compute_defasagem`), mantendo a enviada nas linhas em que a regra não se aplica.
+
+    Args:
+        columns (dict): Coluna -> np.ndarray (float64; `idade`/`fase` como recebidas).
+        ranges (dict): Coluna -> (mínimo, máximo) aceitos.
+        reference_year (int, optional): Ano usado para converter ano de nascimento em idade.
+            Padrão: ano corrente.
+
+    Returns:
+        tuple: (DataFrame com todas as features, np.ndarray de mensagens de erro por linha (ou None)).
+
+    Raises:
+        ColumnarInputError: Se apenas uma das colunas `idade` e `fase` for enviada.
+    """
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    columns = dict(columns)
+    raw = {name: columns.pop(name) for name in RAW_COLUMNS if name in columns}
+    if raw:
+        if len(raw) != len(RAW_COLUMNS):
+            raise ColumnarInputError("As colunas 'idade' e 'fase' devem ser enviadas juntas")
+        lag = compute_defasagem(
+            raw["idade"], raw["fase"], default_year=reference_year or datetime.now().year
+        )
+        original = columns.get("Defasagem", np.full(n_rows, np.nan))
+        columns["Defasagem"] = np.where(np.isnan(lag), original, lag)
+
+    frame = pd.DataFrame(
+        {col: columns[col] if col in columns else np.full(n_rows, np.nan) for col in FEATURE_COLS},
+        copy=False
+    )
+    errors = np.full(n_rows, None, dtype=object)
+    for col in FEATURE_COLS:
+        values = frame[col].to_numpy()
+        low, high = ranges.get(col, (-np.inf, np.inf))
+        with np.errstate(invalid="ignore"):
+            infinite = np.isinf(values)
+            out_of_range = ~infinite & ((values < low) | (values > high))
+        for mask, message in ((infinite, f"{col}: {NON_FINITE_ERROR}"), (out_of_range, f"{col}: {out_of_range_error(low, high)}")):
+            if mask.any():
+                # Junta a mensagem às já existentes da linha
+                idx = np.flatnonzero(mask)
+                errors[idx] = [message if e is None else f"{e}; {message}" for e in errors[idx]]
+    return frame, errors
+
+def column_records(columns: dict) -> list:
+    """
+    Converte colunas (arrays ou listas de mesmo tamanho) em uma lista de registros (dict).
+
+    Cada coluna é convertida de uma vez com `tolist()` e NaN vira None. É bem mais rápido que
+    `DataFrame.to_dict(orient="records")` para montar o log e a resposta JSON de lotes grandes.
+    """
+    keys = list(columns)
+    values = []
+    for column in columns.values():
+        column = np.asarray(column)
+        items = column.tolist()
+        if column.dtype.kind == "f" and np.isnan(column).any():
+            items = [None if v != v else v for v in items]
+        values.append(items)
+    return [dict(zip(keys, row)) for row in zip(*values)]
@@ -0,0 +1,219 @@
+import os
+import math
+import threading
+import numpy as np
+import pandas as pd
+from scipy.stats import distributions
+
+from src.config import FEATURE_COLS
+from src.reference_profile import ReferenceProfile, profile_path_for
+
+REFERENCE_DATA_PATH = os.getenv("REFERENCE_DATA_PATH", "data/reference_data.csv")
+# Resolução das faixas de referência (percentis) usadas no KS e quantidade de faixas do PSI
+DRIFT_KS_BINS = int(os.getenv("DRIFT_KS_BINS", 100))
+DRIFT_PSI_BINS = int(os.getenv("DRIFT_PSI_BINS", 10))
+# Limiar do p-valor do KS para sinalizar drift (mesmo critério usado no dashboard)
+DRIFT_P_VALUE = float(os.getenv("DRIFT_P_VALUE", 0.05))
+PSI_EPSILON = 1e-4
+
+
+class FeatureReference:
+    """
+    Distribuição de referência (treino) de uma feature, discretizada em faixas.
+
+    As bordas são os percentis da referência (`ks_bins` faixas). A ECDF da referência é guardada
+    exatamente nessas bordas, então o KS de produção é calculado comparando as duas ECDFs nas
+    bordas, em O(faixas). As faixas do PSI são um subconjunto das bordas (decis, por padrão).
+
+    Attributes:
+        edges (np.ndarray): Bordas das faixas (crescentes, sem repetição).
+        ecdf (np.ndarray): P(X <= borda) na referência.
+        psi_index (np.ndarray): Posições de `edges` usadas como bordas do PSI.
+        psi_probs (np.ndarray): Proporção da referência em cada faixa do PSI.
+        size (int): Quantidade de valores não nulos da referência.
+        null_rate (float | None): Proporção de nulos da referência (None se a feature não existir nela).
+    """
+    def __init__(self, sorted_values, null_rate, ks_bins=DRIFT_KS_BINS, psi_bins=DRIFT_PSI_BINS):
+        sorted_values = np.asarray(sorted_values, dtype=float)
+        self.size = len(sorted_values)
+        self.null_rate = null_rate
+        if self.size == 0:
+            self.edges = np.array([])
+            self.ecdf = np.array([])
+            self.psi_index = np.array([], dtype=int)
+            self.psi_probs = np.array([1.0])
+            return
+
+        quantiles = np.quantile(sorted_values, np.linspace(0, 1, ks_bins + 1))
+        self.edges = np.unique(quantiles)
+        self.ecdf = np.searchsorted(sorted_values, self.edges, side="right") / self.size
+        psi_edges = np.unique(quantiles[::max(ks_bins // psi_bins, 1)][1:-1])
+        self.psi_index = np.searchsorted(self.edges, psi_edges)
+        self.psi_probs = _psi_probs(self.ecdf, self.psi_index)
+
+    @classmethod
+    def from_values(cls, values, **kwargs):
+        """Referência a partir dos valores brutos (com nulos, em qualquer ordem)."""
+        values = np.asarray(values, dtype=float)
+        null_rate = float(np.isnan(values).mean()) if len(values) else None
+        return cls(np.sort(values[~np.isnan(values)]), null_rate, **kwargs)
+
+    def bin_index(self, values):
+        """Faixa de cada valor: quantidade de bordas estritamente menores que ele (0 a len(edges))."""
+        return np.searchsorted(self.edges, values, side="left")
+
+
+def _psi_probs(ecdf, psi_index):
+    """Proporção em cada faixa do PSI a partir da ECDF nas bordas."""
+    cumulative = np.concatenate([[0.0], ecdf[psi_index], [1.0]])
+    return np.diff(cumulative)
+
+def population_stability_index(expected, actual, epsilon=PSI_EPSILON):
+    """PSI entre duas distribuições discretizadas nas mesmas faixas."""
+    expected = np.clip(expected, epsilon, None)
+    actual = np.clip(actual, epsilon, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def ks_p_value(statistic, n, m):
+    """P-valor assintótico do KS de duas amostras (mesma aproximação do `ks_2samp(method='asymp')`)."""
+    if n == 0 or m == 0:
+        return None
+    en = n * m / (n + m)
+    return float(distributions.kstwo.sf(statistic, np.round(en)))
+
+
+class DriftMonitor:
+    """
+    Histogramas de produção por feature, atualizados a cada predição registrada.
+
+    As referências (bordas, ECDF e faixas do PSI) são calculadas uma vez na inicialização.
+    Cada predição apenas incrementa um contador por feature (`np.searchsorted` + `np.add.at`),
+    e `report` calcula KS, PSI e taxa de nulos das nove features em O(faixas), sem reler o
+    histórico nem os dados de treino.
+
+    Attributes:
+        references (dict): `FeatureReference` por feature.
+        model_version (str): Versão do modelo cuja referência está em uso (se conhecida).
+    """
+    def __init__(self, references: dict, model_version=None):
+        self.references = references
+        self.model_version = model_version
+        self.counts = {col: np.zeros(len(ref.edges) + 1, dtype=np.int64) for col, ref in references.items()}
+        self.nulls = {col: 0 for col in references}
+        self.total = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, feature_cols=FEATURE_COLS, **kwargs):
+        """Monta as referências a partir dos dados de treino (features ausentes ficam vazias)."""
+        references = {}
+        for col in feature_cols:
+            values = pd.to_numeric(df[col], errors="coerce") if col in df.columns else pd.Series(dtype=float)
+            references[col] = FeatureReference.from_values(values.to_numpy(dtype=float), **kwargs)
+        return cls(references)
+
+    @classmethod
+    def from_profile(cls, profile, feature_cols=FEATURE_COLS, **kwargs):
+        """
+        Monta as referências a partir do perfil salvo junto ao modelo (`src.reference_profile`).
+
+        Os valores já vêm ordenados, então não há leitura de CSV nem ordenação na inicialização.
+        """
+        references = {}
+        for col in feature_cols:
+            feature = profile.features.get(col)
+            if feature is None:
+                references[col] = FeatureReference(np.array([]), None, **kwargs)
+            else:
+                references[col] = FeatureReference(feature.sorted_values, feature.null_rate, **kwargs)
+        return cls(references)
+
+    @classmethod
+    def from_csv(cls, path=REFERENCE_DATA_PATH, **kwargs):
+        return cls.from_dataframe(pd.read_csv(path), **kwargs)
+
+    @classmethod
+    def for_model(cls, model_path, version=None, fallback_csv=REFERENCE_DATA_PATH, **kwargs):
+        """
+        Monitor para um artefato de modelo: usa o perfil de referência salvo ao lado dele ou,
+        para artefatos antigos sem perfil, os dados de referência em CSV.
+        """
+        profile_path = profile_path_for(model_path)
+        if profile_path.is_file():
+            monitor = cls.from_profile(ReferenceProfile.load(profile_path), **kwargs)
+        else:
+            monitor = cls.from_csv(fallback_csv, **kwargs)
+        monitor.model_version = version
+        return monitor
+
+    def observe_many(self, entries: list):
+        """
+        Atualiza os histogramas de produção com registros de predição.
+
+        Args:
+            entries (list): Registros (dict) com as features.
+        """
+        if not entries:
+            return
+        matrix = np.array(
+            [[_to_float(entry.get(col)) for col in self.references] for entry in entries], dtype=float
+        )
+        with self._lock:
+            self.total += len(entries)
+            for j, (col, ref) in enumerate(self.references.items()):
+                values = matrix[:, j]
+                missing = np.isnan(values)
+                self.nulls[col] += int(missing.sum())
+                np.add.at(self.counts[col], ref.bin_index(values[~missing]), 1)
+
+    def report(self):
+        """
+        KS, PSI e taxa de nulos de todas as features (produção x referência).
+
+        Returns:
+            dict: Totais e métricas por feature.
+        """
+        with self._lock:
+            counts = {col: c.copy() for col, c in self.counts.items()}
+            nulls = dict(self.nulls)
+            total = self.total
+
+        features = {}
+        for col, ref in self.references.items():
+            n = int(counts[col].sum())
+            result = {
+                "count": n,
+                "null_rate": nulls[col] / total if total else None,
+                "reference_size": ref.size,
+                "reference_null_rate": ref.null_rate,
+                "ks": None, "p_value": None, "psi": None, "drift": None,
+            }
+            if n > 0 and ref.size > 0:
+                # ECDF de produção nas mesmas bordas: P(X <= borda) = faixas 0..k
+                ecdf = np.cumsum(counts[col])[:-1] / n
+                ks = float(np.max(np.abs(ecdf - ref.ecdf)))
+                p_value = ks_p_value(ks, ref.size, n)
+                result.update({
+                    "ks": ks,
+                    "p_value": p_value,
+                    "psi": population_stability_index(ref.psi_probs, _psi_probs(ecdf, ref.psi_index)),
+                    "drift": p_value < DRIFT_P_VALUE,
+                })
+            features[col] = result
+
+        return {
+            "model_version": self.model_version,
+            "production_size": total,
+            "reference_size": max((ref.size for ref in self.references.values()), default=0),
+            "p_value_threshold": DRIFT_P_VALUE,
+            "features": features,
+        }
+
+
+def _to_float(value):
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
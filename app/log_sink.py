@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+from prometheus_client import Counter
+
+# --- Métricas Prometheus ---
+LOG_FLUSHED = Counter(
+    "prediction_log_flushed_total", "Registros de predição gravados pelo log em background"
+)
+LOG_DROPPED = Counter(
+    "prediction_log_dropped_total", "Registros de predição descartados (fila cheia ou falha de gravação)",
+    ["reason"]
+)
+LOG_BATCHES = Counter(
+    "prediction_log_batches_total", "Lotes gravados pelo log em background"
+)
+
+
+class PredictionLogSink:
+    """
+    Log de predições assíncrono e em lotes.
+
+    As requisições apenas enfileiram os registros (`submit`, sem bloquear). Uma única thread
+    escritora agrupa os registros e chama `writer(lista_de_registros)` quando o lote atinge
+    `batch_size` ou quando `flush_interval` segundos se passaram desde o primeiro registro do lote.
+    A fila é limitada: se estiver cheia, o registro é descartado e contabilizado em métrica,
+    em vez de atrasar a resposta da API.
+
+    Attributes:
+        writer (callable): Função que grava uma lista de registros (ex: `log_predictions` síncrono).
+        batch_size (int): Quantidade máxima de registros por gravação.
+        flush_interval (float): Tempo máximo (s) que um registro aguarda na fila antes de ser gravado.
+    """
+    def __init__(self, writer, max_queue_size=10000, batch_size=500, flush_interval=1.0):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread escritora."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="prediction-log-sink", daemon=True)
+        self._thread.start()
+
+    def submit(self, entry: dict):
+        """
+        Enfileira um registro sem bloquear.
+
+        Returns:
+            bool: True se o registro foi enfileirado, False se foi descartado (fila cheia).
+        """
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            LOG_DROPPED.labels(reason="queue_full").inc()
+            return False
+
+    def submit_many(self, entries: list):
+        """Enfileira vários registros. Retorna a quantidade aceita."""
+        return sum(self.submit(entry) for entry in entries)
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Sinaliza o encerramento e aguarda a gravação de tudo que já estava na fila.
+
+        Se a thread ainda estiver gravando após o `timeout`, a fila continua com ela: gravar o
+        restante daqui colocaria dois escritores no mesmo arquivo, com linhas intercaladas ou
+        duplicadas.
+
+        Args:
+            timeout (float): Tempo máximo (s) de espera pela thread escritora.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                print(f"Aviso: log de predições ainda gravando após {timeout}s; {self.pending} registros ficam com a thread escritora")
+                return
+            self._thread = None
+        # Se a thread não estava rodando, grava o que restou de forma síncrona
+        self._drain()
+
+    @property
+    def pending(self):
+        """Quantidade aproximada de registros aguardando gravação."""
+        return self._queue.qsize()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self):
+        """Agrupa registros até atingir `batch_size` ou estourar o `flush_interval`."""
+        batch = []
+        try:
+            # Aguarda pouco durante o encerramento para drenar a fila rapidamente
+            wait = 0.05 if self._stopping.is_set() else self.flush_interval
+            batch.append(self._queue.get(timeout=wait))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                remaining = 0
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self.writer(batch)
+            LOG_FLUSHED.inc(len(batch))
+            LOG_BATCHES.inc()
+        except Exception as e:
+            # Não derruba a thread escritora se a gravação falhar
+            LOG_DROPPED.labels(reason="write_error").inc(len(batch))
+            print(f"Erro ao salvar log: {e}")
@@ -2,17 +2,32 @@ import sys
 from pathlib import Path
 import os
 import contextlib
-import joblib
+import threading
 from fastapi import FastAPI, Request, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from datetime import timedelta
+from fastapi.middleware.gzip import GZipMiddleware
+from datetime import timedelta, datetime
 
 from starlette.responses import Response
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, Counter, Histogram
 
 # Importações após atualização do sys.path
 from app import state
-from app.router import router as prediction_router
+from app.registry import ModelManager
+from app.router import router as prediction_router, write_log_entries, score_rows
+from app.admin import router as admin_router
+from app.batching import MicroBatcher
+from app.log_sink import PredictionLogSink
+from app.cache import PredictionCache
+from app.shadow import create_shadow_scorer
+from app.stats import PerformanceStats
+from app.drift import DriftMonitor
+from app.admission import (
+    AdmissionController, AdmissionMiddleware,
+    ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS
+)
+from app.store import get_store
+from app.timing import start_request, server_timing_header, REQUEST_LATENCY_BUCKETS
 from app.auth import Token, authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 # Define constantes
@@ -20,6 +35,29 @@ from app.auth import Token, authenticate_user, create_access_token, ACCESS_TOKEN
 PROJECT_ROOT = Path(__file__).resolve().parent.parent  # Mantém apenas para referência de caminhos de arquivos
 MODEL_PATH = os.path.join(PROJECT_ROOT, "app", "models", "risk_model.joblib")
 
+# Log de predições em background (0 em LOG_QUEUE_SIZE desativa e grava de forma síncrona)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 500))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 1.0))
+
+# Cache de probabilidades por vetor de features (0 em PREDICTION_CACHE_SIZE desativa)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 10000))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 3600))
+
+# Micro-batching de requisições concorrentes ao /predict (opcional)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", 32))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", 2.0))
+
+# KPIs de performance em memória (/stats/performance)
+STATS_WINDOW_MINUTES = int(os.getenv("STATS_WINDOW_MINUTES", 60))
+STATS_SEED_FROM_HISTORY = os.getenv("STATS_SEED_FROM_HISTORY", "true").lower() in ("1", "true", "yes")
+
+# Respostas com mais de GZIP_MINIMUM_SIZE bytes são comprimidas se o cliente aceitar gzip (0 desativa)
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", 1024))
+# Nível 1: quase a mesma taxa de compressão do nível 9 nos logs, com uma fração do custo de CPU
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", 1))
+
 # --- Métricas Prometheus ---
 REQUEST_COUNT = Counter(
     "request_count", "Contagem de Requisições da App",
@@ -27,7 +65,8 @@ REQUEST_COUNT = Counter(
 )
 REQUEST_LATENCY = Histogram(
     "request_latency_seconds", "Latência das requisições",
-    ["method", "endpoint"]
+    ["method", "endpoint"],
+    buckets=REQUEST_LATENCY_BUCKETS
 )
 
 # Atribui ao state para acesso global se necessário
@@ -35,6 +74,58 @@ state.REQUEST_COUNT = REQUEST_COUNT
 state.REQUEST_LATENCY = REQUEST_LATENCY
 
 
+def _seed_monitors(stats, drift, until):
+    """
+    Carrega o histórico de predições nos agregados de performance e nos histogramas de drift.
+
+    Com `stats` None, apenas o monitor de drift é preenchido (troca de modelo a quente).
+
+    O histórico é lido uma única vez, em streaming; registros com timestamp >= `until` já foram
+    contabilizados ao serem registrados por esta instância.
+    """
+    def records():
+        batch = []
+        for _, record in get_store().iter_records():
+            if drift is not None and str(record.get("timestamp") or "") < until:
+                batch.append(record)
+                if len(batch) >= 1000:
+                    drift.observe_many(batch)
+                    batch = []
+            yield record
+        if drift is not None:
+            drift.observe_many(batch)
+
+    try:
+        if stats is not None:
+            stats.seed(records(), until=until)
+        else:
+            for _ in records():
+                pass
+    except Exception as e:
+        print(f"AVISO: Falha ao carregar o histórico nas estatísticas de performance. {e}")
+
+
+def _load_drift_monitor(model_path, version):
+    """
+    Recria o monitor de drift com a referência da versão ativada (perfil salvo junto ao modelo).
+
+    Os histogramas dependem das faixas da referência, então não dá para aproveitar os do monitor
+    anterior. Em uma troca a quente, o novo monitor é preenchido com o histórico em background
+    (como na inicialização), para que o `/drift` não volte a zero a cada versão publicada.
+    """
+    previous = state.DRIFT_MONITOR
+    monitor = DriftMonitor.for_model(model_path, version)
+    until = datetime.now().isoformat()
+    state.DRIFT_MONITOR = monitor
+    print(f"Referência de drift carregada para o modelo {version}.")
+
+    # Na inicialização (sem monitor anterior), o histórico é carregado pelo lifespan
+    if previous is not None and STATS_SEED_FROM_HISTORY:
+        threading.Thread(
+            target=_seed_monitors, args=(None, monitor, until), name="drift-seed", daemon=True
+        ).start()
+
+
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -42,21 +133,73 @@ async def lifespan(app: FastAPI):
     """
     print("Iniciando API...")
     
-    # Carregar Modelo
-    if os.path.exists(MODEL_PATH):
-        try:
-            print(f"Carregando modelo de {MODEL_PATH}...")
-            state.MODEL = joblib.load(MODEL_PATH)
-            print("Modelo carregado com sucesso.")
-        except Exception as e:
-            print(f"ERRO: Falha ao carregar o modelo. {e}")
-    else:
-        print(f"AVISO: Arquivo do modelo não encontrado em {MODEL_PATH}")
+    # Carregar Modelo (versão mais recente do registro ou, se vazio, o artefato padrão)
+    # A cada versão ativada, o monitor de drift passa a usar o perfil de referência dessa versão
+    state.MODEL_MANAGER = ModelManager(fallback_path=MODEL_PATH, on_activate=_load_drift_monitor)
+    try:
+        state.MODEL_MANAGER.load_initial()
+    except Exception as e:
+        print(f"ERRO: Falha ao carregar o modelo. {e}")
+    state.MODEL_MANAGER.start_watcher()
+
+    if PREDICTION_CACHE_SIZE > 0:
+        state.PREDICTION_CACHE = PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+    if MICROBATCH_ENABLED:
+        state.MICRO_BATCHER = MicroBatcher(
+            score_rows,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+            max_wait_ms=MICROBATCH_MAX_WAIT_MS
+        )
+        state.MICRO_BATCHER.start()
+
+    # Modo shadow: avalia um modelo candidato com o mesmo tráfego, fora do caminho das requisições
+    try:
+        state.SHADOW_SCORER = create_shadow_scorer()
+        if state.SHADOW_SCORER is not None:
+            state.SHADOW_SCORER.start()
+            print(f"Modo shadow ativo com o modelo {state.SHADOW_SCORER.version}.")
+    except Exception as e:
+        print(f"ERRO: Falha ao carregar o modelo shadow. {e}")
+
+    # KPIs de performance: novas predições entram na hora; o histórico é carregado em background
+    state.PERFORMANCE_STATS = PerformanceStats(window_minutes=STATS_WINDOW_MINUTES)
+    if STATS_SEED_FROM_HISTORY:
+        started_at = datetime.now().isoformat()
+        threading.Thread(
+            target=_seed_monitors, args=(state.PERFORMANCE_STATS, state.DRIFT_MONITOR, started_at),
+            name="stats-seed", daemon=True
+        ).start()
+
+    # Iniciar log de predições em background
+    if LOG_QUEUE_SIZE > 0:
+        state.LOG_SINK = PredictionLogSink(
+            write_log_entries,
+            max_queue_size=LOG_QUEUE_SIZE,
+            batch_size=LOG_BATCH_SIZE,
+            flush_interval=LOG_FLUSH_INTERVAL
+        )
+        state.LOG_SINK.start()
 
     yield
     
     print("Desligando API...")
-    state.MODEL = None
+    state.MODEL_MANAGER.stop_watcher()
+    state.MODEL_MANAGER = None
+    if state.MICRO_BATCHER is not None:
+        state.MICRO_BATCHER.stop()
+        state.MICRO_BATCHER = None
+    if state.SHADOW_SCORER is not None:
+        state.SHADOW_SCORER.stop()
+        state.SHADOW_SCORER = None
+    # Grava os registros pendentes antes de encerrar
+    if state.LOG_SINK is not None:
+        state.LOG_SINK.stop()
+        state.LOG_SINK = None
+    state.PREDICTION_CACHE = None
+    state.PERFORMANCE_STATS = None
+    state.DRIFT_MONITOR = None
+    state.set_active_model(None, None)
 
 
 app = FastAPI(
@@ -67,26 +210,51 @@ app = FastAPI(
 )
 
 # --- Middleware ---
-from datetime import datetime
+import time
+
+# Controle de admissão das predições (ADMISSION_MAX_CONCURRENCY > 0). Fica dentro do middleware de
+# métricas, então rejeições (429/503) e o tempo de fila aparecem em request_count/request_latency.
+if ADMISSION_MAX_CONCURRENCY > 0:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(
+            ADMISSION_MAX_CONCURRENCY,
+            max_queue=ADMISSION_MAX_QUEUE,
+            queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000
+        )
+    )
 
 @app.middleware("http")
 async def prometheus_middleware(request: Request, call_next):
-    start_time = datetime.now()
+    start_time = time.perf_counter()
     method = request.method
     endpoint = request.url.path
+    # Tempos por etapa (auth, validation, frame, imputer, scaler, classifier, logging) desta requisição
+    timings = start_request()
     
     response = await call_next(request)
+    latency = time.perf_counter() - start_time
+    response.headers["Server-Timing"] = server_timing_header(timings, latency)
     
     # Não rastreia o endpoint de métricas para evitar ruído
     if endpoint != "/metrics":
-        latency = (datetime.now() - start_time).total_seconds()
         REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(latency)
         REQUEST_COUNT.labels(method=method, endpoint=endpoint, http_status=response.status_code).inc()
+
+    # Rotas de predição gravam a versão capturada com o modelo; nas demais, vale a versão ativa
+    model_version = getattr(request.state, "model_version", state.MODEL_VERSION)
+    if model_version is not None:
+        response.headers["X-Model-Version"] = model_version
         
     return response
 
+# Compressão gzip para clientes que enviam `Accept-Encoding: gzip` (respostas acima de GZIP_MINIMUM_SIZE bytes)
+if GZIP_MINIMUM_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
 # --- Rotas ---
 app.include_router(prediction_router)
+app.include_router(admin_router)
 
 @app.post("/token", 
     response_model=Token, 
@@ -111,11 +279,12 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 @app.get("/", 
     tags=["Saúde"],
     summary="Verificar Status da API",
-    description="Retorna o status operacional da API e indica se o modelo de ML foi carregado corretamente."
+    description="Retorna o status operacional da API, indica se o modelo de ML foi carregado corretamente e qual versão está em uso."
 )
 def home():
-    model_status = "Carregado" if state.MODEL else "Não Carregado"
-    return {"message": "API de Previsão de Risco está Online", "model_status": model_status}
+    model, model_version = state.get_active_model()
+    model_status = "Carregado" if model else "Não Carregado"
+    return {"message": "API de Previsão de Risco está Online", "model_status": model_status, "model_version": model_version}
 
 @app.get("/metrics", 
     tags=["Monitoramento"],
@@ -0,0 +1,93 @@
+import os
+import joblib
+from pathlib import Path
+from dotenv import load_dotenv
+
+from src.inference import CompiledRiskModel
+
+load_dotenv()
+
+# Motor de inferência usado pela API: 'sklearn' (Pipeline original) ou 'compiled' (NumPy puro)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn").lower()
+# Com o motor 'sklearn', funde Imputer + Scaler em uma única passada sobre ndarrays. O ganho é
+# limitado (~15-20% por aluno): o `predict_proba` da Random Forest continua dominando a latência.
+FUSE_PREPROCESSING = os.getenv("FUSE_PREPROCESSING", "true").lower() in ("1", "true", "yes")
+# Vários workers: serve o motor compilado a partir de arrays mapeados em memória, compartilhados entre processos
+MODEL_MMAP = os.getenv("MODEL_MMAP", "false").lower() in ("1", "true", "yes")
+
+
+def prepare_model(model):
+    """
+    Prepara um modelo carregado para servir na API, de acordo com `INFERENCE_ENGINE`.
+
+    Com `INFERENCE_ENGINE=compiled`, o pipeline é convertido para `CompiledRiskModel`.
+    Se o modelo não for suportado pelo motor compilado, mantém o pipeline do scikit-learn,
+    com o pré-processamento fundido (`FUSE_PREPROCESSING`) quando possível. A fusão só remove o
+    custo do pandas no pré-processamento; para reduzir a latência do classificador, use o
+    motor compilado.
+
+    Args:
+        model (RiskModel): Modelo treinado.
+
+    Returns:
+        RiskModel | CompiledRiskModel: Modelo pronto para `predict_proba`.
+    """
+    if INFERENCE_ENGINE == "compiled":
+        try:
+            model = CompiledRiskModel.from_risk_model(model)
+            print("Motor de inferência compilado (NumPy) ativado.")
+            return model
+        except (ValueError, AttributeError) as e:
+            print(f"AVISO: Modelo não suportado pelo motor compilado, usando sklearn. {e}")
+
+    if FUSE_PREPROCESSING and hasattr(model, "fuse_preprocessing"):
+        try:
+            model = model.fuse_preprocessing()
+        except ValueError as e:
+            print(f"AVISO: Pré-processamento não pôde ser fundido. {e}")
+    return model
+
+def shared_artifact_path(model_path):
+    """Caminho do artefato de arrays compartilháveis ao lado do modelo (ex: `risk_model.arrays.joblib`)."""
+    model_path = Path(model_path)
+    return model_path.with_name(f"{model_path.stem}.arrays.joblib")
+
+def load_shared_model(model_path):
+    """
+    Carrega o modelo como `CompiledRiskModel` com os arrays mapeados em memória (mmap).
+
+    Na primeira carga (ou se o modelo for mais novo que o artefato), o pipeline é compilado e os
+    arrays são gravados em `shared_artifact_path`. Os demais workers apenas mapeiam o mesmo arquivo,
+    compartilhando as páginas de memória em vez de manter uma cópia da floresta por processo.
+
+    Raises:
+        ValueError: Se o modelo não for suportado pelo motor compilado.
+    """
+    shared_path = shared_artifact_path(model_path)
+    if not shared_path.is_file() or shared_path.stat().st_mtime < Path(model_path).stat().st_mtime:
+        compiled = CompiledRiskModel.from_risk_model(joblib.load(model_path))
+        # Grava em arquivo temporário e renomeia: workers concorrentes nunca leem um arquivo incompleto
+        tmp_path = shared_path.with_name(f".{shared_path.name}.{os.getpid()}.tmp")
+        compiled.save_shared(tmp_path)
+        os.replace(tmp_path, shared_path)
+    return CompiledRiskModel.load_shared(shared_path)
+
+def load_model(model_path):
+    """
+    Carrega o artefato do modelo (.joblib) e o prepara para servir.
+
+    Com `MODEL_MMAP=true`, usa o motor compilado com arrays mapeados em memória
+    (`load_shared_model`); se o modelo não for suportado, volta para `prepare_model`.
+
+    Args:
+        model_path (str): Caminho do arquivo de modelo salvo.
+
+    Returns:
+        RiskModel | CompiledRiskModel: Modelo pronto para `predict_proba`.
+    """
+    if MODEL_MMAP:
+        try:
+            return load_shared_model(model_path)
+        except (ValueError, AttributeError) as e:
+            print(f"AVISO: Modelo não suportado pelo modo compartilhado (mmap), carregando cópia local. {e}")
+    return prepare_model(joblib.load(model_path))
@@ -0,0 +1,289 @@
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import threading
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from app import state
+from app.model_loader import load_model
+
+load_dotenv()
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", PROJECT_ROOT / "app" / "models" / "registry"))
+MODEL_FILENAME = "risk_model.joblib"
+GOLDEN_FILENAME = "golden.json"
+# Intervalo (s) de verificação de novas versões no registro (0 desativa o watcher)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", 0))
+# Fixa uma versão específica na inicialização (vazio = mais recente)
+MODEL_VERSION = os.getenv("MODEL_VERSION", "")
+GOLDEN_TOLERANCE = 1e-6
+
+# Entradas de referência usadas para aquecer e validar um modelo antes de colocá-lo no ar
+GOLDEN_INPUTS = [
+    {"IAA": 5.5, "IEG": 6.2, "IPS": 7.0, "IDA": 8.0, "IPP": 4.5, "IPV": 6.1, "IAN": 5.0, "INDE": 6.5, "Defasagem": 0.0},
+    {"IAA": 8.3, "IEG": 4.1, "IPS": 5.6, "IDA": 4.0, "IPP": 6.0, "IPV": 7.3, "IAN": 5.0, "INDE": 5.8, "Defasagem": -1.0},
+    {"IAA": 9.5, "IEG": 9.0, "IPS": 7.5, "IDA": 8.8, "IPP": 7.9, "IPV": 8.6, "IAN": 10.0, "INDE": 8.9, "Defasagem": 0.0},
+    {"IAA": 2.0, "IEG": 1.5, "IPS": 2.5, "IDA": 1.0, "IPP": 3.0, "IPV": 2.2, "IAN": 2.5, "INDE": 2.1, "Defasagem": -3.0},
+    {"IAA": None, "IEG": None, "IPS": None, "IDA": None, "IPP": None, "IPV": None, "IAN": None, "INDE": None, "Defasagem": None},
+]
+
+
+def version_sort_key(name: str):
+    """
+    Chave de ordenação natural: trechos numéricos comparados como números.
+
+    Assim `v10` vem depois de `v9`, e os nomes padrão (`vAAAAMMDD-HHMMSS`) seguem a ordem
+    cronológica. Como `re.split` alterna texto e número, as chaves são sempre comparáveis.
+    """
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(re.split(r"(\d+)", name)))
+
+def list_versions(registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Lista as versões disponíveis no registro (subdiretórios com `risk_model.joblib`), em ordem
+    crescente (`version_sort_key`).
+    """
+    registry_dir = Path(registry_dir)
+    if not registry_dir.is_dir():
+        return []
+    return sorted((p.name for p in registry_dir.iterdir() if (p / MODEL_FILENAME).is_file()), key=version_sort_key)
+
+def artifact_version(path, prefix="legacy"):
+    """Versão derivada do conteúdo de um artefato fora do registro (hash curto do arquivo)."""
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    return f"{prefix}-{digest[:8]}"
+
+def golden_probabilities(model):
+    """Probabilidades do modelo para as entradas de referência (`GOLDEN_INPUTS`)."""
+    return np.asarray(model.predict_proba(pd.DataFrame(GOLDEN_INPUTS)), dtype=float).reshape(-1)
+
+def publish_model(artifact_path, version=None, registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Publica um artefato treinado como nova versão do registro.
+
+    Copia o `.joblib` (e arquivos auxiliares do mesmo diretório com o mesmo prefixo) para
+    `<registro>/<versão>/` e grava `golden.json` com as probabilidades esperadas para as
+    entradas de referência, usadas na validação antes da troca em produção.
+
+    Args:
+        artifact_path (str): Caminho do modelo treinado (.joblib).
+        version (str, optional): Nome da versão. Padrão: timestamp `vAAAAMMDD-HHMMSS`.
+        registry_dir (str): Diretório do registro.
+
+    Returns:
+        str: Versão publicada.
+    """
+    artifact_path = Path(artifact_path)
+    if not artifact_path.is_file():
+        raise FileNotFoundError(f"Arquivo não encontrado: {artifact_path}")
+
+    version = version or datetime.now().strftime("v%Y%m%d-%H%M%S")
+    target = Path(registry_dir) / version
+    if target.exists():
+        raise ValueError(f"Versão já existe no registro: {version}")
+
+    model = joblib.load(artifact_path)
+    expected = golden_probabilities(model)
+
+    # Publica em um diretório temporário e renomeia, para o watcher nunca ver uma versão incompleta
+    staging = Path(registry_dir) / f".{version}.tmp"
+    staging.mkdir(parents=True)
+    shutil.copy2(artifact_path, staging / MODEL_FILENAME)
+    for sibling in artifact_path.parent.glob(f"{artifact_path.stem.split('.')[0]}*"):
+        # O artefato de arrays compartilhados (MODEL_MMAP) é regenerado a partir do modelo publicado
+        if sibling != artifact_path and sibling.is_file() and not sibling.name.endswith(".arrays.joblib"):
+            shutil.copy2(sibling, staging / sibling.name)
+    with open(staging / GOLDEN_FILENAME, "w", encoding="utf-8") as f:
+        json.dump({"inputs": GOLDEN_INPUTS, "probabilities": expected.tolist()}, f, indent=2)
+    staging.rename(target)
+
+    return version
+
+
+class ModelManager:
+    """
+    Carrega, valida e troca o modelo em produção sem derrubar a API.
+
+    A nova versão é carregada e aquecida fora do caminho das requisições (thread em background),
+    validada contra as entradas de referência e só então substitui `state.MODEL` de forma atômica
+    (`state.set_active_model`). Requisições em andamento continuam usando o modelo anterior.
+    Se a validação falhar, o modelo atual permanece no ar.
+
+    Attributes:
+        registry_dir (Path): Diretório do registro de versões.
+        fallback_path (str): Artefato usado quando o registro está vazio (`app/models/risk_model.joblib`).
+        on_activate (callable): Chamado com (caminho do artefato, versão) após cada troca de modelo,
+            para recarregar o que acompanha a versão (ex: o perfil de referência do monitor de drift).
+    """
+    def __init__(self, registry_dir=MODEL_REGISTRY_DIR, fallback_path=None, watch_interval=MODEL_WATCH_INTERVAL, on_activate=None):
+        self.registry_dir = Path(registry_dir)
+        self.fallback_path = fallback_path
+        self.on_activate = on_activate
+        self.watch_interval = watch_interval
+        self.last_error = None
+        self.reloading = False
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def _artifact_path(self, version):
+        return self.registry_dir / version / MODEL_FILENAME
+
+    def load_version(self, version):
+        """
+        Carrega, aquece, valida e ativa uma versão do registro (síncrono).
+
+        Raises:
+            FileNotFoundError: Se a versão não existir.
+            ValueError: Se o modelo falhar na validação com as entradas de referência.
+        """
+        path = self._artifact_path(version)
+        if not path.is_file():
+            raise FileNotFoundError(f"Versão não encontrada no registro: {version}")
+        self._activate(path, version, self.registry_dir / version / GOLDEN_FILENAME)
+
+    def load_initial(self):
+        """Ativa a versão fixada em `MODEL_VERSION`, a mais recente do registro ou o artefato padrão."""
+        versions = list_versions(self.registry_dir)
+        if MODEL_VERSION:
+            self.load_version(MODEL_VERSION)
+        elif versions:
+            self.load_version(versions[-1])
+        elif self.fallback_path and os.path.exists(self.fallback_path):
+            self._activate(Path(self.fallback_path), artifact_version(self.fallback_path), None)
+        else:
+            print(f"AVISO: Nenhum modelo encontrado em {self.registry_dir} ou {self.fallback_path}")
+
+    def _activate(self, path, version, golden_path):
+        with self._reload_lock:
+            self.reloading = True
+            try:
+                print(f"Carregando modelo {version} de {path}...")
+                model = load_model(path)
+
+                # Aquecimento + validação: probabilidades válidas e iguais às registradas na publicação
+                probabilities = golden_probabilities(model)
+                if probabilities.shape != (len(GOLDEN_INPUTS),) or not np.all((probabilities >= 0) & (probabilities <= 1)):
+                    raise ValueError(f"Modelo {version} retornou probabilidades inválidas: {probabilities}")
+                if golden_path is not None and Path(golden_path).is_file():
+                    with open(golden_path, encoding="utf-8") as f:
+                        expected = np.asarray(json.load(f)["probabilities"], dtype=float)
+                    if not np.allclose(probabilities, expected, rtol=0, atol=GOLDEN_TOLERANCE):
+                        raise ValueError(f"Modelo {version} diverge das probabilidades de referência")
+
+                state.set_active_model(model, version)
+                self.last_error = None
+                print(f"Modelo {version} ativo.")
+                if self.on_activate is not None:
+                    try:
+                        self.on_activate(path, version)
+                    except Exception as e:
+                        print(f"AVISO: Falha ao carregar os artefatos auxiliares do modelo {version}. {e}")
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                raise
+            finally:
+                self.reloading = False
+
+    def reload_in_background(self, version=None):
+        """
+        Dispara a troca de modelo em uma thread (a API continua respondendo com o modelo atual).
+
+        Args:
+            version (str, optional): Versão desejada. Padrão: a mais recente do registro.
+
+        Returns:
+            str: Versão que será carregada.
+
+        Raises:
+            FileNotFoundError: Se a versão não existir ou o registro estiver vazio.
+        """
+        versions = list_versions(self.registry_dir)
+        version = version or (versions[-1] if versions else None)
+        if version is None or version not in versions:
+            raise FileNotFoundError(f"Versão não encontrada no registro: {version}")
+
+        def _run():
+            try:
+                self.load_version(version)
+            except Exception as e:
+                print(f"ERRO: Falha ao trocar para o modelo {version}. {e}")
+
+        threading.Thread(target=_run, name=f"model-reload-{version}", daemon=True).start()
+        return version
+
+    def start_watcher(self):
+        """
+        Verifica periodicamente o registro e ativa novas versões publicadas.
+
+        Com `MODEL_VERSION` fixada, a promoção automática fica desligada: a versão fixada
+        só é trocada por uma chamada explícita ao `/admin/models/reload`.
+        """
+        if self.watch_interval <= 0 or self._watcher is not None:
+            return
+        if MODEL_VERSION:
+            print(f"AVISO: MODEL_VERSION={MODEL_VERSION} fixada; MODEL_WATCH_INTERVAL ignorado.")
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self):
+        failed = set()
+        while not self._stop.wait(self.watch_interval):
+            versions = list_versions(self.registry_dir)
+            latest = versions[-1] if versions else None
+            if latest is None or latest == state.MODEL_VERSION or latest in failed:
+                continue
+            try:
+                self.load_version(latest)
+            except Exception as e:
+                # Não tenta novamente a mesma versão inválida a cada ciclo
+                failed.add(latest)
+                print(f"ERRO: Falha ao trocar para o modelo {latest}. {e}")
+
+    def status(self):
+        """Resumo do estado do registro para o endpoint administrativo."""
+        return {
+            "active_version": state.MODEL_VERSION,
+            "available_versions": list_versions(self.registry_dir),
+            "reloading": self.reloading,
+            "last_error": self.last_error,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de versões do modelo de risco.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pub = sub.add_parser("publish", help="Publica um artefato treinado como nova versão")
+    pub.add_argument("artifact", nargs="?", default=str(PROJECT_ROOT / "app" / "models" / MODEL_FILENAME))
+    pub.add_argument("--version", default=None)
+    sub.add_parser("list", help="Lista as versões publicadas")
+
+    args = parser.parse_args()
+    if args.command == "publish":
+        version = publish_model(args.artifact, args.version)
+        print(f"Modelo publicado como {version} em {MODEL_REGISTRY_DIR}")
+    else:
+        for version in list_versions():
+            print(version)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import io
+from typing import Literal
+
+import orjson
+import pandas as pd
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+# pyarrow é opcional: sem ele, apenas o formato JSON fica disponível
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = pq = None
+
+ResponseFormat = Literal["json", "arrow", "parquet"]
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Resposta JSON serializada uma única vez, direto para bytes.
+
+    Modelos Pydantic usam o serializador nativo (`model_dump_json`); listas e dicts usam o
+    `orjson` (NaN vira null e tipos do numpy são aceitos). Retornar esta resposta de uma rota
+    evita a passagem pelo `jsonable_encoder` do FastAPI, que domina o custo em payloads grandes.
+    """
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def frame_response(df: pd.DataFrame, response_format: ResponseFormat) -> Response:
+    """
+    Serializa um DataFrame em Arrow IPC (stream) ou Parquet.
+
+    O Arrow IPC pode ser lido pelo cliente sem cópia (`pyarrow.ipc.open_stream(...).read_all()`)
+    e convertido com `to_pandas()`; o Parquet é comprimido e indicado para downloads grandes.
+
+    Args:
+        df (pd.DataFrame): Dados da resposta.
+        response_format (str): 'arrow' ou 'parquet'.
+
+    Raises:
+        HTTPException: 406 se o pyarrow não estiver instalado no servidor.
+    """
+    if pa is None:
+        raise HTTPException(status_code=406, detail=f"Formato '{response_format}' indisponível: pyarrow não instalado")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if response_format == "arrow":
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    return Response(content=buffer.getvalue(), media_type=PARQUET_MEDIA_TYPE)
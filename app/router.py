@@ -1,50 +1,109 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+import numpy as np
 import pandas as pd
 from app import state
 from app.auth import get_current_user
-from app.schemas import PredictionInput, PredictionOutput
-import csv
+from app.store import get_store
+from app.cache import make_cache_key
+from app.timing import TimedRoute, stage, record_many
+from app.responses import FastJSONResponse, ResponseFormat, frame_response
+from app.columnar import ColumnarInputError, parse_columns, validate_columns, column_records
+from src.modeling import RiskModel
+from src.inference import CompiledRiskModel
+from src.feature_engineering import compute_defasagem
+from app.schemas import (
+    PredictionInput, PredictionOutput,
+    BatchPredictionInput, BatchPredictionItem, BatchPredictionOutput
+)
 import os
+import orjson
 from datetime import datetime
-import json
+from typing import Optional
 import time
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Limite de registros por chamada ao /predict/batch (configurável via .env)
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 5000))
 
 
-# Escreve no CSV (Modo Append) << No futuro trocar todo este processo para banco de dados >>
 def log_prediction(log_entry: dict):
-    """Salva a predição no arquivo de logs (CSV)."""
-    LOG_FILE = "data/production_logs.csv"
-    os.makedirs("data", exist_ok=True)
-    
-    file_exists = os.path.isfile(LOG_FILE)
-    
-    # Verifica Schema Evolution (Se adicionarmos novos campos como latency_ms)
-    if file_exists:
-        try:
-            with open(LOG_FILE, 'r', newline='', encoding='utf-8') as f:
-                header = next(csv.reader(f), None)
-            
-            if header:
-                existing_keys = set(header)
-                new_keys = set(log_entry.keys())
-                missing_in_file = new_keys - existing_keys
-                
-                if missing_in_file:
-                    # Reescreve com as novas colunas
-                    df_temp = pd.read_csv(LOG_FILE)
-                    for k in missing_in_file:
-                        df_temp[k] = None # Preenche passados com vazio
-                    df_temp.to_csv(LOG_FILE, index=False)
-        except Exception:
-            pass # Se falhar a migração, tenta append normal
-
-    with open(LOG_FILE, mode="a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=log_entry.keys())
-        if not file_exists or os.path.getsize(LOG_FILE) == 0:
-            writer.writeheader()
-        writer.writerow(log_entry)
+    """Registra uma predição no log de produção (ver `log_predictions`)."""
+    log_predictions([log_entry])
+
+def log_predictions(log_entries: list):
+    """
+    Registra predições no log de produção.
+
+    Se o log em background estiver ativo (`state.LOG_SINK`), apenas enfileira os registros
+    e retorna imediatamente; caso contrário, grava de forma síncrona no CSV.
+
+    Args:
+        log_entries (list): Lista de registros (dict) a serem anexados ao log.
+    """
+    if state.PERFORMANCE_STATS is not None:
+        state.PERFORMANCE_STATS.observe_many(log_entries)
+    if state.DRIFT_MONITOR is not None:
+        state.DRIFT_MONITOR.observe_many(log_entries)
+    if state.LOG_SINK is not None:
+        state.LOG_SINK.submit_many(log_entries)
+    else:
+        write_log_entries(log_entries)
+
+def shadow_predictions(log_entries: list):
+    """Envia as predições já respondidas ao modelo shadow, se o modo shadow estiver ativo (`app.shadow`)."""
+    if state.SHADOW_SCORER is not None:
+        state.SHADOW_SCORER.submit(log_entries)
+
+def write_log_entries(log_entries: list):
+    """Grava um lote de predições no backend de histórico configurado (`app.store`)."""
+    get_store().write(log_entries)
+
+def resolve_defasagem(rows: list):
+    """
+    Calcula no servidor a `Defasagem` dos registros que informam `idade` e `fase`.
+
+    Usa o mesmo motor do treino (`src.feature_engineering.compute_defasagem`), em uma única chamada
+    vetorizada para todo o lote. O valor calculado substitui a `Defasagem` enviada; quando a regra
+    não se aplica (ex: fase não reconhecida), a enviada é mantida, como no treino. Anos de
+    nascimento são convertidos em idade pelo ano corrente.
+
+    Os campos brutos são removidos dos registros, que seguem para o modelo, o cache e o log
+    apenas com as features.
+
+    Args:
+        rows (list): Registros (dict) validados; alterados no lugar.
+
+    Returns:
+        list: Os mesmos registros, sem `idade`/`fase` e com a Defasagem resolvida.
+    """
+    raw = [(row.pop("idade", None), row.pop("fase", None)) for row in rows]
+    targets = [i for i, (idade, fase) in enumerate(raw) if idade is not None and fase is not None]
+    if not targets:
+        return rows
+    lag = compute_defasagem(
+        [raw[i][0] for i in targets], [raw[i][1] for i in targets], default_year=datetime.now().year
+    )
+    for i, value in zip(targets, lag):
+        if not np.isnan(value):
+            rows[i]["Defasagem"] = float(value)
+    return rows
+
+def classify_risk(probability: float, threshold: float):
+    """
+    Define a classe final e o status a partir da probabilidade e do limiar escolhido.
+
+    Se probabilidade >= threshold -> Alto Risco (1), caso contrário -> Baixo Risco (0).
+
+    Returns:
+        tuple: (predição (int), status (str)).
+    """
+    prediction = 1 if probability >= threshold else 0
+    status = "Alto Risco" if prediction == 1 else "Baixo Risco"
+    return prediction, status
 
 @router.post("/predict", 
     response_model=PredictionOutput, 
@@ -52,7 +111,7 @@ def log_prediction(log_entry: dict):
     tags=["Predição"],
     summary="Previsão de Risco Acadêmico"
 )
-def predict(data: PredictionInput):
+def predict(data: PredictionInput, request: Request):
     """
     Processa indicadores educacionais (IAA, IEG, IPS, etc.) para calcular a probabilidade de risco de evasão do aluno.
 
@@ -67,33 +126,49 @@ def predict(data: PredictionInput):
     - **IAN**: Índice de Adequação de Nível
     - **INDE**: Índice de Desenvolvimento Educacional
     - **Defasagem**: Nível de defasagem escolar
+    - **idade** / **fase** (opcionais): dados brutos do aluno; quando informados, a Defasagem é
+      calculada no servidor pela mesma regra do treino (Fase Real - Fase Ideal para a idade)
     """
-    if state.MODEL is None:
+    model, model_version = state.get_active_model()
+    if model is None:
         raise HTTPException(status_code=503, detail="Modelo não carregado")
+    # O header X-Model-Version usa a versão que pontuou a requisição, mesmo se houver troca no meio
+    request.state.model_version = model_version
 
-    # Converte os dados de entrada para DataFrame (formato esperado pelo modelo)
-    input_data = data.model_dump()
-    df = pd.DataFrame([input_data])
+    input_data = resolve_defasagem([data.model_dump()])[0]
+    cache = state.PREDICTION_CACHE
     
     try:
         # --- 1. INFERÊNCIA ---
         start_time = time.perf_counter() # Início da medição de latência
         
         # Calculamos APENAS a probabilidade, pois a classe final será decidida 
-        # dinamicamente com base no threshold do usuário.
-                
-        prob_raw = state.MODEL.predict_proba(df)
+        # dinamicamente com base no threshold do usuário (por isso ela pode vir do cache).
+        cache_key = make_cache_key(input_data) if cache is not None else None
+        probability_value = cache.get(model, cache_key) if cache is not None else None
+        cache_hit = probability_value is not None
         
-        probability_value = prob_raw.flatten()[0]
-        if hasattr(probability_value, "item"):
-            probability_value = probability_value.item()
+        if not cache_hit:
+            batcher = state.MICRO_BATCHER
+            if batcher is not None and batcher.running:
+                # Agrupa com outras requisições concorrentes em uma única chamada ao modelo
+                # (pontuada pelo mesmo modelo usado na chave do cache e no log)
+                probability_value = batcher.predict(input_data, model)
+            else:
+                # Converte os dados de entrada para o formato esperado pelo modelo
+                with stage("frame"):
+                    features = build_features(model, [input_data])
+                prob_raw = predict_proba_timed(model, features)
+                
+                probability_value = prob_raw.flatten()[0]
+                if hasattr(probability_value, "item"):
+                    probability_value = probability_value.item()
+            
+            if cache is not None:
+                cache.put(model, cache_key, probability_value)
 
         # --- 2. Define a predição final baseada no limiar (threshold) escolhido pelo usuário.
-        # Se probabilidade >= threshold -> Alto Risco (1)
-        # Caso contrário -> Baixo Risco (0)
-        prediction_final = 1 if probability_value >= data.threshold else 0
-        
-        status = "Alto Risco" if prediction_final == 1 else "Baixo Risco"
+        prediction_final, status = classify_risk(probability_value, data.threshold)
         
         end_time = time.perf_counter()
         latency_ms = (end_time - start_time) * 1000 # Converte para milissegundos
@@ -108,8 +183,12 @@ def predict(data: PredictionInput):
             log_entry["probability"] = probability_value
             log_entry["status"] = status
             log_entry["latency_ms"] = round(latency_ms, 2)
+            log_entry["cache_hit"] = int(cache_hit)
+            log_entry["model_version"] = model_version
             
-            log_prediction(log_entry)
+            with stage("logging"):
+                log_prediction(log_entry)
+                shadow_predictions([log_entry])
         except Exception as e:
             # Não falha a requisição se o log falhar, apenas imprime erro no console
             print(f"Erro ao salvar log: {e}")
@@ -119,46 +198,516 @@ def predict(data: PredictionInput):
         return PredictionOutput(
             prediction=int(prediction_final), 
             probability=float(probability_value),
-            status=status
+            status=status,
+            model_version=model_version
         )
 
     except Exception as e:
         # Em caso de erro, retorna 500 com detalhes para debug
         raise HTTPException(status_code=500, detail=f"Erro na predição: {str(e)}")
 
+def build_features(model, rows: list):
+    """
+    Monta a entrada do modelo a partir dos registros.
+
+    Modelos que aceitam ndarrays (`accepts_arrays`, ex: motor compilado ou pipeline fundido)
+    recebem uma matriz float na ordem de `feature_cols`, sem alocar DataFrames; os demais
+    recebem um DataFrame.
+
+    Args:
+        model: Modelo em uso.
+        rows (list): Lista de registros (dict).
+
+    Returns:
+        np.ndarray | pd.DataFrame: Entrada para `model.predict_proba`.
+    """
+    feature_cols = getattr(model, "feature_cols", None)
+    if getattr(model, "accepts_arrays", False) is True and isinstance(feature_cols, list):
+        # None vira NaN, que será imputado pela mediana
+        return np.array([[row.get(col) for col in feature_cols] for row in rows], dtype=np.float64)
+    return pd.DataFrame(rows)
+
+def predict_proba_timed(model, features):
+    """
+    Chama `model.predict_proba` registrando a latência de cada etapa (`app.timing`).
+
+    Modelos do projeto (`RiskModel`, `CompiledRiskModel`) informam imputação, padronização e
+    classificador separadamente; para os demais, a chamada inteira conta como 'classifier'.
+    """
+    if isinstance(model, (RiskModel, CompiledRiskModel)):
+        timings = {}
+        probabilities = model.predict_proba(features, timings=timings)
+        record_many(timings)
+        return probabilities
+    with stage("classifier"):
+        return model.predict_proba(features)
+
+def score_rows(rows: list, model=None):
+    """
+    Calcula a probabilidade de risco de vários alunos em uma única chamada ao modelo.
+
+    Args:
+        rows (list): Lista de registros (dict) já validados.
+        model (optional): Modelo a usar. Padrão: o modelo em uso (`state.MODEL`).
+
+    Returns:
+        np.ndarray: Probabilidades da classe de risco, na mesma ordem de `rows`.
+    """
+    model = model if model is not None else state.MODEL
+    with stage("frame"):
+        features = build_features(model, rows)
+    probabilities = np.asarray(predict_proba_timed(model, features), dtype=float).reshape(-1)
+    if len(probabilities) != len(rows):
+        raise ValueError(f"O modelo retornou {len(probabilities)} probabilidades para {len(rows)} registros")
+    return probabilities
+
+def _format_validation_error(error: ValidationError):
+    """Resume os erros de validação do Pydantic em uma única linha."""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+@router.post("/predict/batch",
+    response_model=BatchPredictionOutput,
+    dependencies=[Depends(get_current_user)],
+    tags=["Predição"],
+    summary="Previsão de Risco em Lote"
+)
+def predict_batch(
+    request: Request,
+    data: BatchPredictionInput,
+    response_format: ResponseFormat = Query("json", alias="format")
+):
+    """
+    Calcula o risco de vários alunos em uma única requisição, com uma única chamada vetorizada ao modelo.
+
+    - **records**: Lista de alunos (mesmos campos do `/predict`). O `threshold` individual é ignorado.
+    - **threshold**: Limiar de risco aplicado a todo o lote.
+    - **format**: `json` (padrão), `arrow` (Arrow IPC) ou `parquet`. Nos formatos binários, a resposta
+      é uma tabela com os campos de `results`; a versão do modelo vai no header `X-Model-Version`.
+
+    Os resultados são devolvidos na mesma ordem da entrada. Registros inválidos não derrubam o lote:
+    recebem o campo `error` preenchido e os demais são processados normalmente.
+    O tamanho máximo do lote é definido pela variável de ambiente `MAX_BATCH_SIZE`.
+    """
+    model, model_version = state.get_active_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail="Modelo não carregado")
+    # O header X-Model-Version usa a versão que pontuou a requisição, mesmo se houver troca no meio
+    request.state.model_version = model_version
+
+    if len(data.records) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {len(data.records)} registros excede o limite de {MAX_BATCH_SIZE}"
+        )
+
+    results = [None] * len(data.records)
+    valid_idx, valid_rows = [], []
+
+    # --- 1. VALIDAÇÃO POR REGISTRO ---
+    for i, record in enumerate(data.records):
+        try:
+            parsed = PredictionInput.model_validate(record)
+        except ValidationError as e:
+            results[i] = BatchPredictionItem(index=i, error=_format_validation_error(e))
+            continue
+        row = parsed.model_dump()
+        row["threshold"] = data.threshold
+        valid_idx.append(i)
+        valid_rows.append(row)
+
+    # Defasagem calculada no servidor (idade/fase), uma única vez para o lote
+    resolve_defasagem(valid_rows)
+
+    # --- 2. INFERÊNCIA VETORIZADA ---
+    log_entries = []
+    if valid_rows:
+        start_time = time.perf_counter()
+        cache = state.PREDICTION_CACHE
+        
+        probabilities = np.full(len(valid_rows), np.nan)
+        row_errors = [None] * len(valid_rows)
+        
+        # Consulta o cache e envia ao modelo apenas os registros ainda não calculados
+        if cache is not None:
+            cache_keys = [make_cache_key(row) for row in valid_rows]
+            cached = cache.get_many(model, cache_keys)
+            missing = [j for j, value in enumerate(cached) if value is None]
+            for j, value in enumerate(cached):
+                if value is not None:
+                    probabilities[j] = value
+        else:
+            missing = list(range(len(valid_rows)))
+        lookup_ms = (time.perf_counter() - start_time) * 1000
+        
+        if missing:
+            try:
+                probabilities[missing] = score_rows([valid_rows[j] for j in missing], model)
+            except Exception:
+                # Se o lote falhar, pontua linha a linha para isolar os registros problemáticos
+                for j in missing:
+                    try:
+                        probabilities[j] = score_rows([valid_rows[j]], model)[0]
+                    except Exception as e:
+                        row_errors[j] = f"Erro na predição: {str(e)}"
+            
+            if cache is not None:
+                cache.put_many(model, [
+                    (cache_keys[j], float(probabilities[j])) for j in missing if row_errors[j] is None
+                ])
+        
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        # Latência amortizada por aluno, comparável com a do /predict: os acertos do cache ficam
+        # só com a consulta ao cache e o tempo do modelo é dividido entre os registros pontuados
+        hit_latency_ms = lookup_ms / len(valid_rows)
+        miss_latency_ms = (latency_ms - hit_latency_ms * (len(valid_rows) - len(missing))) / max(len(missing), 1)
+        missing_set = set(missing)
+        timestamp = datetime.now().isoformat()
+
+        for j, (i, row, probability_value, error) in enumerate(zip(valid_idx, valid_rows, probabilities, row_errors)):
+            if error is not None:
+                results[i] = BatchPredictionItem(index=i, error=error)
+                continue
+
+            probability_value = float(probability_value)
+            prediction_final, status = classify_risk(probability_value, data.threshold)
+            results[i] = BatchPredictionItem(
+                index=i, prediction=prediction_final, probability=probability_value, status=status
+            )
+
+            log_entry = row.copy()
+            log_entry["timestamp"] = timestamp
+            log_entry["prediction"] = prediction_final
+            log_entry["probability"] = probability_value
+            log_entry["status"] = status
+            cache_hit = j not in missing_set
+            log_entry["latency_ms"] = round(hit_latency_ms if cache_hit else miss_latency_ms, 4)
+            log_entry["cache_hit"] = int(cache_hit)
+            log_entry["model_version"] = model_version
+            log_entries.append(log_entry)
+
+    # --- 3. LOGGING (uma única escrita para todo o lote) ---
+    try:
+        with stage("logging"):
+            log_predictions(log_entries)
+            shadow_predictions(log_entries)
+    except Exception as e:
+        print(f"Erro ao salvar log: {e}")
+
+    output = BatchPredictionOutput(
+        results=results,
+        total=len(results),
+        errors=sum(1 for r in results if r.error is not None),
+        model_version=model_version
+    )
+    if response_format != "json":
+        columns = list(BatchPredictionItem.model_fields)
+        return frame_response(pd.DataFrame([r.model_dump() for r in results], columns=columns), response_format)
+    # Serialização única (sem revalidar o response_model nem passar pelo jsonable_encoder)
+    return FastJSONResponse(output)
+
+def build_column_features(model, frame: pd.DataFrame):
+    """
+    Equivalente de `build_features` para entradas columnares (uma coluna por feature).
+
+    Modelos que aceitam ndarrays recebem as colunas empilhadas na ordem de `feature_cols`,
+    sem criar objetos por linha; os demais recebem o próprio DataFrame.
+    """
+    feature_cols = getattr(model, "feature_cols", None)
+    if getattr(model, "accepts_arrays", False) is True and isinstance(feature_cols, list):
+        return frame[feature_cols].to_numpy(dtype=np.float64)
+    return frame
+
+def score_columns(frame: pd.DataFrame, errors: np.ndarray, threshold: float, model, model_version):
+    """
+    Pontua um lote columnar já validado, com uma única chamada ao modelo.
+
+    Linhas com erro de validação não são enviadas ao modelo nem registradas no log.
+
+    Args:
+        frame (pd.DataFrame): Features (uma coluna por item de `FEATURE_COLS`, NaN = ausente).
+        errors (np.ndarray): Mensagem de erro por linha (None nas linhas válidas).
+        threshold (float): Limiar de risco aplicado a todo o lote.
+        model: Modelo em uso.
+        model_version (str): Versão do modelo em uso.
+
+    Returns:
+        pd.DataFrame: Colunas de `BatchPredictionItem`, na ordem da entrada.
+    """
+    n_rows = len(frame)
+    valid = np.array([e is None for e in errors], dtype=bool)
+    valid_frame = frame if valid.all() else frame[valid]
+    probabilities = np.full(n_rows, np.nan)
+    start_time = time.perf_counter()
+    if valid.any():
+        with stage("frame"):
+            features = build_column_features(model, valid_frame)
+        scored = np.asarray(predict_proba_timed(model, features), dtype=float).reshape(-1)
+        if len(scored) != len(valid_frame):
+            raise ValueError(f"O modelo retornou {len(scored)} probabilidades para {len(valid_frame)} registros")
+        probabilities[valid] = scored
+    latency_ms = (time.perf_counter() - start_time) * 1000
+
+    # Classificação vetorizada (mesma regra de `classify_risk`)
+    high_risk = probabilities >= threshold
+    prediction = np.where(high_risk, 1, 0).astype(object)
+    status = np.where(high_risk, "Alto Risco", "Baixo Risco").astype(object)
+    prediction[~valid] = None
+    status[~valid] = None
+    result = pd.DataFrame({
+        "index": np.arange(n_rows),
+        "prediction": prediction,
+        "probability": probabilities,
+        "status": status,
+        "error": errors,
+    })
+
+    # --- LOGGING (somente as linhas pontuadas; NaN vira None, como no /predict/batch) ---
+    if valid.any():
+        try:
+            with stage("logging"):
+                n_valid = len(valid_frame)
+                log_columns = {col: valid_frame[col].to_numpy() for col in valid_frame.columns}
+                log_columns["threshold"] = np.full(n_valid, threshold)
+                log_columns["timestamp"] = np.full(n_valid, datetime.now().isoformat(), dtype=object)
+                log_columns["prediction"] = prediction[valid]
+                log_columns["probability"] = probabilities[valid]
+                log_columns["status"] = status[valid]
+                log_columns["latency_ms"] = np.full(n_valid, round(latency_ms / n_valid, 4))
+                log_columns["model_version"] = np.full(n_valid, model_version, dtype=object)
+                log_entries = column_records(log_columns)
+                log_predictions(log_entries)
+                shadow_predictions(log_entries)
+        except Exception as e:
+            print(f"Erro ao salvar log: {e}")
+    return result
+
+@router.post("/predict/batch/columnar",
+    response_model=BatchPredictionOutput,
+    dependencies=[Depends(get_current_user)],
+    tags=["Predição"],
+    summary="Previsão de Risco em Lote (formato columnar)",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {
+                    "type": "object",
+                    "properties": {
+                        "columns": {
+                            "type": "object",
+                            "additionalProperties": {"type": "array", "items": {"type": ["number", "null"]}}
+                        },
+                        "threshold": {"type": "number", "minimum": 0.0, "maximum": 1.0}
+                    },
+                    "required": ["columns"]
+                }, "example": {
+                    "columns": {"IAA": [5.5, 8.1], "IEG": [6.2, 7.9], "IDA": [8.0, None], "Defasagem": [0.0, -1.0]},
+                    "threshold": 0.5
+                }},
+                "application/vnd.apache.arrow.stream": {"schema": {"type": "string", "format": "binary"}},
+                "application/x-npy": {"schema": {"type": "string", "format": "binary"}},
+            }
+        }
+    }
+)
+async def predict_batch_columnar(
+    request: Request,
+    threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="Limiar de risco (padrão 0.5)"),
+    response_format: ResponseFormat = Query("json", alias="format")
+):
+    """
+    Calcula o risco de um lote enviado por coluna, sem criar um objeto por aluno.
+
+    O corpo traz um array por feature, em um dos formatos (pelo `Content-Type`):
+    - **application/json**: `{"columns": {"IAA": [...], ...}, "threshold": 0.5}`.
+    - **application/vnd.apache.arrow.stream**: tabela Arrow IPC com uma coluna por feature.
+    - **application/x-npy**: array `.npy` estruturado (um campo por feature) ou 2D na ordem de `FEATURE_COLS`.
+
+    Features ausentes e valores nulos são imputados pela mediana, como no `/predict`. A validação
+    roda sobre as colunas inteiras: valores infinitos ou fora da faixa (`FEATURE_RANGES`) marcam
+    apenas a própria linha com `error`. Com as colunas `idade` e `fase`, a Defasagem é calculada
+    no servidor, como no `/predict`. Colunas desconhecidas ou de tamanhos diferentes invalidam
+    o lote (422); Content-Type não suportado responde 415. A resposta é a mesma do `/predict/batch`
+    (inclusive `format=arrow|parquet`) e o cache de predições não é consultado.
+    """
+    model, model_version = state.get_active_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail="Modelo não carregado")
+    # O header X-Model-Version usa a versão que pontuou a requisição, mesmo se houver troca no meio
+    request.state.model_version = model_version
+
+    body = await request.body()
+    try:
+        with stage("validation"):
+            columns, body_threshold = parse_columns(body, request.headers.get("content-type"))
+            frame, errors = validate_columns(columns)
+    except ColumnarInputError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    if threshold is None:
+        threshold = body_threshold if body_threshold is not None else 0.5
+    if not isinstance(threshold, (int, float)) or not 0.0 <= threshold <= 1.0:
+        raise HTTPException(status_code=422, detail="threshold deve estar entre 0.0 e 1.0")
+    if len(frame) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {len(frame)} registros excede o limite de {MAX_BATCH_SIZE}"
+        )
+
+    try:
+        result = await run_in_threadpool(score_columns, frame, errors, float(threshold), model, model_version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na predição: {str(e)}")
+
+    if response_format != "json":
+        return frame_response(result, response_format)
+    return FastJSONResponse({
+        "results": column_records({
+            "index": result["index"].to_numpy(),
+            "prediction": result["prediction"].to_numpy(),
+            "probability": result["probability"].to_numpy(),
+            "status": result["status"].to_numpy(),
+            "error": result["error"].to_numpy(),
+        }),
+        "total": len(result),
+        "errors": int(result["error"].notna().sum()),
+        "model_version": model_version,
+    })
+
 @router.get("/history",
     dependencies=[Depends(get_current_user)],
     tags=["Monitoramento"],
     summary="Histórico de Predições",
     description="Retorna os dados de entrada das últimas predições para análise de Drift."
 )
-def get_prediction_history(limit: int = 100):
+def get_prediction_history(
+    limit: int = 100,
+    offset: int = 0,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = None,
+    response_format: ResponseFormat = Query("json", alias="format")
+):
     """
-    Lê o arquivo de logs e retorna como JSON.
+    Consulta o histórico de predições (do mais recente para o mais antigo).
     Args:
         limit (int): Número máximo de registros para retornar (padrão: 100). 
                      Use 0 para retornar todo o histórico.
+        offset (int): Quantidade de registros mais recentes a pular (paginação).
+        start (datetime, optional): Retorna apenas predições a partir deste instante.
+        end (datetime, optional): Retorna apenas predições até este instante.
+        status (str, optional): Filtra pelo status (ex: "Alto Risco").
+        format (str): `json` (padrão), `arrow` (Arrow IPC, leitura sem cópia no pandas) ou `parquet`.
     """
-    LOG_FILE = "data/production_logs.csv"
-    import os
-    if not os.path.exists(LOG_FILE):
-        return []
-    
+    filters = dict(
+        limit=limit,
+        offset=max(offset, 0),
+        start=start.isoformat() if start else None,
+        end=end.isoformat() if end else None,
+        status=status
+    )
     try:
-        # Leitura otimizada: ler tudo mas retornar apenas os últimos 'limit'
-        # Futuro migrar para BANCO de DADOS
-        df = pd.read_csv(LOG_FILE)
-        
-        # Pega os últimos N registros (Se limit > 0)
-        # Se limit <= 0, retorna TUDO.
-        if limit > 0:
-            df_limited = df.tail(limit)
+        if response_format != "json":
+            df = get_store().query_frame(**filters)
         else:
-            df_limited = df
-        
-        # Ordena do mais recente para o mais antigo
-        df_limited = df_limited[::-1]
-        
-        return json.loads(df_limited.to_json(orient="records"))
+            records = get_store().query(**filters)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao ler histórico: {str(e)}")
+
+    if response_format != "json":
+        return frame_response(df, response_format)
+    return FastJSONResponse(records)
+
+@router.get("/stats/performance",
+    dependencies=[Depends(get_current_user)],
+    tags=["Monitoramento"],
+    summary="KPIs de Performance",
+    description="Latência (média, desvio, P50/P95/P99) e volume por minuto, calculados de forma incremental na API."
+)
+def get_performance_stats():
+    """
+    Retorna os agregados de performance mantidos em memória pela API.
+
+    - **latency_ms**: média, desvio padrão, mínimo, máximo e quantis (sketch com erro relativo de 1%)
+      das predições pontuadas pelo modelo (histórico carregado na inicialização + novas predições).
+    - **cache_hits** / **cache_hit_latency_ms**: total e latência das respostas servidas pelo cache de
+      predições, mantidas fora dos quantis acima para não mascarar o custo real do modelo.
+    - **series**: requisições, acertos do cache e latência média/máxima (apenas chamadas ao modelo)
+      por minuto na janela móvel (`STATS_WINDOW_MINUTES`).
+    """
+    if state.PERFORMANCE_STATS is None:
+        raise HTTPException(status_code=503, detail="Estatísticas de performance não inicializadas")
+    return state.PERFORMANCE_STATS.snapshot()
+
+@router.get("/drift",
+    dependencies=[Depends(get_current_user)],
+    tags=["Monitoramento"],
+    summary="Data Drift por Feature",
+    description="KS, PSI e taxa de nulos das features de produção em relação aos dados de treino, a partir de histogramas incrementais."
+)
+def get_drift():
+    """
+    Compara a distribuição das features recebidas em produção com a referência de treino.
+
+    - **ks / p_value**: estatística e p-valor do teste de Kolmogorov-Smirnov, calculados sobre as
+      ECDFs discretizadas nos percentis da referência.
+    - **psi**: Population Stability Index nas faixas de decis da referência.
+    - **null_rate**: proporção de valores ausentes em produção (e `reference_null_rate` no treino).
+    - **drift**: True se `p_value` < `p_value_threshold`.
+    """
+    if state.DRIFT_MONITOR is None:
+        raise HTTPException(status_code=503, detail="Monitor de drift não inicializado")
+    return state.DRIFT_MONITOR.report()
+
+def _ndjson_chunks(records, limit: int, chunk_size: int = 500):
+    """
+    Serializa registros (cursor, dict) em NDJSON, agrupando linhas em blocos para o streaming.
+
+    Usa o `orjson`, como o `FastJSONResponse`: NaN e infinitos viram null, então cada linha é
+    JSON válido mesmo com valores ausentes no histórico.
+    """
+    lines = []
+    for count, (cursor, record) in enumerate(records, start=1):
+        record["_cursor"] = cursor
+        lines.append(orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY))
+        if len(lines) >= chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+        if limit > 0 and count >= limit:
+            break
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+@router.get("/history/stream",
+    dependencies=[Depends(get_current_user)],
+    tags=["Monitoramento"],
+    summary="Histórico de Predições (Streaming NDJSON)",
+    description="Transmite o histórico em NDJSON (um registro JSON por linha), do mais recente para o mais antigo, "
+                "sem carregar o log inteiro em memória."
+)
+def stream_prediction_history(
+    limit: int = 0,
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Transmite o histórico de predições em NDJSON (`application/x-ndjson`).
+
+    Cada linha traz o campo `_cursor`; para buscar a página seguinte (registros mais antigos),
+    repita a chamada com `cursor` igual ao `_cursor` da última linha recebida.
+    Args:
+        limit (int): Número máximo de registros (0 = sem limite).
+        since (datetime, optional): Retorna apenas predições posteriores a este instante
+            (útil para buscar somente o que chegou desde a última atualização).
+        cursor (str, optional): Continua a leitura a partir de uma página anterior.
+    """
+    store = get_store()
+    # Validado antes do streaming: depois que a resposta começa, o status 200 já foi enviado
+    try:
+        cursor = store.parse_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Cursor inválido: {cursor}")
+    records = store.iter_records(since=since.isoformat() if since else None, cursor=cursor)
+    return StreamingResponse(_ndjson_chunks(records, limit), media_type="application/x-ndjson")
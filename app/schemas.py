@@ -1,4 +1,32 @@
-from pydantic import BaseModel, Field, ConfigDict
+import math
+
+from pydantic import BaseModel, Field, ConfigDict, ValidationInfo, field_validator
+from pydantic_core import PydanticCustomError
+
+from src.config import FEATURE_COLS, FEATURE_RANGES
+
+# Mensagens da validação das features, as mesmas nas rotas por registro e na columnar
+NON_FINITE_ERROR = "valor não finito"
+
+def out_of_range_error(low, high):
+    return f"fora da faixa [{low}, {high}]"
+
+def check_feature_value(col: str, value):
+    """
+    Valida uma feature contra `FEATURE_RANGES`: valores infinitos, NaN ou fora da faixa são recusados.
+
+    Raises:
+        PydanticCustomError: Com a mesma mensagem usada pelo `validate_columns` da rota columnar.
+    """
+    if value is None:
+        return value
+    if not math.isfinite(value):
+        raise PydanticCustomError("feature_not_finite", NON_FINITE_ERROR)
+    low, high = FEATURE_RANGES.get(col, (-math.inf, math.inf))
+    if not low <= value <= high:
+        raise PydanticCustomError("feature_out_of_range", out_of_range_error(low, high))
+    return value
+
 
 class PredictionInput(BaseModel):
     model_config = ConfigDict(json_schema_extra={
@@ -24,9 +52,53 @@ class PredictionInput(BaseModel):
     IAN: float | None = Field(None, description="Índice de Adequação de Nível")
     INDE: float | None = Field(None, description="Índice de Desenvolvimento Educacional")
     Defasagem: float | None = Field(None, description="Defasagem Escolar")
+    idade: float | None = Field(
+        None, description="Idade do aluno (ou ano de nascimento). Com `fase`, a Defasagem é calculada no servidor"
+    )
+    fase: int | str | None = Field(
+        None, description="Fase atual do aluno (ex: 'ALFA', 'Fase 3', '4B' ou 3). Com `idade`, a Defasagem é calculada no servidor"
+    )
     threshold: float = Field(0.5, description="Limiar de Risco (0.0 a 1.0)", ge=0.0, le=1.0)
 
+    @field_validator(*FEATURE_COLS)
+    @classmethod
+    def _check_feature_range(cls, value, info: ValidationInfo):
+        return check_feature_value(info.field_name, value)
+
 class PredictionOutput(BaseModel):
     prediction: int = Field(..., description="Predição de Risco (0 ou 1)")
     probability: float = Field(..., description="Probabilidade de Risco")
     status: str = Field(..., description="Status de Risco (Ex: Baixo Risco, Alto Risco)")
+    model_version: str | None = Field(None, description="Versão do modelo que gerou a predição")
+
+
+class BatchPredictionInput(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "records": [
+                {"IAA": 5.5, "IEG": 6.2, "IPS": 7.0, "IDA": 8.0, "IPP": 4.5,
+                 "IPV": 6.1, "IAN": 5.0, "INDE": 6.5, "Defasagem": 0.0},
+                {"IAA": 8.1, "IEG": 7.9, "IPS": 6.3, "IDA": 7.2, "IPP": 6.8,
+                 "IPV": 7.5, "IAN": 10.0, "INDE": 7.7, "Defasagem": -1.0}
+            ],
+            "threshold": 0.5
+        }
+    })
+
+    # Os registros são validados individualmente no endpoint (e não pelo FastAPI),
+    # para que um aluno inválido gere erro apenas na sua própria linha.
+    records: list[dict] = Field(..., description="Lista de alunos no mesmo formato de PredictionInput")
+    threshold: float = Field(0.5, description="Limiar de Risco aplicado a todo o lote (0.0 a 1.0)", ge=0.0, le=1.0)
+
+class BatchPredictionItem(BaseModel):
+    index: int = Field(..., description="Posição do registro no lote de entrada")
+    prediction: int | None = Field(None, description="Predição de Risco (0 ou 1)")
+    probability: float | None = Field(None, description="Probabilidade de Risco")
+    status: str | None = Field(None, description="Status de Risco (Ex: Baixo Risco, Alto Risco)")
+    error: str | None = Field(None, description="Mensagem de erro do registro, se houver")
+
+class BatchPredictionOutput(BaseModel):
+    results: list[BatchPredictionItem] = Field(..., description="Resultados na mesma ordem da entrada")
+    total: int = Field(..., description="Quantidade de registros recebidos")
+    errors: int = Field(..., description="Quantidade de registros com erro")
+    model_version: str | None = Field(None, description="Versão do modelo que gerou as predições")
@@ -0,0 +1,203 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+from app.model_loader import prepare_model
+from app.registry import MODEL_REGISTRY_DIR, MODEL_FILENAME, artifact_version
+from app.router import build_features, classify_risk
+from app.store import CSVPredictionStore, ShardedCSVPredictionStore, PREDICTION_LOG_PER_WORKER
+from src.config import FEATURE_COLS
+
+# Modelo candidato avaliado em paralelo ao modelo em produção (vazio desativa o modo shadow).
+# Aceita o caminho de um .joblib ou o nome de uma versão do registro.
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH", "")
+SHADOW_LOG_FILE = os.getenv("SHADOW_LOG_FILE", "data/shadow_logs.csv")
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", 10000))
+SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", 256))
+
+# --- Métricas Prometheus ---
+SHADOW_SCORED = Counter(
+    "shadow_predictions_total", "Predições pontuadas pelo modelo shadow",
+    ["agreement"]
+)
+SHADOW_ABS_DIFF = Histogram(
+    "shadow_probability_abs_diff", "Diferença absoluta entre as probabilidades do modelo shadow e do modelo em produção",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0)
+)
+SHADOW_LATENCY = Histogram(
+    "shadow_latency_seconds", "Latência de inferência por aluno de cada modelo (produção x shadow)",
+    ["model"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+)
+SHADOW_DROPPED = Counter(
+    "shadow_dropped_total", "Registros não avaliados pelo modelo shadow",
+    ["reason"]
+)
+
+
+def load_shadow_model(path_or_version: str):
+    """
+    Carrega o modelo candidato para o modo shadow.
+
+    Args:
+        path_or_version (str): Caminho de um .joblib ou nome de uma versão do registro.
+
+    Returns:
+        tuple: (modelo preparado para servir, versão).
+    """
+    path = Path(path_or_version)
+    if not path.is_file():
+        path = Path(MODEL_REGISTRY_DIR) / path_or_version / MODEL_FILENAME
+        version = path_or_version
+    else:
+        version = artifact_version(path, prefix="shadow")
+    if not path.is_file():
+        raise FileNotFoundError(f"Modelo shadow não encontrado: {path_or_version}")
+    return prepare_model(joblib.load(path)), version
+
+
+class ShadowScorer:
+    """
+    Avalia um modelo candidato com o tráfego real, fora do caminho das requisições.
+
+    As rotas de predição apenas enfileiram (`submit`, sem bloquear) os registros já respondidos
+    pelo modelo em produção. Uma thread dedicada pontua esses registros em lotes com o modelo
+    shadow, grava as duas probabilidades lado a lado em um log próprio e atualiza as métricas de
+    concordância, diferença de probabilidade e latência. A fila é limitada: se o shadow não
+    acompanhar o tráfego, os registros excedentes são descartados (métrica `shadow_dropped_total`),
+    nunca atrasando a resposta da API.
+
+    Attributes:
+        model: Modelo candidato (já preparado com `prepare_model`).
+        version (str): Versão do modelo candidato.
+        writer (callable): Grava uma lista de registros de comparação.
+        batch_size (int): Quantidade máxima de registros por chamada ao modelo shadow.
+    """
+    def __init__(self, model, version, writer, max_queue_size=10000, batch_size=256):
+        self.model = model
+        self.version = version
+        self.writer = writer
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread de avaliação."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Encerra a thread após avaliar o que já estava na fila."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, entries: list):
+        """
+        Enfileira registros de predição (mesmo formato do log de produção) sem bloquear.
+
+        Returns:
+            int: Quantidade de registros aceitos.
+        """
+        accepted = 0
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+                accepted += 1
+            except queue.Full:
+                SHADOW_DROPPED.labels(reason="queue_full").inc()
+        return accepted
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            start_time = time.perf_counter()
+            shadow_probs = np.asarray(
+                self.model.predict_proba(build_features(self.model, batch)), dtype=float
+            ).reshape(-1)
+            row_latency = (time.perf_counter() - start_time) / len(batch)
+        except Exception as e:
+            SHADOW_DROPPED.labels(reason="model_error").inc(len(batch))
+            print(f"Erro no modelo shadow: {e}")
+            return
+
+        timestamp = datetime.now().isoformat()
+        records = []
+        for entry, shadow_prob in zip(batch, shadow_probs):
+            shadow_prob = float(shadow_prob)
+            primary_prob = float(entry["probability"])
+            shadow_prediction, _ = classify_risk(shadow_prob, entry.get("threshold", 0.5))
+            agreement = shadow_prediction == entry["prediction"]
+            abs_diff = abs(shadow_prob - primary_prob)
+
+            SHADOW_SCORED.labels(agreement=str(agreement).lower()).inc()
+            SHADOW_ABS_DIFF.observe(abs_diff)
+            SHADOW_LATENCY.labels(model="shadow").observe(row_latency)
+            # Respostas do cache não refletem o custo do modelo primário
+            if entry.get("latency_ms") is not None and entry.get("cache_hit") != 1:
+                SHADOW_LATENCY.labels(model="primary").observe(entry["latency_ms"] / 1000)
+
+            record = {col: entry.get(col) for col in FEATURE_COLS}
+            record.update({
+                "timestamp": timestamp,
+                "request_timestamp": entry.get("timestamp"),
+                "threshold": entry.get("threshold"),
+                "primary_version": entry.get("model_version"),
+                "primary_probability": primary_prob,
+                "primary_prediction": entry["prediction"],
+                "primary_latency_ms": entry.get("latency_ms"),
+                "shadow_version": self.version,
+                "shadow_probability": shadow_prob,
+                "shadow_prediction": shadow_prediction,
+                "shadow_latency_ms": round(row_latency * 1000, 4),
+                "abs_diff": abs_diff,
+                "agreement": int(agreement),
+            })
+            records.append(record)
+
+        try:
+            self.writer(records)
+        except Exception as e:
+            SHADOW_DROPPED.labels(reason="write_error").inc(len(records))
+            print(f"Erro ao salvar log do shadow: {e}")
+
+
+def create_shadow_scorer(path_or_version: str = SHADOW_MODEL_PATH):
+    """
+    Cria o avaliador shadow a partir da configuração (`SHADOW_MODEL_PATH`).
+
+    Returns:
+        ShadowScorer | None: None se o modo shadow estiver desativado.
+    """
+    if not path_or_version:
+        return None
+    model, version = load_shadow_model(path_or_version)
+    store = (ShardedCSVPredictionStore if PREDICTION_LOG_PER_WORKER else CSVPredictionStore)(SHADOW_LOG_FILE)
+    return ShadowScorer(
+        model, version, store.write,
+        max_queue_size=SHADOW_QUEUE_SIZE, batch_size=SHADOW_BATCH_SIZE
+    )
@@ -1,9 +1,49 @@
 import os
 import sys
+import threading
 
 # Variáveis globais para armazenar artefatos carregados
 MODEL = None
 
+# Versão do modelo em uso (pasta do registro ou hash do artefato padrão)
+MODEL_VERSION = None
+
+# Gerenciador de versões/hot reload do modelo (ModelManager), criado no lifespan
+MODEL_MANAGER = None
+
+# Avaliação de um modelo candidato em paralelo ao de produção (ShadowScorer, opcional)
+SHADOW_SCORER = None
+
+# Agregados de latência/volume para o /stats/performance (PerformanceStats), criado no lifespan
+PERFORMANCE_STATS = None
+
+# Histogramas de produção por feature para o /drift (DriftMonitor), criado no lifespan
+DRIFT_MONITOR = None
+
+_MODEL_LOCK = threading.Lock()
+
+# Log de predições em background (PredictionLogSink), iniciado no lifespan
+LOG_SINK = None
+
+# Cache de probabilidades (PredictionCache), criado no lifespan
+PREDICTION_CACHE = None
+
+# Micro-batcher de requisições concorrentes ao /predict (opcional, criado no lifespan)
+MICRO_BATCHER = None
+
 # Placeholders para métricas (podem ser expandidos)
 REQUEST_COUNT = None
 REQUEST_LATENCY = None
+
+
+def set_active_model(model, version):
+    """Troca o modelo e a versão em uso de uma só vez (atômico para `get_active_model`)."""
+    global MODEL, MODEL_VERSION
+    with _MODEL_LOCK:
+        MODEL = model
+        MODEL_VERSION = version
+
+def get_active_model():
+    """Retorna o par (modelo, versão) em uso, consistente mesmo durante uma troca de modelo."""
+    with _MODEL_LOCK:
+        return MODEL, MODEL_VERSION
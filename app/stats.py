@@ -0,0 +1,219 @@
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis com erro relativo limitado (buckets logarítmicos, no estilo DDSketch).
+
+    Cada valor positivo cai no bucket `ceil(log(x) / log(gamma))`, com
+    `gamma = (1 + alpha) / (1 - alpha)`. Qualquer quantil é estimado com erro relativo de no
+    máximo `alpha` (1% por padrão), usando memória proporcional ao intervalo de valores (e não à
+    quantidade de observações).
+
+    Attributes:
+        alpha (float): Erro relativo máximo das estimativas.
+        count (int): Quantidade de valores observados.
+    """
+    def __init__(self, alpha=0.01, min_value=1e-6):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1):
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += count
+
+    def quantile(self, q: float):
+        """Estimativa do quantil `q` (0 a 1), ou None se não houver observações."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # Ponto do bucket que minimiza o erro relativo
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RunningMoments:
+    """Média e desvio padrão incrementais (algoritmo de Welford), mais mínimo e máximo."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def std(self):
+        """Desvio padrão amostral (mesma convenção do `pandas.Series.std`)."""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class PerformanceStats:
+    """
+    Agregados de latência e volume atualizados a cada predição registrada.
+
+    Mantém, desde o início (incluindo o histórico carregado com `seed`):
+    média/desvio (Welford) e sketch de quantis da `latency_ms`. Registros respondidos pelo cache
+    (`cache_hit` = 1) têm agregados próprios, para não puxarem para baixo os quantis de quem foi
+    pontuado pelo modelo; registros sem o campo (histórico antigo) contam como chamadas ao modelo.
+    Para a janela móvel de `window_minutes`, mantém contadores por minuto (requisições, acertos do
+    cache, soma e máximo da latência das chamadas ao modelo).
+    Todas as operações são O(1) por registro; `snapshot` é O(minutos na janela + buckets).
+
+    Attributes:
+        window_minutes (int): Tamanho da janela da série temporal, em minutos.
+    """
+    def __init__(self, window_minutes=60, alpha=0.01):
+        self.window_minutes = window_minutes
+        self.total_requests = 0
+        self.cache_hits = 0
+        self.seeding = False
+        self._moments = RunningMoments()
+        self._sketch = QuantileSketch(alpha=alpha)
+        self._cache_moments = RunningMoments()
+        self._cache_sketch = QuantileSketch(alpha=alpha)
+        self._minutes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _window_start(self, now=None):
+        now = now or datetime.now()
+        return (now - timedelta(minutes=self.window_minutes - 1)).strftime("%Y-%m-%dT%H:%M")
+
+    def observe_many(self, entries: list):
+        """
+        Atualiza os agregados com registros de predição (mesmo formato do log).
+
+        Args:
+            entries (list): Registros com `latency_ms` e `timestamp` (ISO).
+        """
+        window_start = self._window_start()
+        with self._lock:
+            for entry in entries:
+                self._observe(entry, window_start)
+            self._evict(window_start)
+
+    def _observe(self, entry, window_start):
+        self.total_requests += 1
+        latency = entry.get("latency_ms")
+        valid_latency = isinstance(latency, (int, float)) and not math.isnan(latency)
+        cache_hit = entry.get("cache_hit") == 1
+        self.cache_hits += cache_hit
+        if valid_latency:
+            moments, sketch = (self._cache_moments, self._cache_sketch) if cache_hit else (self._moments, self._sketch)
+            moments.add(float(latency))
+            sketch.add(float(latency))
+
+        minute = str(entry.get("timestamp") or "")[:16]
+        if minute < window_start:
+            return
+        bucket = self._minutes.get(minute)
+        if bucket is None:
+            last_minute = next(reversed(self._minutes), None)
+            bucket = self._minutes[minute] = [0, 0.0, 0, None, 0]
+            # Minuto fora de ordem (ex: histórico lido do mais novo para o mais antigo): reordena
+            if last_minute is not None and minute < last_minute:
+                self._minutes = OrderedDict(sorted(self._minutes.items()))
+        bucket[0] += 1
+        if cache_hit:
+            bucket[4] += 1
+        elif valid_latency:
+            bucket[1] += latency
+            bucket[2] += 1
+            bucket[3] = latency if bucket[3] is None else max(bucket[3], latency)
+
+    def _evict(self, window_start):
+        while self._minutes and next(iter(self._minutes)) < window_start:
+            self._minutes.popitem(last=False)
+
+    def seed(self, records, until: str = None):
+        """
+        Carrega o histórico existente nos agregados (ex: na inicialização da API).
+
+        Args:
+            records (iterable): Registros do histórico (dict), em qualquer ordem.
+            until (str, optional): Ignora registros com timestamp >= `until`, que já foram
+                contabilizados ao serem registrados por esta instância.
+        """
+        self.seeding = True
+        try:
+            window_start = self._window_start()
+            batch = []
+            for record in records:
+                if until is not None and str(record.get("timestamp") or "") >= until:
+                    continue
+                batch.append(record)
+                if len(batch) >= 1000:
+                    with self._lock:
+                        for entry in batch:
+                            self._observe(entry, window_start)
+                    batch = []
+            with self._lock:
+                for entry in batch:
+                    self._observe(entry, window_start)
+                self._evict(self._window_start())
+        finally:
+            self.seeding = False
+
+    def snapshot(self):
+        """KPIs de latência e série por minuto da janela, prontos para o `/stats/performance`."""
+        with self._lock:
+            self._evict(self._window_start())
+            series = [
+                {
+                    "minute": minute,
+                    "requests": count,
+                    "cache_hits": hits,
+                    "avg_latency_ms": round(latency_sum / latency_count, 4) if latency_count else None,
+                    "max_latency_ms": latency_max,
+                }
+                for minute, (count, latency_sum, latency_count, latency_max, hits) in self._minutes.items()
+            ]
+            return {
+                "total_requests": self.total_requests,
+                "latency_ms": _latency_summary(self._moments, self._sketch),
+                "cache_hits": self.cache_hits,
+                "cache_hit_latency_ms": _latency_summary(self._cache_moments, self._cache_sketch),
+                "window_minutes": self.window_minutes,
+                "requests_last_window": sum(point["requests"] for point in series),
+                "series": series,
+                "seeding": self.seeding,
+            }
+
+
+def _latency_summary(moments, sketch):
+    """Resumo (média, desvio, extremos e quantis) de uma distribuição de latência."""
+    return {
+        "count": moments.count,
+        "mean": moments.mean if moments.count else None,
+        "std": moments.std,
+        "min": moments.min,
+        "max": moments.max,
+        "p50": sketch.quantile(0.50),
+        "p95": sketch.quantile(0.95),
+        "p99": sketch.quantile(0.99),
+    }
@@ -0,0 +1,510 @@
+import os
+import re
+import csv
+import glob
+import heapq
+import sqlite3
+import threading
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Backend do histórico de predições: 'csv' (padrão) ou 'sqlite' (embarcado, indexado)
+PREDICTION_STORE = os.getenv("PREDICTION_STORE", "csv").lower()
+LOG_FILE = os.getenv("PREDICTION_LOG_FILE", "data/production_logs.csv")
+DB_FILE = os.getenv("PREDICTION_DB_FILE", "data/production_logs.db")
+# Vários workers: cada processo grava o seu próprio CSV (production_logs.<pid>.csv), unidos na leitura
+PREDICTION_LOG_PER_WORKER = os.getenv("PREDICTION_LOG_PER_WORKER", "false").lower() in ("1", "true", "yes")
+
+_IDENTIFIER = re.compile(r"^\w+$")
+
+
+class PredictionStore:
+    """
+    Interface dos backends de armazenamento do histórico de predições.
+
+    `write` recebe lotes de registros (dict) vindos do log em background; `query` devolve os
+    registros do mais recente para o mais antigo, com filtros opcionais de período e status.
+    """
+    def write(self, entries: list):
+        raise NotImplementedError
+
+    def query(self, limit: int = 100, offset: int = 0, start: str = None, end: str = None, status: str = None):
+        """
+        Consulta o histórico.
+
+        Args:
+            limit (int): Máximo de registros (0 retorna todos).
+            offset (int): Quantidade de registros (mais recentes) a pular, para paginação.
+            start (str, optional): Timestamp ISO mínimo (inclusivo).
+            end (str, optional): Timestamp ISO máximo (inclusivo).
+            status (str, optional): Filtra pelo status (ex: 'Alto Risco').
+
+        Returns:
+            list: Registros (dict) do mais recente para o mais antigo.
+        """
+        raise NotImplementedError
+
+    def query_frame(self, limit: int = 100, offset: int = 0, start: str = None, end: str = None, status: str = None):
+        """
+        Mesma consulta de `query`, devolvida como DataFrame (para respostas em Arrow/Parquet).
+
+        Returns:
+            pd.DataFrame: Registros do mais recente para o mais antigo.
+        """
+        return pd.DataFrame(self.query(limit=limit, offset=offset, start=start, end=end, status=status))
+
+    def iter_records(self, since: str = None, cursor=None):
+        """
+        Percorre o histórico do mais recente para o mais antigo, sem carregá-lo inteiro em memória.
+
+        Args:
+            since (str, optional): Para ao encontrar registros com timestamp <= `since`
+                (retorna apenas predições mais novas que esse instante).
+            cursor (int | str, optional): Continua a partir de um cursor devolvido anteriormente
+                (retorna apenas registros mais antigos que ele).
+
+        Yields:
+            tuple: (cursor (int | str), registro (dict)).
+        """
+        raise NotImplementedError
+
+    def parse_cursor(self, cursor):
+        """
+        Converte e valida um cursor recebido do cliente (por padrão, uma posição inteira >= 0).
+
+        Chamado antes de iniciar o streaming, para que um cursor inválido vire erro 422 em vez
+        de uma resposta 200 vazia.
+
+        Raises:
+            ValueError: Se o cursor não estiver no formato desta store.
+        """
+        if cursor is None:
+            return None
+        position = int(cursor)
+        if position < 0:
+            raise ValueError(f"Cursor inválido: {cursor}")
+        return position
+
+
+class CSVPredictionStore(PredictionStore):
+    """Histórico em arquivo CSV (modo append), com evolução de schema por novas colunas."""
+    def __init__(self, path: str = LOG_FILE):
+        self.path = path
+
+    def write(self, entries: list):
+        """Anexa um lote de registros ao CSV com uma única abertura do arquivo."""
+        if not entries:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        file_exists = os.path.isfile(self.path)
+
+        # Colunas na ordem de chegada, considerando todos os registros do lote
+        fieldnames = list(dict.fromkeys(k for entry in entries for k in entry.keys()))
+
+        # Verifica Schema Evolution (Se adicionarmos novos campos como latency_ms)
+        if file_exists:
+            try:
+                with open(self.path, 'r', newline='', encoding='utf-8') as f:
+                    header = next(csv.reader(f), None)
+
+                if header:
+                    existing_keys = set(header)
+                    missing_in_file = set(fieldnames) - existing_keys
+
+                    if missing_in_file:
+                        # Reescreve com as novas colunas
+                        df_temp = pd.read_csv(self.path)
+                        for k in missing_in_file:
+                            df_temp[k] = None # Preenche passados com vazio
+                        df_temp.to_csv(self.path, index=False)
+                        header = df_temp.columns.tolist()
+
+                    # Mantém a ordem do cabeçalho existente para não desalinhar as colunas
+                    fieldnames = header + [k for k in fieldnames if k not in header]
+            except Exception:
+                pass # Se falhar a migração, tenta append normal
+
+        with open(self.path, mode="a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            if not file_exists or os.path.getsize(self.path) == 0:
+                writer.writeheader()
+            writer.writerows(entries)
+
+    def query(self, limit=100, offset=0, start=None, end=None, status=None):
+        return _frame_records(self.query_frame(limit, offset, start, end, status))
+
+    def query_frame(self, limit=100, offset=0, start=None, end=None, status=None):
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+
+        df = pd.read_csv(self.path)
+        if status is not None and "status" in df.columns:
+            df = df[df["status"] == status]
+        if "timestamp" in df.columns:
+            if start is not None:
+                df = df[df["timestamp"] >= start]
+            if end is not None:
+                df = df[df["timestamp"] <= end]
+
+        # Ordena do mais recente para o mais antigo
+        df = df[::-1]
+        return df.iloc[offset:offset + limit] if limit > 0 else df.iloc[offset:]
+
+    def iter_records(self, since=None, cursor=None):
+        """
+        Lê o CSV de trás para frente, em blocos, a partir do fim do arquivo (ou do `cursor`).
+
+        O cursor é a posição (em bytes) do início da linha do registro: a próxima página começa
+        imediatamente antes dela. Como o log é gravado em ordem cronológica, a leitura para
+        assim que encontra um registro com timestamp <= `since`. Memória e latência dependem
+        apenas da quantidade de registros devolvidos, não do tamanho do arquivo.
+        """
+        cursor = self.parse_cursor(cursor)
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            header_line = f.readline()
+            if not header_line.endswith(b"\n"):
+                return
+            header = next(csv.reader([header_line.decode("utf-8").rstrip("\r\n")]))
+
+            for offset, line in _iter_lines_reverse(f, len(header_line), cursor):
+                values = next(csv.reader([line.decode("utf-8").rstrip("\r")]), [])
+                record = {k: _parse_csv_value(v) for k, v in zip(header, values)}
+                if since is not None and str(record.get("timestamp") or "") <= since:
+                    return
+                yield offset, record
+
+
+class ShardedCSVPredictionStore(PredictionStore):
+    """
+    Histórico em CSV para vários workers: um arquivo por processo, unidos na leitura.
+
+    Cada processo grava apenas em `<nome>.<pid>.csv` (ex: `production_logs.4242.csv`), então
+    workers nunca intercalam linhas no mesmo arquivo. As leituras consideram todos os arquivos
+    (incluindo o `production_logs.csv` de antes do modo multi-worker), ordenados por timestamp.
+
+    No `iter_records`, cada arquivo é lido de trás para frente e os fluxos são intercalados com
+    `heapq.merge`. O cursor é um texto com a posição de leitura de cada arquivo
+    (`arquivo:byte,arquivo:byte`).
+    """
+    def __init__(self, path: str = LOG_FILE):
+        self.path = path
+        root, ext = os.path.splitext(path)
+        self._pattern = f"{glob.escape(root)}.*{ext}"
+        self._root, self._ext = root, ext
+
+    @property
+    def worker_path(self):
+        """Arquivo do processo atual (resolvido a cada chamada, para funcionar após o fork)."""
+        return f"{self._root}.{os.getpid()}{self._ext}"
+
+    def _files(self):
+        files = sorted(glob.glob(self._pattern))
+        if os.path.exists(self.path):
+            files.insert(0, self.path)
+        return files
+
+    def write(self, entries: list):
+        CSVPredictionStore(self.worker_path).write(entries)
+
+    def query(self, limit=100, offset=0, start=None, end=None, status=None):
+        return _frame_records(self.query_frame(limit, offset, start, end, status))
+
+    def query_frame(self, limit=100, offset=0, start=None, end=None, status=None):
+        frames = [pd.read_csv(path) for path in self._files()]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True)
+        if status is not None and "status" in df.columns:
+            df = df[df["status"] == status]
+        if "timestamp" in df.columns:
+            if start is not None:
+                df = df[df["timestamp"] >= start]
+            if end is not None:
+                df = df[df["timestamp"] <= end]
+            # Ordenação estável: registros de um mesmo lote mantêm a ordem de gravação
+            df = df.iloc[::-1].sort_values("timestamp", ascending=False, kind="stable")
+        else:
+            df = df[::-1]
+        return df.iloc[offset:offset + limit] if limit > 0 else df.iloc[offset:]
+
+    def parse_cursor(self, cursor):
+        """Converte o cursor `arquivo:byte,arquivo:byte` em {arquivo: posição}."""
+        if cursor is None:
+            return None
+        if isinstance(cursor, dict):
+            return dict(cursor)
+        positions = {}
+        for part in str(cursor).split(","):
+            name, sep, pos = part.rpartition(":")
+            if not sep or not name:
+                raise ValueError(f"Cursor inválido: {cursor}")
+            positions[name] = super().parse_cursor(pos)
+        return positions
+
+    def iter_records(self, since=None, cursor=None):
+        positions = self.parse_cursor(cursor)
+        files = self._files()
+        names = {path: os.path.basename(path) for path in files}
+        if positions is not None:
+            # Arquivos criados depois da primeira página só têm registros mais novos que o cursor
+            files = [path for path in files if names[path] in positions]
+        else:
+            positions = {names[path]: os.path.getsize(path) for path in files}
+
+        def _stream(path):
+            name = names[path]
+            for offset, record in CSVPredictionStore(path).iter_records(since=since, cursor=positions[name]):
+                yield str(record.get("timestamp") or ""), name, offset, record
+
+        for _, name, offset, record in heapq.merge(*(_stream(p) for p in files), key=lambda t: t[0], reverse=True):
+            positions[name] = offset
+            yield ",".join(f"{n}:{pos}" for n, pos in positions.items()), record
+
+
+def _frame_records(df: pd.DataFrame):
+    """Converte o DataFrame em registros (dict) com tipos nativos e None no lugar de NaN, sem passar por JSON."""
+    return [
+        {k: (None if v != v else v) for k, v in record.items()}
+        for record in df.to_dict("records")
+    ]
+
+def _iter_lines_reverse(f, start, end=None, block_size=64 * 1024):
+    """
+    Percorre as linhas completas de um arquivo binário entre `start` e `end`, do fim para o início.
+
+    Uma última linha sem quebra de linha (ainda sendo gravada) é ignorada.
+
+    Yields:
+        tuple: (posição do início da linha, conteúdo da linha sem o '\\n').
+    """
+    f.seek(0, os.SEEK_END)
+    file_end = f.tell()
+    end = file_end if end is None else min(end, file_end)
+    if end <= start:
+        return
+
+    # Descarta a linha parcial no fim (se houver) e posiciona `end` logo após o último '\n'
+    f.seek(end - 1)
+    if f.read(1) != b"\n":
+        pos = end
+        while pos > start:
+            read_size = min(block_size, pos - start)
+            pos -= read_size
+            f.seek(pos)
+            idx = f.read(read_size).rfind(b"\n")
+            if idx != -1:
+                end = pos + idx + 1
+                break
+        else:
+            return
+
+    pos = end
+    remainder = b""
+    while pos > start:
+        read_size = min(block_size, pos - start)
+        pos -= read_size
+        f.seek(pos)
+        chunk = f.read(read_size) + remainder
+        lines = chunk.split(b"\n")
+        # lines[-1] é vazio (chunk termina em '\n'); lines[0] pode estar incompleta
+        remainder = lines[0]
+        line_end = pos + len(chunk)
+        for line in reversed(lines[1:]):
+            line_end -= len(line) + 1
+            if line:
+                yield line_end + 1, line
+        # Ao final, `remainder` é a primeira linha do intervalo (começa em `start`)
+    if remainder:
+        yield start, remainder
+
+def _parse_csv_value(value: str):
+    """Converte um valor do CSV para int, float, None (vazio) ou mantém como texto."""
+    if value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class SQLitePredictionStore(PredictionStore):
+    """
+    Histórico em banco SQLite embarcado (sem serviço externo).
+
+    O banco opera em modo WAL (leituras não bloqueiam a escrita do log) e possui índices em
+    `timestamp` e `(status, timestamp)`, de forma que consultas por período, status e paginação
+    não precisam ler a tabela inteira. Novos campos nos registros viram novas colunas
+    (ALTER TABLE), como na evolução de schema do CSV.
+    """
+    TABLE = "predictions"
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    status TEXT
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_timestamp ON {self.TABLE} (timestamp)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_status_timestamp ON {self.TABLE} (status, timestamp)")
+        self._columns = self._load_columns(conn)
+
+    def _connect(self):
+        """Uma conexão por thread (sqlite3 não compartilha conexões entre threads por padrão)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load_columns(self, conn):
+        return [row["name"] for row in conn.execute(f"PRAGMA table_info({self.TABLE})")]
+
+    def _ensure_columns(self, conn, keys):
+        missing = [k for k in keys if k not in self._columns]
+        for key in missing:
+            if not _IDENTIFIER.match(key):
+                raise ValueError(f"Nome de coluna inválido: {key}")
+            conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN "{key}"')
+        if missing:
+            self._columns = self._load_columns(conn)
+
+    def write(self, entries: list):
+        """Insere um lote de registros em uma única transação."""
+        if not entries:
+            return
+
+        keys = list(dict.fromkeys(k for entry in entries for k in entry.keys() if k != "id"))
+        columns = ", ".join(f'"{k}"' for k in keys)
+        placeholders = ", ".join("?" for _ in keys)
+        rows = [tuple(entry.get(k) for k in keys) for entry in entries]
+
+        conn = self._connect()
+        with self._lock, conn:
+            self._ensure_columns(conn, keys)
+            conn.executemany(f"INSERT INTO {self.TABLE} ({columns}) VALUES ({placeholders})", rows)
+
+    def query(self, limit=100, offset=0, start=None, end=None, status=None):
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp <= ?")
+            params.append(end)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM {self.TABLE} {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit if limit > 0 else -1, offset]
+
+        rows = self._connect().execute(sql, params).fetchall()
+        return [{k: row[k] for k in row.keys() if k != "id"} for row in rows]
+
+    def iter_records(self, since=None, cursor=None, chunk_size=1000):
+        """
+        Paginação por chave (keyset) sobre o `id`: o cursor é o `id` do último registro devolvido.
+
+        Cada bloco é uma consulta `id < cursor ORDER BY id DESC LIMIT chunk_size`, portanto o custo
+        independe do tamanho da tabela. O `since` não entra no SQL: como no CSV, o log é gravado
+        em ordem cronológica e a leitura para no primeiro registro com timestamp <= `since`. Um
+        filtro `timestamp > ?` na consulta faria o último bloco percorrer o resto da tabela atrás
+        de linhas que não existem.
+        """
+        last_id = self.parse_cursor(cursor)
+        conn = self._connect()
+        while True:
+            where, params = ("WHERE id < ?", [last_id]) if last_id is not None else ("", [])
+            rows = conn.execute(
+                f"SELECT * FROM {self.TABLE} {where} ORDER BY id DESC LIMIT ?", params + [chunk_size]
+            ).fetchall()
+            for row in rows:
+                if since is not None and str(row["timestamp"] or "") <= since:
+                    return
+                last_id = row["id"]
+                yield last_id, {k: row[k] for k in row.keys() if k != "id"}
+            if len(rows) < chunk_size:
+                return
+
+
+def create_store(backend: str = PREDICTION_STORE):
+    """
+    Cria o backend de histórico configurado.
+
+    Args:
+        backend (str): 'csv' ou 'sqlite'.
+
+    Raises:
+        ValueError: Se o backend for desconhecido.
+    """
+    if backend == "csv":
+        if PREDICTION_LOG_PER_WORKER:
+            return ShardedCSVPredictionStore(LOG_FILE)
+        return CSVPredictionStore(LOG_FILE)
+    elif backend == "sqlite":
+        return SQLitePredictionStore(DB_FILE)
+    else:
+        raise ValueError(f"Backend de histórico desconhecido: {backend}")
+
+_STORE = None
+
+def get_store():
+    """Retorna o backend de histórico da aplicação (criado no primeiro uso)."""
+    global _STORE
+    if _STORE is None:
+        _STORE = create_store()
+    return _STORE
+
+def migrate_csv_to_sqlite(csv_path: str = LOG_FILE, db_path: str = DB_FILE, chunk_size: int = 5000):
+    """
+    Migra (uma única vez) o histórico em CSV para o banco SQLite.
+
+    Args:
+        csv_path (str): Caminho do CSV de logs existente.
+        db_path (str): Caminho do banco SQLite de destino.
+        chunk_size (int): Quantidade de linhas lidas/inseridas por vez.
+
+    Returns:
+        int: Quantidade de registros migrados.
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {csv_path}")
+
+    store = SQLitePredictionStore(db_path)
+    total = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        chunk = chunk.astype(object).where(pd.notnull(chunk), None)
+        store.write(chunk.to_dict(orient="records"))
+        total += len(chunk)
+    return total
@@ -0,0 +1,146 @@
+import os
+import time
+import contextlib
+import functools
+import inspect
+from contextvars import ContextVar
+from fastapi.routing import APIRoute
+from prometheus_client import Histogram
+
+
+def _parse_buckets(value: str, default: tuple):
+    """Converte uma lista separada por vírgulas (ex: "0.001,0.01,0.1") em buckets do Prometheus."""
+    if not value:
+        return default
+    return tuple(sorted(float(v) for v in value.split(",") if v.strip()))
+
+# Buckets configuráveis via .env (segundos, separados por vírgula)
+STAGE_LATENCY_BUCKETS = _parse_buckets(
+    os.getenv("STAGE_LATENCY_BUCKETS", ""),
+    (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+REQUEST_LATENCY_BUCKETS = _parse_buckets(
+    os.getenv("REQUEST_LATENCY_BUCKETS", ""),
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# --- Métricas Prometheus ---
+STAGE_LATENCY = Histogram(
+    "inference_stage_seconds", "Latência de cada etapa do processamento de uma predição",
+    ["stage"],
+    buckets=STAGE_LATENCY_BUCKETS
+)
+
+# Tempos (s) das etapas da requisição atual, usados no header Server-Timing
+_REQUEST_TIMINGS: ContextVar = ContextVar("request_timings", default=None)
+
+
+def start_request():
+    """
+    Inicia a coleta de tempos da requisição atual (chamado pelo middleware).
+
+    Returns:
+        dict: Tempos acumulados por etapa, preenchido ao longo da requisição.
+    """
+    timings = {}
+    _REQUEST_TIMINGS.set(timings)
+    return timings
+
+def record(stage_name: str, seconds: float):
+    """Registra a duração de uma etapa no histograma e nos tempos da requisição atual."""
+    STAGE_LATENCY.labels(stage=stage_name).observe(seconds)
+    timings = _REQUEST_TIMINGS.get()
+    if timings is not None:
+        timings[stage_name] = timings.get(stage_name, 0.0) + seconds
+
+def record_many(timings: dict):
+    """Registra várias etapas de uma vez (ex: tempos devolvidos por `RiskModel.predict_proba`)."""
+    for stage_name, seconds in timings.items():
+        record(stage_name, seconds)
+
+def add_request_timings(timings: dict):
+    """Soma tempos já registrados nos histogramas aos da requisição atual (apenas para o Server-Timing)."""
+    request_timings = _REQUEST_TIMINGS.get()
+    if request_timings is None:
+        return
+    for stage_name, seconds in timings.items():
+        request_timings[stage_name] = request_timings.get(stage_name, 0.0) + seconds
+
+@contextlib.contextmanager
+def collect_stages():
+    """
+    Coleta os tempos das etapas de um bloco executado fora da requisição (ex: thread do micro-batcher).
+
+    Os histogramas são alimentados normalmente; o dict devolvido pode ser repassado depois à
+    requisição com `add_request_timings`.
+    """
+    timings = {}
+    token = _REQUEST_TIMINGS.set(timings)
+    try:
+        yield timings
+    finally:
+        _REQUEST_TIMINGS.reset(token)
+
+@contextlib.contextmanager
+def stage(stage_name: str):
+    """
+    Mede a duração de um bloco de código como uma etapa.
+
+    Exemplo:
+        with stage("logging"):
+            log_prediction(entry)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage_name, time.perf_counter() - start)
+
+def server_timing_header(timings: dict, total: float):
+    """Monta o valor do header `Server-Timing` (durações em milissegundos)."""
+    parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items() if not name.startswith("_")]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+class TimedRoute(APIRoute):
+    """
+    Rota que mede a etapa de validação da entrada.
+
+    O tempo entre a chegada da requisição à rota e o início do endpoint (leitura do corpo, parse
+    do JSON, dependências, validação Pydantic e despacho para o threadpool no caso de endpoints
+    síncronos), descontada a autenticação medida à parte, é registrado como etapa `validation`.
+    """
+    def get_route_handler(self):
+        endpoint = self.dependant.call
+        if not getattr(endpoint, "_timed", False):
+            if inspect.iscoroutinefunction(endpoint):
+                @functools.wraps(endpoint)
+                async def timed_endpoint(*args, **kwargs):
+                    _mark_validated()
+                    return await endpoint(*args, **kwargs)
+            else:
+                @functools.wraps(endpoint)
+                def timed_endpoint(*args, **kwargs):
+                    _mark_validated()
+                    return endpoint(*args, **kwargs)
+            timed_endpoint._timed = True
+            self.dependant.call = timed_endpoint
+
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings = _REQUEST_TIMINGS.get()
+            if timings is not None:
+                timings["_route_start"] = time.perf_counter()
+            return await handler(request)
+
+        return timed_handler
+
+
+def _mark_validated():
+    timings = _REQUEST_TIMINGS.get()
+    if timings is None or "_route_start" not in timings:
+        return
+    elapsed = time.perf_counter() - timings.pop("_route_start") - timings.get("auth", 0.0)
+    record("validation", max(elapsed, 0.0))
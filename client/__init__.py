@@ -0,0 +1,4 @@
+"""Cliente Python da API de risco (pool de conexões, lotes concorrentes, renovação de token e retry)."""
+from client.sdk import AsyncRiskClient, RiskClientError
+
+__all__ = ["AsyncRiskClient", "RiskClientError"]
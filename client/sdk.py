@@ -0,0 +1,255 @@
+import os
+import math
+import time
+import json
+import base64
+import random
+import asyncio
+
+import httpx
+
+# Padrões do cliente (podem ser ajustados por variáveis de ambiente ou nos argumentos)
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+CLIENT_CONCURRENCY = int(os.getenv("CLIENT_CONCURRENCY", 4))
+CLIENT_BATCH_SIZE = int(os.getenv("CLIENT_BATCH_SIZE", 500))
+CLIENT_MAX_RETRIES = int(os.getenv("CLIENT_MAX_RETRIES", 3))
+CLIENT_BACKOFF = float(os.getenv("CLIENT_BACKOFF", 0.5))
+CLIENT_TIMEOUT = float(os.getenv("CLIENT_TIMEOUT", 30))
+
+# Respostas transitórias que valem nova tentativa (429/503 vêm do controle de admissão, com Retry-After)
+RETRY_STATUS = {429, 502, 503, 504}
+# Renova o token quando faltar menos que isso (segundos) para o `exp`
+TOKEN_REFRESH_MARGIN = 30
+MAX_BACKOFF = 30.0
+
+
+class RiskClientError(Exception):
+    """Erro definitivo de uma chamada à API (após as novas tentativas)."""
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncRiskClient:
+    """
+    Cliente assíncrono da API de risco, para pontuar turmas e coortes inteiras.
+
+    - Um único pool de conexões `httpx` (keep-alive) é reaproveitado por todas as chamadas.
+    - `predict_many` divide os registros em lotes de `batch_size` e envia até `concurrency`
+      lotes ao mesmo tempo ao `/predict/batch`. Se o servidor não tiver a rota (404/405), o
+      cliente passa a usar o `/predict`, um aluno por chamada, com a mesma concorrência. Um lote
+      recusado por tamanho (413) é dividido ao meio e reenviado.
+    - O token é obtido no primeiro uso e renovado antes do `exp` ou após um 401.
+    - Falhas de conexão e respostas 429/502/503/504 são repetidas com backoff exponencial
+      (com jitter), respeitando o `Retry-After` do servidor.
+
+    Uso:
+        async with AsyncRiskClient(username="admin", password="admin") as api:
+            results = await api.predict_many(records, threshold=0.5)
+
+    Attributes:
+        base_url (str): URL da API.
+        concurrency (int): Chamadas simultâneas em `predict_many`.
+        batch_size (int): Registros por chamada ao `/predict/batch`.
+        max_retries (int): Novas tentativas por chamada em falhas transitórias.
+        backoff (float): Espera base (segundos) do backoff exponencial.
+    """
+    def __init__(self, base_url=None, username=None, password=None, concurrency=None, batch_size=None,
+                 max_retries=None, backoff=None, timeout=None, transport=None):
+        self.base_url = (base_url or API_URL).rstrip("/")
+        self.username = username if username is not None else os.getenv("APP_USER", "admin")
+        self.password = password if password is not None else os.getenv("APP_PASS", "admin")
+        self.concurrency = max(1, concurrency or CLIENT_CONCURRENCY)
+        self.batch_size = max(1, batch_size or CLIENT_BATCH_SIZE)
+        self.max_retries = CLIENT_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = CLIENT_BACKOFF if backoff is None else backoff
+        self.batch_supported = None  # Descoberto na primeira chamada ao /predict/batch
+
+        # Conexões suficientes para a concorrência configurada, todas mantidas em keep-alive
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url, limits=limits, timeout=timeout or CLIENT_TIMEOUT, transport=transport
+        )
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+        # Limita as requisições em andamento (lotes, chamadas individuais e login) ao tamanho do pool
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Fecha o pool de conexões."""
+        await self._http.aclose()
+
+    # --- Autenticação ---
+
+    async def _ensure_token(self, stale_token=None):
+        """
+        Retorna um token válido, fazendo login quando necessário.
+
+        O lock garante um único login mesmo com várias chamadas concorrentes; `stale_token` é o
+        token recusado com 401, renovado apenas se nenhuma outra chamada já o tiver trocado.
+        """
+        async with self._token_lock:
+            expired = time.time() >= self._token_expires_at - TOKEN_REFRESH_MARGIN
+            if self._token is None or expired or self._token == stale_token:
+                response = await self._send("POST", "/token", data={"username": self.username, "password": self.password})
+                if response.status_code != 200:
+                    raise RiskClientError(f"Falha no login: {response.text}", response.status_code)
+                self._token = response.json()["access_token"]
+                self._token_expires_at = _token_expiration(self._token)
+            return self._token
+
+    # --- Transporte com novas tentativas ---
+
+    async def _send(self, method, url, **kwargs):
+        """Envia a requisição, repetindo falhas de conexão e respostas transitórias."""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                async with self._slots:
+                    response = await self._http.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise RiskClientError(f"Erro de conexão: {e}") from e
+                await asyncio.sleep(self._delay(attempt))
+                continue
+            if response.status_code not in RETRY_STATUS or last_attempt:
+                return response
+            await asyncio.sleep(self._delay(attempt, response.headers.get("Retry-After")))
+        return response
+
+    def _delay(self, attempt, retry_after=None):
+        """Backoff exponencial com jitter; o `Retry-After` do servidor tem prioridade."""
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), MAX_BACKOFF)
+            except ValueError:
+                pass
+        return min(self.backoff * (2 ** attempt), MAX_BACKOFF) * random.uniform(0.5, 1.0)
+
+    async def _request(self, method, url, **kwargs):
+        """Requisição autenticada: renova o token e repete uma vez em caso de 401."""
+        token = await self._ensure_token()
+        response = await self._send(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code == 401:
+            token = await self._ensure_token(stale_token=token)
+            response = await self._send(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        return response
+
+    # --- Predições ---
+
+    async def predict(self, record: dict, threshold=None) -> dict:
+        """
+        Pontua um aluno no `/predict`.
+
+        Returns:
+            dict: Resposta da API (prediction, probability, status, model_version).
+
+        Raises:
+            RiskClientError: Se a API responder com erro após as novas tentativas.
+        """
+        payload = _clean_record(record)
+        if threshold is not None:
+            payload["threshold"] = threshold
+        response = await self._request("POST", "/predict", json=payload)
+        if response.status_code != 200:
+            raise RiskClientError(f"Erro API: {response.status_code} {response.text}", response.status_code)
+        return response.json()
+
+    async def predict_many(self, records: list, threshold=None) -> list:
+        """
+        Pontua uma lista de alunos, em lotes e com concorrência limitada.
+
+        Um erro em um aluno (ou em um lote inteiro, ex: servidor fora do ar) não interrompe os
+        demais: o resultado da linha traz a mensagem em `error`.
+
+        Args:
+            records (list): Registros (dict) no formato do `/predict`; NaN é enviado como null.
+            threshold (float, optional): Limiar de risco (padrão do servidor: 0.5).
+
+        Returns:
+            list: Um dict por registro, na ordem da entrada, com as chaves do `/predict/batch`
+                (index, prediction, probability, status, error).
+
+        Raises:
+            RiskClientError: Se o login falhar (antes de qualquer lote ser enviado).
+        """
+        await self._ensure_token()
+        records = [_clean_record(record) for record in records]
+        chunks = [(start, records[start:start + self.batch_size]) for start in range(0, len(records), self.batch_size)]
+
+        results = [None] * len(records)
+        for chunk_results in await asyncio.gather(*(self._score_chunk(start, chunk, threshold) for start, chunk in chunks)):
+            for item in chunk_results:
+                results[item["index"]] = item
+        return results
+
+    async def _score_chunk(self, start, chunk, threshold):
+        """Pontua um lote; usa o `/predict` por aluno quando o servidor não tem o `/predict/batch`."""
+        if self.batch_supported is not False:
+            payload = {"records": chunk} if threshold is None else {"records": chunk, "threshold": threshold}
+            try:
+                response = await self._request("POST", "/predict/batch", json=payload)
+            except RiskClientError as e:
+                return [_error_item(start + i, str(e)) for i in range(len(chunk))]
+
+            if response.status_code == 200:
+                self.batch_supported = True
+                return [{**item, "index": start + item["index"]} for item in response.json()["results"]]
+            if response.status_code == 413 and len(chunk) > 1:
+                # Lote acima do MAX_BATCH_SIZE do servidor: divide ao meio
+                self.batch_size = max(1, len(chunk) // 2)
+                half = len(chunk) // 2
+                return (await self._score_chunk(start, chunk[:half], threshold)
+                        + await self._score_chunk(start + half, chunk[half:], threshold))
+            # Sem a rota: vale também para os lotes já em andamento quando o primeiro 404 chegou
+            if response.status_code in (404, 405) and self.batch_supported is not True:
+                self.batch_supported = False
+            else:
+                message = f"Erro API: {response.status_code}"
+                return [_error_item(start + i, message) for i in range(len(chunk))]
+
+        # Sem /predict/batch: um aluno por chamada (a concorrência continua limitada em `_send`)
+        async def run_single(i, record):
+            try:
+                data = await self.predict(record, threshold)
+            except RiskClientError as e:
+                return _error_item(start + i, str(e))
+            return {"index": start + i, "prediction": data.get("prediction"), "probability": data.get("probability"),
+                    "status": data.get("status"), "error": None}
+
+        return list(await asyncio.gather(*(run_single(i, record) for i, record in enumerate(chunk))))
+
+
+def _error_item(index, message):
+    return {"index": index, "prediction": None, "probability": None, "status": None, "error": message}
+
+def _clean_record(record: dict) -> dict:
+    """Converte NaN em None (o JSON não tem NaN) e tipos numpy em tipos nativos."""
+    cleaned = {}
+    for key, value in record.items():
+        if hasattr(value, "item"):
+            value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            value = None
+        cleaned[key] = value
+    return cleaned
+
+def _token_expiration(token: str) -> float:
+    """
+    Lê o `exp` do JWT (sem verificar a assinatura, que é papel do servidor).
+
+    Sem `exp` legível, o token é mantido até o servidor recusá-lo com 401.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, ValueError, TypeError):
+        return math.inf
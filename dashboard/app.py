@@ -2,8 +2,10 @@ import streamlit as st
 import requests
 import pandas as pd
 import os
+from pathlib import Path
 from dotenv import load_dotenv
-from scipy.stats import ks_2samp
+from src.reference_profile import ReferenceProfile, profile_path_for
+from src.feature_engineering import compute_defasagem
 
 from dotenv import find_dotenv
 load_dotenv(find_dotenv())
@@ -17,13 +19,20 @@ st.set_page_config(
 
 # Constantes
 API_URL = os.getenv("API_URL", "http://localhost:8000" )
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "app/models/registry")
+MODEL_PATH = "app/models/risk_model.joblib"
 
 # --- Funções Auxiliares ---
 
+@st.cache_resource
+def get_session():
+    """Sessão HTTP compartilhada entre as execuções do script (reaproveita as conexões keep-alive)."""
+    return requests.Session()
+
 def login(username, password):
     """Realiza login na API e retorna o token de acesso."""
     try:
-        response = requests.post(
+        response = get_session().post(
             f"{API_URL}/token",
             data={"username": username, "password": password},
             timeout=5
@@ -40,7 +49,7 @@ def predict(token, input_data):
     """Envia os dados para a API e retorna a predição."""
     headers = {"Authorization": f"Bearer {token}"}
     try:
-        response = requests.post(
+        response = get_session().post(
             f"{API_URL}/predict",
             json=input_data,
             headers=headers,
@@ -58,6 +67,16 @@ def predict(token, input_data):
         st.error(f"Erro na requisição: {e}")
         return None
 
+@st.cache_resource
+def load_reference_profile(model_version):
+    """Carrega o perfil de referência da versão do modelo em uso (registro) ou do artefato padrão."""
+    candidates = [Path(MODEL_REGISTRY_DIR) / str(model_version) / "risk_model.joblib", Path(MODEL_PATH)]
+    for model_path in candidates:
+        path = profile_path_for(model_path)
+        if path.is_file():
+            return ReferenceProfile.load(path)
+    return None
+
 # --- Interface do Usuário ---
 
 st.sidebar.title("Navegação")
@@ -149,14 +168,8 @@ if page == "Predição Individual":
                 # Reverse lookup para pegar o ID da fase (0-8)
                 fase_real = next(k for k, v in fase_opcoes.items() if v == fase_label)
 
-            # Lógica de Cálculo (Espelho do Backend)
-            AGE_FASE_MAP = {
-                6: 0, 7: 0, 8: 0, 9: 1, 10: 2, 11: 2, 12: 3, 13: 3, 14: 4, 
-                15: 5, 16: 6, 17: 7, 18: 8, 19: 8, 20: 8, 21: 8, 22: 8, 23: 8, 24: 8
-            }
-            
-            target_ideal = AGE_FASE_MAP.get(idade, 8 if idade > 18 else 0)
-            defasagem_calc = fase_real - target_ideal
+            # Prévia com o mesmo motor usado pela API e pelo treino
+            defasagem_calc = int(compute_defasagem([idade], [fase_real])[0])
             
             # Feedback visual do cálculo
             if defasagem_calc < 0:
@@ -173,6 +186,8 @@ if page == "Predição Individual":
                 "IAA": iaa, "IEG": ieg, "IPS": ips,
                 "IDA": ida, "IPP": ipp, "IPV": ipv,
                 "IAN": ian, "INDE": inde, "Defasagem": float(defasagem_calc),
+                # A API recalcula a Defasagem a partir da idade e da fase
+                "idade": idade, "fase": fase_real,
                 "threshold": threshold
             }
             
@@ -242,118 +257,83 @@ elif page == "Monitoramento de Drift":
     st.header("📉 Monitoramento de Data Drift")
     st.markdown("Comparação entre a distribuição dos dados de **Treino (Referência)** e os dados **Atuais (Produção)**.")
 
-    # 1. Carregar Reference Data (Estático, do pacote)
-    try:
-        DATA_PATH = "data/reference_data.csv"
-        if os.path.exists(DATA_PATH):
-            df_ref = pd.read_csv(DATA_PATH)
-        else:
-            st.error(f"Arquivo de referência '{DATA_PATH}' não encontrado. Execute o script de extração primeiro.")
-            st.stop()
-            
-    except Exception as e:
-        st.error(f"Erro ao carregar dados de referência: {e}")
-        st.stop()
-        
-    # 2. Carregar Production Data (Dinâmico, da API)
+    # 1. Métricas de drift calculadas pela API (histogramas incrementais de todas as predições)
     if st.session_state.token:
-        # Opção para o usuário controlar o volume de dados
-        limit_options = {100: "Últimos 100", 500: "Últimos 500", 1000: "Últimos 1000", 0: "Todos (Sem Limite)"}
-        selected_limit = st.selectbox(
-            "Selecione o volume de dados para análise:", 
-            options=list(limit_options.keys()), 
-            format_func=lambda x: limit_options[x],
-            index=2 # Default: 1000
-        )
-        
         try:
             headers = {"Authorization": f"Bearer {st.session_state.token}"}
-            # Passa o limit como query param
-            response = requests.get(f"{API_URL}/history", headers=headers, params={"limit": selected_limit}, timeout=10)
-            
+            response = get_session().get(f"{API_URL}/drift", headers=headers, timeout=10)
+
             if response.status_code == 200:
-                history_data = response.json()
-                if history_data:
-                    df_curr = pd.DataFrame(history_data)
-                    st.success(f"Carregados {len(df_curr)} registros de produção.")
-                else:
-                    st.warning("Ainda não há dados de produção suficientes (histórico vazio).")
-                    df_curr = pd.DataFrame()
+                drift_report = response.json()
             else:
-                st.error(f"Erro ao buscar histórico da API: {response.text}")
-                df_curr = pd.DataFrame()
-                
+                st.error(f"Erro ao buscar métricas de drift da API: {response.text}")
+                drift_report = None
+
         except Exception as e:
-            st.error(f"Erro de conexão ao buscar histórico: {e}")
-            df_curr = pd.DataFrame()
+            st.error(f"Erro de conexão ao buscar métricas de drift: {e}")
+            drift_report = None
     else:
         st.info("⚠️ Faça login para visualizar os dados de produção.")
-        df_curr = pd.DataFrame()
+        drift_report = None
 
-    # 3. Análise de Drift (Se houver dados)
-    if not df_curr.empty:
-        # Garante que as colunas existem
-        valid_cols = [c for c in df_ref.columns if c in df_curr.columns]
-        
-        if not valid_cols:
-            st.error("As colunas do histórico não correspondem aos dados de referência.")
+    # 2. Análise de Drift (Se houver dados)
+    if drift_report is not None:
+        if drift_report["production_size"] == 0:
+            st.warning("Ainda não há dados de produção suficientes (histórico vazio).")
         else:
-            feature = st.selectbox("Selecione o Indicador para Análise", valid_cols)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.write(f"### Distribuição: {feature}")
-                
-                # Prepara dados para o gráfico, tratando None/NaN misturado com números.
-                ref_series = pd.to_numeric(df_ref[feature], errors='coerce').dropna().reset_index(drop=True)
-                curr_series = pd.to_numeric(df_curr[feature], errors='coerce').dropna().reset_index(drop=True)
-                
-                # Só plota se tiver dados válidos e comparáveis
-                if not ref_series.empty and not curr_series.empty:
-                    # Alinha os indexes para o gráfico não quebrar
-                    min_len = min(len(ref_series), len(curr_series))
-                    if min_len > 0:
-                        chart_data = pd.DataFrame({
-                            "Referência (Treino)": ref_series.iloc[:min_len],
-                            "Atual (Produção)": curr_series.iloc[:min_len]
-                        })
-                        st.line_chart(chart_data)
-                    else:
-                        st.warning("Dados insuficientes para plotar comparação.")
-                else:
-                    st.warning(f"A coluna '{feature}' contém apenas valores nulos ou inválidos.")
-                
-            with col2:
-                st.write("### Estatísticas Descritivas")
-                st.write("**Referência**")
-                st.write(df_ref[feature].describe())
-                st.write("**Atual**")
-                st.write(df_curr[feature].describe())
-                
-            # Alerta de Drift via Teste KS (Kolmogorov-Smirnov)           
-            # Remove nulos e converte para numérico se necessário
-            sample_ref = pd.to_numeric(df_ref[feature], errors='coerce').dropna()
-            sample_curr = pd.to_numeric(df_curr[feature], errors='coerce').dropna()
-            
-            if len(sample_curr) < 5:
-                st.warning("Amostra de produção muito pequena para teste estatístico confiável.")
+            st.success(
+                f"Analisados {drift_report['production_size']} registros de produção "
+                f"contra {drift_report['reference_size']} de referência."
+            )
+            df_drift = pd.DataFrame.from_dict(drift_report["features"], orient="index")
+            df_drift.index.name = "Indicador"
+
+            st.markdown("### Resumo por Indicador")
+            st.dataframe(
+                df_drift[["ks", "p_value", "psi", "null_rate", "reference_null_rate", "count", "drift"]].rename(columns={
+                    "ks": "Estatística KS", "p_value": "P-valor", "psi": "PSI",
+                    "null_rate": "Nulos (Produção)", "reference_null_rate": "Nulos (Referência)",
+                    "count": "Valores Válidos", "drift": "Drift"
+                }),
+                use_container_width=True
+            )
+
+            valid_cols = df_drift.index[df_drift["ks"].notna()].tolist()
+            if not valid_cols:
+                st.error("Nenhum indicador de produção possui dados de referência para comparação.")
             else:
-                ks_statistic, p_value = ks_2samp(sample_ref, sample_curr)
-                
-                st.markdown("### Análise Estatística de Drift (Teste KS)")
-                st.write(f"**Estatística KS**: {ks_statistic:.4f}")
-                st.write(f"**P-valor**: {p_value:.4f}")
-                
+                feature = st.selectbox("Selecione o Indicador para Análise", valid_cols)
+                metrics = drift_report["features"][feature]
+                threshold = drift_report["p_value_threshold"]
+
+                st.markdown("### Análise Estatística de Drift (Teste KS e PSI)")
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Estatística KS", f"{metrics['ks']:.4f}")
+                col2.metric("P-valor", f"{metrics['p_value']:.4f}")
+                col3.metric("PSI", f"{metrics['psi']:.4f}")
+
+                # Histograma de referência pré-calculado no treino (perfil salvo junto ao modelo)
+                profile = load_reference_profile(drift_report.get("model_version"))
+                if profile is not None and feature in profile.features:
+                    feature_profile = profile.features[feature]
+                    edges = feature_profile.hist_edges
+                    st.write(f"### Distribuição de Referência: {feature} (mediana {feature_profile.median:.2f})")
+                    st.bar_chart(pd.DataFrame(
+                        {"Referência (Treino)": feature_profile.hist_counts},
+                        index=[f"{lo:.2f}–{hi:.2f}" for lo, hi in zip(edges[:-1], edges[1:])]
+                    ))
+
+                if metrics["count"] < 5:
+                    st.warning("Amostra de produção muito pequena para teste estatístico confiável.")
                 # Interpretação
-                if p_value < 0.05:
-                    st.error(f"🚨 **Drift Detectado!** (p-valor < 0.05)")
+                elif metrics["drift"]:
+                    st.error(f"🚨 **Drift Detectado!** (p-valor < {threshold})")
                     st.markdown("""
                     A distribuição dos dados atuais difere significativamente dos dados de treino.
                     **Ação Recomendada**: O modelo pode estar desatualizado. Re-treinar urgentemente.
                     """)
                 else:
-                    st.success(f"✅ **Distribuição Estável** (p-valor >= 0.05)")
+                    st.success(f"✅ **Distribuição Estável** (p-valor >= {threshold})")
                     st.info("Não há evidência estatística suficiente para afirmar que os dados mudaram.")
 
 # --- Página: Performance do Sistema ---
@@ -363,65 +343,57 @@ elif page == "Performance do Sistema":
 
     if st.session_state.token:
         try:
-            # Busca todo o histórico para análise de performance
             headers = {"Authorization": f"Bearer {st.session_state.token}"}
-            with st.spinner("Carregando logs de performance..."):
-                response = requests.get(f"{API_URL}/history", headers=headers, params={"limit": 0}, timeout=10)
+            with st.spinner("Carregando métricas de performance..."):
+                # KPIs e série por minuto já agregados pela API (resposta pequena, sem baixar o histórico)
+                response = get_session().get(f"{API_URL}/stats/performance", headers=headers, timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
-                if data:
-                    df = pd.DataFrame(data)
-                    
-                    # Garante tipos corretos
-                    if "timestamp" in df.columns:
-                        df["timestamp"] = pd.to_datetime(df["timestamp"])
-                    if "latency_ms" not in df.columns:
+                stats = response.json()
+                latency = stats["latency_ms"]
+                if stats["total_requests"] > 0:
+                    if stats.get("seeding"):
+                        st.info("⏳ A API ainda está carregando o histórico antigo; os números podem crescer.")
+                    if latency["count"] == 0:
                         st.warning("⚠️ Dados de latência não encontrados nos logs antigos. Novos registros aparecerão aqui.")
-                        df["latency_ms"] = 0.0 # Fallback para não quebrar
-                    
-                    # KPIs Principais
-                    total_req = len(df)
-                    avg_latency = df["latency_ms"].mean() if not df.empty else 0
-                    p95_latency = df["latency_ms"].quantile(0.95) if not df.empty else 0
-                    std_latency = df["latency_ms"].std() if not df.empty and len(df) > 1 else 0
-
                     
                     # Layout de Métricas
                     kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-                    kpi1.metric("Total de Requisições", total_req)
-                    kpi2.metric("Latência Média", f"{avg_latency:.2f} ms")
-                    kpi3.metric("Desvio Padrão", f"{std_latency:.2f} ms")
-                    kpi4.metric("Latência P95", f"{p95_latency:.2f} ms", help="95% das requisições são mais rápidas que isso.")
+                    kpi1.metric("Total de Requisições", stats["total_requests"])
+                    kpi2.metric("Latência Média", f"{latency['mean'] or 0:.2f} ms")
+                    kpi3.metric("Desvio Padrão", f"{latency['std'] or 0:.2f} ms")
+                    kpi4.metric("Latência P95", f"{latency['p95'] or 0:.2f} ms", help="95% das requisições são mais rápidas que isso.")
                     
                     st.markdown("---")
                     
-                    # Gráficos de Série Temporal
+                    # Gráficos de Série Temporal (janela móvel da API)
+                    df = pd.DataFrame(stats["series"])
                     chart_col1, chart_col2 = st.columns(2)
                     
                     with chart_col1:
-                        st.subheader("⏱️ Latência por Requisição")
-                        if not df.empty and "latency_ms" in df.columns:
-                            st.line_chart(df.set_index("timestamp")["latency_ms"])
+                        st.subheader("⏱️ Latência por Minuto")
+                        if not df.empty:
+                            df["minute"] = pd.to_datetime(df["minute"])
+                            st.line_chart(df.set_index("minute")[["avg_latency_ms", "max_latency_ms"]])
                         else:
-                            st.info("Sem dados para plotar.")
+                            st.info(f"Sem requisições nos últimos {stats['window_minutes']} minutos.")
 
                     with chart_col2:
                         st.subheader("📊 Volume (Requisições/Minuto)")
-                        if not df.empty and "timestamp" in df.columns:
-                            # Resample para contar registros por minuto
-                            df_throughput = df.set_index("timestamp").resample("min").size()
-                            st.bar_chart(df_throughput)
+                        if not df.empty:
+                            st.bar_chart(df.set_index("minute")["requests"])
                         else:
-                            st.info("Sem dados para plotar.")
+                            st.info(f"Sem requisições nos últimos {stats['window_minutes']} minutos.")
                             
                     # Tabela de Dados Recentes
                     with st.expander("Ver Logs Recentes"):
-                        st.dataframe(df.head(50))
+                        recent = get_session().get(f"{API_URL}/history", headers=headers, params={"limit": 50}, timeout=10)
+                        if recent.status_code == 200:
+                            st.dataframe(pd.DataFrame(recent.json()))
                 else:
                     st.info("Nenhum log de performance encontrado.")
             else:
-                st.error(f"Erro ao buscar logs: {response.text}")
+                st.error(f"Erro ao buscar métricas: {response.text}")
                 
         except Exception as e:
             st.error(f"Erro ao processar dados de performance: {e}")
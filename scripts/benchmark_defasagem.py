@@ -0,0 +1,97 @@
+"""
+Benchmark da correção de defasagem: versão columnar x implementação linha a linha.
+
+Gera um DataFrame sintético no estilo das abas do PEDE (fases em texto e número, idades como
+inteiros, anos de nascimento e datas, valores inválidos e ausentes), mede as duas implementações
+de `calculate_corrected_defasagem` e confere se os resultados são idênticos.
+
+Uso:
+    python scripts/benchmark_defasagem.py --rows 1000000
+    python scripts/benchmark_defasagem.py --rows 5000000 --skip-rowwise
+"""
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.feature_engineering import calculate_corrected_defasagem, _calculate_corrected_defasagem_rowwise
+
+FASES = ['ALFA', 'Fase 1', 'Fase 2', 'FASE 3', '4A', '5B', 'Fase 6', '7', 'Fase 8', 'Universitário',
+         1, 2, 3, 'sem fase', None]
+IDADES = list(range(6, 22)) + [2008, 2010, 2012, 2014, datetime(1900, 1, 11), datetime(2011, 6, 1),
+                               '12', 'doze', None]
+ANOS = [2022, 2023, 2024, None]
+
+
+def synthetic_frame(n_rows, seed=42):
+    """DataFrame sintético com as colunas usadas pela correção (RA, Fase, Idade, Ano, Defasagem)."""
+    rng = np.random.default_rng(seed)
+
+    def pick(options):
+        values = np.empty(len(options), dtype=object)
+        values[:] = options
+        return values[rng.integers(0, len(options), n_rows)]
+
+    return pd.DataFrame({
+        'RA': pd.Series(np.arange(n_rows)).astype(str),
+        'Fase': pick(FASES),
+        'Idade': pick(IDADES),
+        'Ano': pick(ANOS),
+        'Defasagem': rng.choice([-3.0, -2.0, -1.0, 0.0, 1.0, np.nan], n_rows),
+    })
+
+
+def _timed(func, df, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições da versão columnar (vale a melhor)")
+    parser.add_argument("--skip-rowwise", action="store_true", help="Mede apenas a versão columnar")
+    parser.add_argument("--output", help="Salva o relatório em JSON")
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows, args.seed)
+    vectorized_s, vectorized = _timed(calculate_corrected_defasagem, df, args.repeat)
+    report = {
+        "rows": args.rows,
+        "vectorized_s": round(vectorized_s, 4),
+        "vectorized_rows_per_second": round(args.rows / vectorized_s),
+    }
+    print(f"Columnar:      {vectorized_s:8.3f} s ({report['vectorized_rows_per_second']:,} linhas/s)")
+
+    if not args.skip_rowwise:
+        rowwise_s, rowwise = _timed(_calculate_corrected_defasagem_rowwise, df, 1)
+        identical = vectorized.equals(rowwise) and (vectorized.dtypes == rowwise.dtypes).all()
+        report.update({
+            "rowwise_s": round(rowwise_s, 4),
+            "speedup": round(rowwise_s / vectorized_s, 1),
+            "identical": bool(identical),
+        })
+        print(f"Linha a linha: {rowwise_s:8.3f} s")
+        print(f"Speedup:       {report['speedup']:8.1f}x | resultados idênticos: {identical}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark do modo multi-worker: memória por worker e throughput do /predict.
+
+Sobe o uvicorn com 1, 2, 4... workers, dispara requisições concorrentes durante alguns segundos
+e mede, para cada worker, o RSS (memória residente) e o PSS (memória proporcional: páginas
+compartilhadas entre processos são divididas entre eles). Roda apenas em Linux (lê /proc).
+
+Uso:
+    python scripts/benchmark_workers.py --workers 1 2 4 --duration 10
+    MODEL_MMAP=true PREDICTION_LOG_PER_WORKER=true python scripts/benchmark_workers.py
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+USERNAME = os.getenv("APP_USER", "admin")
+PASSWORD = os.getenv("APP_PASS", "admin")
+
+PAYLOAD = {"IAA": 5.5, "IEG": 6.2, "IPS": 7.0, "IDA": 8.0, "IPP": 4.5,
+           "IPV": 6.1, "IAN": 5.0, "INDE": 6.5, "Defasagem": 0.0}
+
+
+def _children(pid):
+    """PIDs dos workers (processos filhos) de `pid`, via /proc."""
+    children = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # O campo 4 (ppid) vem depois do nome do processo, que fica entre parênteses
+        if int(stat.rsplit(")", 1)[1].split()[1]) != pid:
+            continue
+        # Ignora processos auxiliares do multiprocessing (ex: resource_tracker)
+        if b"resource_tracker" in (entry / "cmdline").read_bytes():
+            continue
+        children.append(int(entry.name))
+    return children
+
+def _memory_mb(pid):
+    """(RSS, PSS) de um processo, em MB."""
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        parts = line.split()
+        if parts[0] in ("Rss:", "Pss:"):
+            values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values.get("Rss", 0.0), values.get("Pss", 0.0)
+
+def _wait_ready(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/", timeout=1).json().get("model_status") == "Carregado":
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("API não ficou pronta a tempo")
+
+def _load(url, token, duration, concurrency):
+    """Dispara requisições ao /predict por `duration` segundos. Retorna (ok, erros)."""
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.time() + duration
+
+    def _client():
+        ok = errors = 0
+        with requests.Session() as session:
+            while time.time() < deadline:
+                try:
+                    response = session.post(f"{url}/predict", json=PAYLOAD, headers=headers, timeout=10)
+                    ok += response.status_code == 200
+                    errors += response.status_code != 200
+                except requests.RequestException:
+                    errors += 1
+        return ok, errors
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: _client(), range(concurrency)))
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+def run(workers, duration, concurrency, port):
+    """Sobe a API com `workers` processos e mede memória e throughput."""
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(url)
+        token = requests.post(f"{url}/token", data={"username": USERNAME, "password": PASSWORD}, timeout=5).json()["access_token"]
+        _load(url, token, 1, concurrency)  # Aquecimento de todos os workers
+
+        start = time.perf_counter()
+        ok, errors = _load(url, token, duration, concurrency)
+        elapsed = time.perf_counter() - start
+
+        pids = _children(process.pid) if workers > 1 else [process.pid]
+        memory = [_memory_mb(pid) for pid in pids]
+        return {
+            "workers": workers,
+            "requests_per_second": round(ok / elapsed, 1),
+            "errors": errors,
+            "rss_mb_per_worker": round(sum(m[0] for m in memory) / len(memory), 1),
+            "pss_mb_per_worker": round(sum(m[1] for m in memory) / len(memory), 1),
+            "pss_mb_total": round(sum(m[1] for m in memory), 1),
+        }
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória e throughput por quantidade de workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga por configuração")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultâneos")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"MODEL_MMAP={os.getenv('MODEL_MMAP', 'false')} INFERENCE_ENGINE={os.getenv('INFERENCE_ENGINE', 'sklearn')} CPUs={os.cpu_count()}")
+    results = []
+    for workers in args.workers:
+        result = run(workers, args.duration, args.concurrency, args.port)
+        print(json.dumps(result))
+        results.append(result)
+
+    print("\n| Workers | Req/s | RSS/worker (MB) | PSS/worker (MB) | PSS total (MB) |")
+    print("|---|---|---|---|---|")
+    for r in results:
+        print(f"| {r['workers']} | {r['requests_per_second']} | {r['rss_mb_per_worker']} | {r['pss_mb_per_worker']} | {r['pss_mb_total']} |")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Teste de carga reprodutível do /predict (ou /predict/batch e /predict/batch/columnar), com relatório em JSON.
+
+Reenvia linhas reais da planilha PEDE para a API, que pode rodar:
+    - no próprio processo (`--target inprocess`, via ASGI, sem rede);
+    - em um uvicorn local iniciado pelo script (`--target uvicorn`);
+    - em uma URL já no ar (`--url http://...`).
+
+Modos de carga:
+    - closed:    `--concurrency` clientes, cada um envia a próxima requisição ao receber a resposta.
+    - fixed-rps: chegadas em intervalos fixos de 1/`--rps` segundos, independentes das respostas.
+    - open:      chegadas de Poisson com taxa média `--rps` (intervalos exponenciais, semente fixa).
+
+Nos modos open e fixed-rps a latência é medida a partir do instante programado de envio (e não
+do envio efetivo), para que a fila formada quando a API não acompanha a taxa apareça nos
+percentis (evita a "omissão coordenada").
+
+Uso:
+    python scripts/load_test.py --mode closed --concurrency 8 --duration 20 --output bench/closed.json
+    python scripts/load_test.py --target uvicorn --mode open --rps 200 --duration 30
+    python scripts/load_test.py --mode fixed-rps --rps 100 --compare bench/closed.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.config import DATA_PATH, FEATURE_COLS
+from src.data_loader import load_data
+
+load_dotenv()
+
+USERNAME = os.getenv("APP_USER", "admin")
+PASSWORD = os.getenv("APP_PASS", "admin")
+PERCENTILES = (50, 90, 95, 99)
+ENDPOINT_PATHS = {"predict": "/predict", "batch": "/predict/batch", "columnar": "/predict/batch/columnar"}
+
+
+def load_payloads(data_path=DATA_PATH, years=(2024,)):
+    """
+    Linhas reais da planilha no formato do /predict (NaN vira None, como em `predict_2024.py`).
+
+    Returns:
+        list: Registros (dict) com as nove features.
+    """
+    data = load_data(str(data_path))
+    payloads = []
+    for year in years:
+        df = data[year].reindex(columns=FEATURE_COLS)
+        for record in df.to_dict("records"):
+            payloads.append({k: (None if v != v else float(v)) for k, v in record.items()})
+    return payloads
+
+
+def summarize(latencies_ms, statuses, elapsed):
+    """
+    Resume os resultados da execução.
+
+    Args:
+        latencies_ms (list): Latência de cada requisição concluída (ms).
+        statuses (list): Status HTTP de cada requisição (0 para erro de conexão/timeout).
+        elapsed (float): Duração da fase medida (s).
+
+    Returns:
+        dict: Contagens, taxa de erro, throughput e percentis de latência.
+    """
+    statuses = np.asarray(statuses, dtype=int)
+    latencies = np.asarray(latencies_ms, dtype=float)
+    ok = int(np.sum(statuses == 200))
+    total = len(statuses)
+    status_counts = {str(code): int(count) for code, count in zip(*np.unique(statuses, return_counts=True))}
+    latency = {"count": int(len(latencies))}
+    if len(latencies):
+        latency.update({
+            "mean": round(float(latencies.mean()), 3),
+            "min": round(float(latencies.min()), 3),
+            "max": round(float(latencies.max()), 3),
+            **{f"p{p}": round(float(np.percentile(latencies, p)), 3) for p in PERCENTILES},
+        })
+    return {
+        "requests": total,
+        "ok": ok,
+        "errors": total - ok,
+        "error_rate": round((total - ok) / total, 6) if total else 0.0,
+        "status_counts": status_counts,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": latency,
+    }
+
+
+class LoadRunner:
+    """
+    Executa a carga contra um `httpx.AsyncClient` já autenticado.
+
+    Attributes:
+        path (str): Endpoint alvo (`/predict` ou `/predict/batch`).
+        payloads (list): Corpos das requisições, reenviados em ciclo.
+    """
+    def __init__(self, client, headers, path, payloads, timeout):
+        self.client = client
+        self.headers = headers
+        self.path = path
+        self.payloads = payloads
+        self.timeout = timeout
+        self._next = 0
+        self.latencies_ms = []
+        self.statuses = []
+
+    def _payload(self):
+        payload = self.payloads[self._next % len(self.payloads)]
+        self._next += 1
+        return payload
+
+    async def _send(self, scheduled_at, record=True):
+        payload = self._payload()
+        try:
+            response = await self.client.post(self.path, json=payload, headers=self.headers, timeout=self.timeout)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        if record:
+            self.statuses.append(status)
+            if status != 0:
+                self.latencies_ms.append((time.perf_counter() - scheduled_at) * 1000)
+
+    async def closed(self, concurrency, duration, record=True):
+        deadline = time.perf_counter() + duration
+
+        async def _client():
+            while time.perf_counter() < deadline:
+                await self._send(time.perf_counter(), record)
+
+        await asyncio.gather(*(_client() for _ in range(concurrency)))
+
+    async def open(self, rps, duration, poisson, seed, max_in_flight, record=True):
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        scheduled = start
+        pending = set()
+        while scheduled - start < duration:
+            scheduled += rng.expovariate(rps) if poisson else 1 / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(pending) >= max_in_flight:
+                # Limite de conexões do cliente atingido: conta como erro em vez de atrasar a chegada
+                if record:
+                    self.statuses.append(0)
+                continue
+            task = asyncio.create_task(self._send(scheduled, record))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+
+
+async def _run_load(client, headers, args, payloads):
+    path = ENDPOINT_PATHS[args.endpoint]
+    if args.endpoint != "predict":
+        batches = [
+            [payloads[(i + j) % len(payloads)] for j in range(args.batch_size)]
+            for i in range(0, len(payloads), args.batch_size)
+        ]
+        if args.endpoint == "batch":
+            payloads = [{"records": batch, "threshold": 0.5} for batch in batches]
+        else:
+            # Mesmo lote, uma lista por feature
+            payloads = [
+                {"columns": {col: [row.get(col) for row in batch] for col in FEATURE_COLS}, "threshold": 0.5}
+                for batch in batches
+            ]
+    runner = LoadRunner(client, headers, path, payloads, args.timeout)
+
+    async def phase(duration, record):
+        if args.mode == "closed":
+            await runner.closed(args.concurrency, duration, record)
+        else:
+            await runner.open(args.rps, duration, args.mode == "open", args.seed, args.max_in_flight, record)
+
+    if args.warmup > 0:
+        await phase(args.warmup, record=False)
+    start = time.perf_counter()
+    await phase(args.duration, record=True)
+    results = summarize(runner.latencies_ms, runner.statuses, time.perf_counter() - start)
+    rows_per_request = args.batch_size if args.endpoint != "predict" else 1
+    results["rows_per_second"] = round(results["throughput_rps"] * rows_per_request, 2)
+    return results
+
+
+async def _login(client):
+    response = await client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_inprocess(args, payloads):
+    """Roda a API no mesmo processo (ASGI, com lifespan), sem rede nem serialização HTTP real."""
+    from app.main import app
+
+    limits = httpx.Limits(max_connections=None)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://inprocess", limits=limits) as client:
+            return await _run_load(client, await _login(client), args, payloads)
+
+
+async def run_http(args, payloads, url):
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+        return await _run_load(client, await _login(client), args, payloads)
+
+
+def _wait_ready(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/", timeout=1).json().get("model_status") == "Carregado":
+                return
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("API não ficou pronta a tempo")
+
+
+def run_uvicorn(args, payloads):
+    """Sobe um uvicorn local (`--workers` processos), executa a carga e o encerra."""
+    url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(url)
+        return asyncio.run(run_http(args, payloads, url))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Variação percentual das métricas principais em relação a um relatório anterior."""
+    pairs = {
+        "throughput_rps": (report["results"]["throughput_rps"], baseline["results"]["throughput_rps"]),
+        "rows_per_second": (report["results"].get("rows_per_second"), baseline["results"].get("rows_per_second")),
+        "error_rate": (report["results"]["error_rate"], baseline["results"]["error_rate"]),
+    }
+    for p in PERCENTILES:
+        key = f"p{p}"
+        pairs[f"latency_{key}_ms"] = (
+            report["results"]["latency_ms"].get(key), baseline["results"]["latency_ms"].get(key)
+        )
+    return {
+        name: {
+            "current": current, "baseline": previous,
+            "change_pct": round((current - previous) / previous * 100, 2) if current is not None and previous else None,
+        }
+        for name, (current, previous) in pairs.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do /predict com relatório de latência em JSON.")
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--url", help="Usa uma API já no ar (ignora --target)")
+    parser.add_argument("--mode", choices=["closed", "fixed-rps", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes simultâneos (modo closed)")
+    parser.add_argument("--rps", type=float, default=50.0, help="Taxa de chegada (modos open e fixed-rps)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Máximo de requisições em andamento (modos open e fixed-rps)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga medida")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Segundos de aquecimento (não entram no relatório)")
+    parser.add_argument("--endpoint", choices=list(ENDPOINT_PATHS), default="predict")
+    parser.add_argument("--batch-size", type=int, default=100, help="Registros por requisição (--endpoint batch/columnar)")
+    parser.add_argument("--years", type=int, nargs="+", default=[2024], help="Abas da planilha usadas como carga")
+    parser.add_argument("--data", default=str(DATA_PATH), help="Planilha PEDE")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn (--target uvicorn)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON do relatório (padrão: apenas imprime)")
+    parser.add_argument("--compare", help="Relatório JSON anterior para comparação")
+    parser.add_argument("--keep-logs", action="store_true", help="Grava as predições no histórico configurado (padrão: log temporário)")
+    args = parser.parse_args()
+
+    if not args.keep_logs:
+        # Não mistura a carga sintética com o histórico real (drift/performance)
+        os.environ["PREDICTION_LOG_FILE"] = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "logs.csv")
+        os.environ["PREDICTION_STORE"] = "csv"
+        os.environ.setdefault("STATS_SEED_FROM_HISTORY", "false")
+
+    payloads = load_payloads(args.data, args.years)
+    if args.url:
+        results = asyncio.run(run_http(args, payloads, args.url.rstrip("/")))
+    elif args.target == "uvicorn":
+        results = run_uvicorn(args, payloads)
+    else:
+        results = asyncio.run(run_inprocess(args, payloads))
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "inference_engine": os.getenv("INFERENCE_ENGINE", "sklearn"),
+            "microbatch": os.getenv("MICROBATCH_ENABLED", "false"),
+        },
+        "config": {
+            "target": "url" if args.url else args.target,
+            "mode": args.mode,
+            "endpoint": args.endpoint,
+            "concurrency": args.concurrency if args.mode == "closed" else None,
+            "rps": args.rps if args.mode != "closed" else None,
+            "batch_size": args.batch_size if args.endpoint != "predict" else None,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "workers": args.workers if args.target == "uvicorn" and not args.url else None,
+            "payload_rows": len(payloads),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Permite executar o script a partir da raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.store import migrate_csv_to_sqlite, LOG_FILE, DB_FILE
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra o histórico de predições do CSV para o SQLite.")
+    parser.add_argument("--csv", default=LOG_FILE, help=f"CSV de origem (padrão: {LOG_FILE})")
+    parser.add_argument("--db", default=DB_FILE, help=f"Banco SQLite de destino (padrão: {DB_FILE})")
+    args = parser.parse_args()
+
+    print(f"Migrando {args.csv} -> {args.db}...")
+    total = migrate_csv_to_sqlite(args.csv, args.db)
+    print(f"{total} registros migrados.")
+    print("Defina PREDICTION_STORE=sqlite no .env para usar o novo backend.")
+
+if __name__ == "__main__":
+    main()
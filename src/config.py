@@ -7,6 +7,10 @@ PROJECT_ROOT = SRC_DIR.parent
 DATA_PATH = PROJECT_ROOT / 'BASE DE DADOS PEDE 2024 - DATATHON.xlsx'
 MODELS_DIR = PROJECT_ROOT / 'app/models'
 
+# Cache em Parquet da planilha já tratada (ver `src/data_cache.py`)
+DATA_CACHE_DIR = Path(os.getenv("DATA_CACHE_DIR", PROJECT_ROOT / 'data' / 'cache'))
+DATA_CACHE_ENABLED = os.getenv("DATA_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
 # Model Configuration
 MODEL_FILENAME = 'risk_model.joblib'
 MODEL_PATH = MODELS_DIR / MODEL_FILENAME
@@ -15,6 +19,34 @@ MODEL_PATH = MODELS_DIR / MODEL_FILENAME
 INDICATOR_COLS = ['IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN', 'INDE', 'Defasagem']
 FEATURE_COLS = ['IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN', 'INDE', 'Defasagem']
 
+# Faixas válidas das features (indicadores de 0 a 10, com folga para arredondamentos da planilha,
+# ex: IAA 10.002; Defasagem em fases, negativa quando o aluno está atrasado)
+FEATURE_RANGES = {col: (0.0, 10.5) for col in INDICATOR_COLS if col != 'Defasagem'}
+FEATURE_RANGES['Defasagem'] = (-10.0, 10.0)
+
+# --- Ingestão das planilhas PEDE (ver `src/data_loader.py`) ---
+# Abas anuais reconhecidas pelo nome; o ano vem do próprio nome (ex: PEDE2025)
+SHEET_NAME_PATTERN = r'^PEDE\s*(\d{4})$'
+
+# Esquema padrão de uma aba anual ({year} = ano com 4 dígitos, {yy} = 2 dígitos)
+#   rename:   colunas da planilha -> nome padronizado (colunas ausentes são ignoradas)
+#   id_col:   identificador do aluno, normalizado para texto sem espaços nas bordas
+#   year_col: coluna criada com o ano da aba
+DEFAULT_SHEET_SCHEMA = {
+    'rename': {'INDE {year}': 'INDE'},
+    'id_col': 'RA',
+    'year_col': 'Ano',
+}
+
+# Ajustes por ano (as chaves informadas substituem as do esquema padrão).
+# Anos sem entrada usam apenas o padrão, então uma aba PEDE2025 no formato de 2024 não exige mudanças aqui.
+SHEET_SCHEMAS = {
+    2022: {'rename': {'INDE {yy}': 'INDE', 'Defas': 'Defasagem'}},
+}
+
+# Processos usados para ler as abas e planilhas em paralelo (0 = automático, 1 = sem paralelismo)
+DATA_LOAD_WORKERS = int(os.getenv("DATA_LOAD_WORKERS", 0))
+
 # Random State
 RANDOM_STATE = 42
 
@@ -0,0 +1,208 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .config import DATA_CACHE_DIR
+
+# pyarrow é opcional: sem ele, `load_data` lê sempre a planilha (sem cache)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = pq = None
+
+# Versão do formato do cache: mudar aqui invalida os caches já gravados
+CACHE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# Metadado do Parquet com as colunas de tipos mistos (ver `_encode_frame`)
+MIXED_METADATA_KEY = b"pede_mixed_columns"
+_SEPARATOR = "::"
+
+
+def cache_available() -> bool:
+    """Indica se o cache pode ser usado (pyarrow instalado)."""
+    return pq is not None
+
+def workbook_key(file_path) -> str:
+    """
+    Chave do cache: hash SHA-256 do conteúdo da planilha combinado com o mtime.
+
+    Qualquer alteração no arquivo (conteúdo ou data de modificação) gera uma chave nova.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(str(os.stat(file_path).st_mtime_ns).encode())
+    digest.update(f"v{CACHE_FORMAT_VERSION}".encode())
+    return digest.hexdigest()
+
+def cache_dir_for(file_path, key: str, cache_root=None) -> Path:
+    """
+    Diretório do cache de uma versão da planilha (`<raiz>/<nome>-<origem[:8]>-<chave[:16]>`).
+
+    O hash do caminho absoluto da planilha (`origem`) separa planilhas de mesmo nome em pastas
+    diferentes (ex: `escola_a/pede.xlsx` e `escola_b/pede.xlsx`), que senão apagariam o cache
+    uma da outra em `_remove_stale`.
+    """
+    cache_root = Path(cache_root) if cache_root is not None else DATA_CACHE_DIR
+    source = hashlib.sha256(str(Path(file_path).resolve()).encode("utf-8")).hexdigest()
+    return cache_root / f"{Path(file_path).stem}-{source[:8]}-{key[:16]}"
+
+def read_cache(file_path, key: str, cache_root=None):
+    """
+    Lê os DataFrames já tratados do cache, se existir um cache válido para a chave.
+
+    Returns:
+        dict | None: {ano: DataFrame}, ou None se não houver cache (ou se ele estiver corrompido).
+    """
+    if not cache_available():
+        return None
+    directory = cache_dir_for(file_path, key, cache_root)
+    try:
+        with open(directory / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("key") != key:
+            return None
+        return {
+            int(year): _decode_table(pq.read_table(directory / filename))
+            for year, filename in manifest["sheets"].items()
+        }
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Cache da planilha ignorado ({directory}): {e}")
+        return None
+
+def write_cache(file_path, key: str, data: dict, cache_root=None):
+    """
+    Grava um Parquet por aba e um manifesto com a chave, de forma atômica.
+
+    Os arquivos são gravados em um diretório temporário renomeado ao final; caches de versões
+    anteriores da mesma planilha são removidos.
+
+    Args:
+        file_path (str): Planilha de origem.
+        key (str): Chave calculada por `workbook_key`.
+        data (dict): {ano: DataFrame} já renomeado e limpo (saída de `load_data`).
+        cache_root (str, optional): Raiz do cache. Padrão: `DATA_CACHE_DIR`.
+
+    Returns:
+        Path | None: Diretório do cache, ou None se o pyarrow não estiver instalado.
+    """
+    if not cache_available():
+        return None
+    directory = cache_dir_for(file_path, key, cache_root)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_dir = Path(tempfile.mkdtemp(dir=directory.parent, prefix=".tmp-"))
+    try:
+        sheets = {}
+        for year, df in data.items():
+            filename = f"PEDE{year}.parquet"
+            pq.write_table(_encode_frame(df), tmp_dir / filename)
+            sheets[str(year)] = filename
+        manifest = {
+            "key": key,
+            "source": str(Path(file_path).resolve()),
+            "format_version": CACHE_FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "sheets": sheets,
+        }
+        with open(tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Outro processo gravou o mesmo cache primeiro
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _remove_stale(directory)
+    return directory
+
+def _remove_stale(current: Path):
+    """Remove os caches de outras versões da mesma planilha (mesmo nome e mesmo caminho de origem)."""
+    prefix = current.name.rsplit("-", 1)[0] + "-"
+    for path in current.parent.glob(f"{prefix}*"):
+        if path != current and path.is_dir() and len(path.name) == len(current.name):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _value_kind(value):
+    if isinstance(value, datetime):
+        return "datetime"
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "float"
+    return "str"
+
+def _encode_frame(df: pd.DataFrame):
+    """
+    Converte o DataFrame em uma tabela Arrow tipada.
+
+    Colunas numéricas e de datas mantêm o tipo, e colunas `object` só com textos viram strings.
+    As planilhas do PEDE também têm colunas `object` com outros tipos, às vezes misturados (ex:
+    `Idade` com inteiros e datas, `Fase` com inteiros e textos), que o Parquet não aceita. Cada
+    uma é dividida em uma coluna por tipo (`Idade::int`, `Idade::datetime`), e `_decode_table`
+    as junta de volta com os valores originais, para que a lógica que depende do tipo (ex:
+    `.year` em datas) continue igual.
+    """
+    columns, mixed = {}, {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype != object:
+            columns[col] = series
+            continue
+        values = series.to_numpy()
+        notna = pd.notna(values)
+        kinds = np.array([_value_kind(v) if present else "" for v, present in zip(values, notna)], dtype=object)
+        present_kinds = sorted(set(kinds[notna]))
+        if present_kinds in ([], ["str"]):
+            columns[col] = series.where(notna, None)
+            continue
+        mixed[col] = present_kinds
+        for kind in present_kinds:
+            part = np.where(kinds == kind, values, None)
+            if kind == "str":
+                part = np.array([None if v is None else str(v) for v in part], dtype=object)
+            columns[f"{col}{_SEPARATOR}{kind}"] = pd.Series(part, dtype=object)
+
+    table = pa.Table.from_pandas(pd.DataFrame(columns, index=df.index), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[MIXED_METADATA_KEY] = json.dumps({"columns": list(map(str, df.columns)), "mixed": mixed}).encode("utf-8")
+    return table.replace_schema_metadata(metadata)
+
+def _decode_table(table) -> pd.DataFrame:
+    """Inverso de `_encode_frame`: reconstrói as colunas mistas e a ordem original das colunas."""
+    info = json.loads(table.schema.metadata[MIXED_METADATA_KEY])
+    df = table.to_pandas()
+    for col in info["columns"]:
+        if col in info["mixed"]:
+            merged = np.full(len(df), np.nan, dtype=object)
+            for kind in info["mixed"][col]:
+                part = df.pop(f"{col}{_SEPARATOR}{kind}")
+                mask = part.notna().to_numpy()
+                if kind == "datetime":
+                    merged[mask] = [value.to_pydatetime() for value in part[mask]]
+                elif kind in ("int", "bool"):
+                    merged[mask] = part[mask].astype(kind).tolist()
+                else:
+                    merged[mask] = part[mask].tolist()
+            df[col] = merged
+        elif df[col].dtype == object:
+            # Valores ausentes voltam como NaN, como na leitura direta do Excel
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df[info["columns"]]
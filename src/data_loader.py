@@ -1,58 +1,163 @@
 import pandas as pd
 import numpy as np
 import os
+import re
+import zipfile
+import itertools
+from xml.etree import ElementTree
+from concurrent.futures import ProcessPoolExecutor
 
-def load_data(file_path):
+from . import data_cache
+from .config import (
+    DATA_CACHE_ENABLED, DATA_LOAD_WORKERS, SHEET_NAME_PATTERN, DEFAULT_SHEET_SCHEMA, SHEET_SCHEMAS
+)
+
+def load_data(file_path, use_cache=None, workers=None):
     """
-    Carrega dados de múltiplas abas de um arquivo Excel e padroniza os DataFrames.
+    Carrega as abas anuais de uma ou mais planilhas Excel e padroniza os DataFrames.
+
+    Toda aba cujo nome segue `SHEET_NAME_PATTERN` (ex: PEDE2022, PEDE2025) é lida, com o ano
+    tirado do próprio nome. A renomeação de colunas, a normalização do RA e a coluna de ano
+    seguem o esquema do ano (`schema_for_year`), e as colunas de indicadores são convertidas
+    para numérico.
 
-    Lê as abas correspondentes aos anos de 2022, 2023 e 2024, realiza a renomeação de colunas
-    para um padrão comum e aplica limpeza inicial em colunas numéricas.
+    As abas de todas as planilhas são lidas em um pool de processos (`workers`). Com várias
+    planilhas (ex: uma por escola), as abas do mesmo ano são concatenadas na ordem dos arquivos.
+
+    O resultado de cada planilha é guardado em Parquet (`src/data_cache.py`, um arquivo por aba),
+    com chave no hash do conteúdo e no mtime. As chamadas seguintes leem o Parquet, bem mais rápido
+    que o openpyxl; se a planilha mudar, o cache é refeito automaticamente. Sem o pyarrow
+    instalado, a planilha é lida diretamente.
 
     Args:
-        file_path (str): Caminho absoluto ou relativo para o arquivo Excel (.xlsx).
+        file_path (str | list): Caminho da planilha (.xlsx) ou lista de caminhos.
+        use_cache (bool, optional): Usa o cache em Parquet. Padrão: `DATA_CACHE_ENABLED`.
+        workers (int, optional): Processos de leitura. Padrão: `DATA_LOAD_WORKERS` (0 = um por
+            aba, limitado ao número de CPUs).
 
     Returns:
         dict: Um dicionário onde as chaves são os anos (int) e os valores são os DataFrames (pd.DataFrame) carregados e tratados.
               Exemplo: {2022: df_22, 2023: df_23, ...}
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
-        
-    xls = pd.ExcelFile(file_path)
-    data = {}
-    
-    # --- 2022 ---
-    if 'PEDE2022' in xls.sheet_names:
-        df = pd.read_excel(xls, 'PEDE2022')
-        df.rename(columns={
-            'INDE 22': 'INDE', 'Defas': 'Defasagem', 
-            'IAA': 'IAA', 'IEG': 'IEG', 'IPS': 'IPS', 'IDA': 'IDA', 'IPV': 'IPV', 'IAN': 'IAN'
-        }, inplace=True)
-        df = _clean_numeric_cols(df)
-        df['RA'] = df['RA'].astype(str).str.strip()
-        df['Ano'] = 2022
-        data[2022] = df
-        
-    # --- 2023 ---
-    if 'PEDE2023' in xls.sheet_names:
-        df = pd.read_excel(xls, 'PEDE2023')
-        df.rename(columns={'INDE 2023': 'INDE'}, inplace=True)
-        df = _clean_numeric_cols(df)
-        df['RA'] = df['RA'].astype(str).str.strip()
-        df['Ano'] = 2023
-        data[2023] = df
-
-    # --- 2024 ---
-    if 'PEDE2024' in xls.sheet_names:
-        df = pd.read_excel(xls, 'PEDE2024')
-        df.rename(columns={'INDE 2024': 'INDE'}, inplace=True)
-        df = _clean_numeric_cols(df)
-        df['RA'] = df['RA'].astype(str).str.strip()
-        df['Ano'] = 2024
-        data[2024] = df
-        
-    return data
+    file_paths = [file_path] if isinstance(file_path, (str, os.PathLike)) else list(file_path)
+    for path in file_paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+
+    use_cache = DATA_CACHE_ENABLED if use_cache is None else use_cache
+    use_cache = use_cache and data_cache.cache_available()
+
+    # 1. Planilhas já em cache
+    loaded, keys = {}, {}
+    for path in file_paths:
+        if use_cache:
+            keys[path] = data_cache.workbook_key(path)
+            loaded[path] = data_cache.read_cache(path, keys[path])
+
+    # 2. Demais planilhas: uma tarefa por aba, em paralelo
+    pending = [path for path in file_paths if loaded.get(path) is None]
+    tasks = [(path, sheet, year) for path in pending for sheet, year in list_year_sheets(path)]
+    parsed = {path: {} for path in pending}
+    for (path, _, year), df in zip(tasks, _run_tasks(tasks, workers) if tasks else []):
+        parsed[path][year] = df
+
+    for path in pending:
+        loaded[path] = dict(sorted(parsed[path].items()))
+        if use_cache:
+            try:
+                data_cache.write_cache(path, keys[path], loaded[path])
+            except Exception as e:
+                # O cache é apenas uma otimização: falhas de gravação não impedem a carga
+                print(f"Não foi possível gravar o cache da planilha: {e}")
+
+    # 3. Junta as abas do mesmo ano (na ordem dos arquivos)
+    by_year = {}
+    for path in file_paths:
+        for year, df in loaded[path].items():
+            by_year.setdefault(year, []).append(df)
+    return {
+        year: frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        for year, frames in sorted(by_year.items())
+    }
+
+def schema_for_year(year):
+    """
+    Esquema de padronização de uma aba anual (`DEFAULT_SHEET_SCHEMA` + ajustes de `SHEET_SCHEMAS`).
+
+    Os marcadores `{year}` e `{yy}` dos nomes de colunas são preenchidos com o ano.
+
+    Returns:
+        dict: Chaves 'rename', 'id_col' e 'year_col'.
+    """
+    schema = {**DEFAULT_SHEET_SCHEMA, **SHEET_SCHEMAS.get(year, {})}
+    fmt = {'year': year, 'yy': f"{year % 100:02d}"}
+    schema['rename'] = {src.format(**fmt): dst for src, dst in schema['rename'].items()}
+    return schema
+
+def list_year_sheets(file_path):
+    """
+    Lista as abas anuais da planilha.
+
+    Em arquivos .xlsx, os nomes vêm direto do `xl/workbook.xml`, sem carregar a planilha no
+    openpyxl (que custa cerca de meio segundo por abertura).
+
+    Returns:
+        list: Pares (nome da aba, ano), na ordem da planilha.
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        sheet_names = [el.get("name") for el in root.iter() if el.tag.endswith("}sheet")]
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+        with pd.ExcelFile(file_path) as xls:
+            sheet_names = xls.sheet_names
+    sheets = []
+    for name in sheet_names:
+        match = re.match(SHEET_NAME_PATTERN, str(name).strip(), flags=re.IGNORECASE)
+        if match:
+            sheets.append((name, int(match.group(1))))
+    return sheets
+
+def parse_sheet(source, sheet_name, year):
+    """
+    Lê uma aba anual e aplica o esquema do ano (renomeação, limpeza numérica, RA e ano).
+
+    Função de módulo (e não método) para poder rodar nos processos do pool.
+
+    Args:
+        source (str | pd.ExcelFile): Caminho da planilha ou planilha já aberta.
+        sheet_name (str): Nome da aba.
+        year (int): Ano da aba.
+    """
+    schema = schema_for_year(year)
+    df = pd.read_excel(source, sheet_name=sheet_name)
+    df.rename(columns=schema['rename'], inplace=True)
+    df = _clean_numeric_cols(df)
+    id_col = schema['id_col']
+    if id_col in df.columns:
+        df[id_col] = df[id_col].astype(str).str.strip()
+    df[schema['year_col']] = year
+    return df
+
+def _run_tasks(tasks, workers=None):
+    """
+    Executa `parse_sheet` para cada tarefa (planilha, aba, ano), na ordem das tarefas.
+
+    Com mais de um processo, cada aba vai para um processo do pool (que abre a planilha por
+    conta própria); sem paralelismo, cada planilha é aberta uma única vez para todas as abas.
+    """
+    workers = DATA_LOAD_WORKERS if workers is None else workers
+    if workers <= 0:
+        workers = min(len(tasks), os.cpu_count() or 1)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            return list(pool.map(parse_sheet, *zip(*tasks)))
+
+    results = []
+    for path, group in itertools.groupby(tasks, key=lambda task: task[0]):
+        with pd.ExcelFile(path) as xls:
+            results.extend(parse_sheet(xls, sheet, year) for _, sheet, year in group)
+    return results
 
 def _clean_numeric_cols(df):
     """
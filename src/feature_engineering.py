@@ -3,6 +3,9 @@ import numpy as np
 import re
 from .config import INDICATOR_COLS
 
+# Ano de referência usado para converter ano de nascimento em idade quando a base não informa o ano
+DEFAULT_REFERENCE_YEAR = 2023
+
 # Tabela Oficial de Fase Ideal por Idade (Baseado no Relatório PEDE 2022)
 AGE_FASE_MAP = {
     6: 0, 7: 0, 8: 0,     # Alfa (Até 8 anos)
@@ -35,18 +38,192 @@ def get_fase_num(fase_val):
     
     return None
 
+def _find_defasagem_columns(columns):
+    """Identifica as colunas de fase, idade e ano (Normalização de nomes mais flexível)."""
+    col_fase = next((c for c in columns if 'FASE' in c.upper() and 'IDEAL' not in c.upper()), None)
+    col_idade = next((c for c in columns if 'IDADE' in c.upper()), None)
+    col_ano = next((c for c in columns if 'ANO' in c.upper()), None)
+    return col_fase, col_idade, col_ano
+
+def _map_distinct(series, func, na_value=np.nan):
+    """
+    Aplica `func` uma vez por valor distinto da coluna e espalha o resultado (float) pelas linhas.
+
+    Colunas como Fase e Idade têm poucas dezenas de valores distintos, então o custo em Python
+    não cresce com o número de linhas. Valores ausentes recebem `na_value`.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = np.array([func(value) for value in uniques], dtype=float)
+    out = np.full(len(codes), na_value, dtype=float)
+    present = codes >= 0
+    out[present] = mapped[codes[present]]
+    return out
+
+def _parse_age(value):
+    """Idade de um valor da planilha (mesma regra do `get_lag`): datas viram o ano e números são truncados."""
+    if hasattr(value, 'year'):
+        value = value.year
+    if pd.isnull(value):
+        return np.nan
+    try:
+        return float(int(float(value)))
+    except Exception:
+        return np.nan
+
+def _parse_reference_year(value):
+    """Ano de referência para converter ano de nascimento em idade (NaN indica valor inválido)."""
+    try:
+        return float(int(float(value)))
+    except Exception:
+        return np.nan
+
+def _parse_fase(value):
+    fase = get_fase_num(value)
+    return np.nan if fase is None else float(fase)
+
+def _age_values(series):
+    """Idade por linha (float, NaN = inválida), com caminhos vetorizados para colunas de datas e numéricas."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.year.to_numpy(dtype=float, na_value=np.nan)
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            return np.where(np.isfinite(values), np.trunc(values), np.nan)
+    return _map_distinct(series, _parse_age)
+
+def _ideal_fase_lookup():
+    """AGE_FASE_MAP como array indexado por idade (NaN nas idades sem entrada)."""
+    min_age, max_age = min(AGE_FASE_MAP), max(AGE_FASE_MAP)
+    table = np.full(max_age - min_age + 1, np.nan)
+    for age, fase in AGE_FASE_MAP.items():
+        table[age - min_age] = fase
+    return min_age, max_age, table
+
+def compute_defasagem(idade, fase, ano=None, default_year=DEFAULT_REFERENCE_YEAR):
+    """
+    Motor vetorizado da regra de defasagem: D = Fase Real - Fase Ideal (pela idade).
+
+    É a implementação única da regra, usada no treino (`calculate_corrected_defasagem`), na API
+    (campos `idade`/`fase`), no dashboard e nos scripts. A fase é interpretada uma vez por valor
+    distinto, a idade vem de datas ou anos de nascimento com operações vetoriais e a fase ideal
+    é obtida por indexação em um array.
+
+    Args:
+        idade (array-like): Idade, data de nascimento ou ano de nascimento (> 1900) de cada aluno.
+        fase (array-like): Fase atual ('ALFA', 'Fase 3', '4B', 3...).
+        ano (array-like | int, optional): Ano de referência para converter ano de nascimento em
+            idade. Valores ausentes usam `default_year`; valores inválidos anulam o cálculo da linha.
+        default_year (int): Ano de referência quando `ano` não é informado ou está ausente.
+
+    Returns:
+        np.ndarray: Defasagem (float) por aluno; NaN quando a regra não se aplica.
+    """
+    idade = _age_values(_as_series(idade))
+    n_rows = len(idade)
+
+    # 1. Idade (datas viram o ano; inteiros > 1900 são ano de nascimento)
+    birth_year = idade > 1900
+    if birth_year.any():
+        if ano is None or np.ndim(ano) == 0:
+            reference = float(default_year if ano is None or pd.isna(ano) else _parse_reference_year(ano))
+            ano_atual = np.full(n_rows, reference)
+        else:
+            ano_atual = _map_distinct(_as_series(ano), _parse_reference_year, na_value=float(default_year))
+        idade = np.where(birth_year, ano_atual - idade, idade)
+
+    # 2. Fase Ideal (tabela; fora dela, > 18 anos -> 8 e < 6 anos -> 0)
+    min_age, max_age, table = _ideal_fase_lookup()
+    ideal = np.full(n_rows, np.nan)
+    in_table = (idade >= min_age) & (idade <= max_age)
+    ideal[in_table] = table[idade[in_table].astype(int) - min_age]
+    without_entry = np.isnan(ideal) & ~np.isnan(idade)
+    ideal[without_entry & (idade > 18)] = 8
+    ideal[without_entry & (idade < 6)] = 0
+
+    # 3. Cálculo: Real - Ideal (Ex: Fase 3 (Real) - Fase 4 (Ideal) = -1 (Atrasado))
+    real = _map_distinct(_as_series(fase), _parse_fase)
+    return real - ideal
+
+def _as_series(values):
+    if isinstance(values, pd.Series):
+        return values
+    if np.ndim(values) == 0:
+        values = [values]
+    return pd.Series(np.asarray(values, dtype=object) if not isinstance(values, np.ndarray) else values)
+
 def calculate_corrected_defasagem(df):
     """
     Recalcula a defasagem baseada na Idade e Fase Real.
     D = Fase Real - Fase Ideal
     Resultado < 0 indica Atraso (Risco).
+
+    Usa o motor vetorizado `compute_defasagem`, com o mesmo resultado da versão linha a linha
+    (`_calculate_corrected_defasagem_rowwise`). Linhas sem cálculo possível mantêm a
+    `Defasagem` original.
+    """
+    df_c = df.copy()
+    col_fase, col_idade, col_ano = _find_defasagem_columns(df_c.columns)
+    if not col_fase or not col_idade:
+        # Se não tiver colunas para recalcular, retorna original se existir
+        return df_c
+
+    lag = compute_defasagem(df_c[col_idade], df_c[col_fase], df_c[col_ano] if col_ano else None)
+    computed = ~np.isnan(lag)
+    df_c['Defasagem_Corrected'] = _with_fallback(df_c, lag, computed)
+    
+    # Substitui a coluna original pela calculada
+    # Onde for NaN (falha no calculo), preenche com 0 (neutro) ou mantém original se existir
+    original_defasagem = df_c.get('Defasagem', 0)
+    df_c['Defasagem'] = _fill_missing(df_c['Defasagem_Corrected'], original_defasagem)
+    
+    return df_c
+
+def _fill_missing(series, fill_value):
+    """
+    `fillna` com a conversão de tipo explícita.
+
+    Colunas `object` (ex: nenhuma linha calculada e sem Defasagem original) eram convertidas
+    implicitamente pelo `fillna` (comportamento descontinuado no pandas). O `infer_objects` faz
+    a mesma conversão de forma explícita, então o dtype do resultado não muda com a versão.
+    """
+    with pd.option_context('future.no_silent_downcasting', True):
+        return series.fillna(fill_value).infer_objects(copy=False)
+
+def _with_fallback(df, lag, computed):
+    """
+    Combina a defasagem calculada com a original nas linhas sem cálculo.
+
+    Reproduz o tipo da coluna gerada pelo `apply` da versão linha a linha: inteiros quando todas
+    as linhas foram calculadas e, caso contrário, o tipo resultante da mistura com a `Defasagem`
+    original (ou com None, se ela não existir).
+    """
+    if computed.all():
+        return pd.Series(lag.astype(np.int64), index=df.index)
+    if 'Defasagem' not in df.columns:
+        if not computed.any():
+            return pd.Series([None] * len(df), index=df.index, dtype=object)
+        return pd.Series(lag, index=df.index)
+
+    original = df['Defasagem']
+    if original.dtype.kind in 'iu':
+        return pd.Series(np.where(computed, lag, original.to_numpy()).astype(original.dtype), index=df.index)
+    if original.dtype.kind == 'f':
+        return pd.Series(np.where(computed, lag, original.to_numpy()), index=df.index)
+    result = original.astype(object).copy()
+    result[computed] = lag[computed].astype(np.int64)
+    return result
+
+def _calculate_corrected_defasagem_rowwise(df):
+    """
+    Implementação original, linha a linha (`apply` com `get_fase_num` por linha).
+
+    Mantida como referência para o teste de equivalência e o benchmark
+    (`scripts/benchmark_defasagem.py`); use `calculate_corrected_defasagem`.
     """
     df_c = df.copy()
     
     # Identificar colunas (Normalização de nomes mais flexível)
-    col_fase = next((c for c in df_c.columns if 'FASE' in c.upper() and 'IDEAL' not in c.upper()), None)
-    col_idade = next((c for c in df_c.columns if 'IDADE' in c.upper()), None)
-    col_ano = next((c for c in df_c.columns if 'ANO' in c.upper()), None)
+    col_fase, col_idade, col_ano = _find_defasagem_columns(df_c.columns)
     
     if not col_fase or not col_idade:
         # Se não tiver colunas para recalcular, retorna original se existir
@@ -106,7 +283,7 @@ def calculate_corrected_defasagem(df):
     # Substitui a coluna original pela calculada
     # Onde for NaN (falha no calculo), preenche com 0 (neutro) ou mantém original se existir
     original_defasagem = df_c.get('Defasagem', 0)
-    df_c['Defasagem'] = df_c['Defasagem_Corrected'].fillna(original_defasagem)
+    df_c['Defasagem'] = _fill_missing(df_c['Defasagem_Corrected'], original_defasagem)
     
     return df_c
 
@@ -0,0 +1,166 @@
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+from .modeling import export_model_arrays
+
+
+class CompiledRiskModel:
+    """
+    Motor de inferência em NumPy puro para o pipeline de risco (Imputer -> Scaler -> Floresta).
+
+    Utiliza os arrays gerados por `src.modeling.export_model_arrays`: medianas do imputer,
+    estatísticas do scaler e todas as árvores concatenadas. A descida nas árvores é feita de forma
+    vetorizada (todas as linhas x todas as árvores ao mesmo tempo), com um número fixo de passos
+    igual à profundidade máxima. Reproduz `RiskModel.predict_proba` (diferença < 1e-9) sem o
+    overhead de validação do scikit-learn.
+
+    Attributes:
+        feature_cols (list): Ordem das features esperada pelo modelo.
+    """
+    accepts_arrays = True
+
+    def __init__(self, arrays):
+        self.feature_cols = [str(c) for c in arrays['feature_cols']]
+        self.medians = np.asarray(arrays['medians'], dtype=np.float64)
+        self.mean = np.asarray(arrays['mean'], dtype=np.float64)
+        self.scale = np.asarray(arrays['scale'], dtype=np.float64)
+        self.roots = np.asarray(arrays['roots'], dtype=np.intp)
+        self.feature = np.asarray(arrays['feature'], dtype=np.intp)
+        self.threshold = np.asarray(arrays['threshold'], dtype=np.float64)
+        self.left = np.asarray(arrays['left'], dtype=np.intp)
+        self.right = np.asarray(arrays['right'], dtype=np.intp)
+        self.missing_left = np.asarray(arrays['missing_left'], dtype=bool)
+        self.value = np.asarray(arrays['value'], dtype=np.float64)
+        self.max_depth = int(arrays['max_depth'])
+        self.n_trees = len(self.roots)
+        # Filhos intercalados [direita, esquerda] por nó: próximo nó = children[2 * nó + foi_para_esquerda]
+        if 'children' in arrays:
+            self.children = np.asarray(arrays['children'], dtype=np.intp)
+        else:
+            self.children = np.ascontiguousarray(np.stack([self.right, self.left], axis=1).ravel())
+
+    @classmethod
+    def from_risk_model(cls, model):
+        """
+        Compila um RiskModel (ou Pipeline) treinado.
+
+        Raises:
+            ValueError: Se o modelo não for suportado (ver `export_model_arrays`).
+        """
+        return cls(export_model_arrays(model))
+
+    @classmethod
+    def load(cls, filepath, mmap_mode=None):
+        """
+        Carrega um modelo compilado salvo com `RiskModel.export_compiled` (.npz).
+
+        Args:
+            filepath (str): Caminho do arquivo .npz.
+            mmap_mode (str, optional): Repassado ao `np.load`.
+        """
+        with np.load(filepath, mmap_mode=mmap_mode) as data:
+            return cls({key: data[key] for key in data.files})
+
+    @classmethod
+    def load_shared(cls, filepath):
+        """
+        Carrega um modelo salvo com `save_shared` com os arrays mapeados em memória (somente leitura).
+
+        Vários processos (ex: workers do uvicorn) que carregam o mesmo arquivo compartilham as
+        mesmas páginas de memória do sistema operacional, em vez de cada um manter a sua cópia.
+
+        Args:
+            filepath (str): Caminho do arquivo .joblib gerado por `save_shared`.
+        """
+        return cls(joblib.load(filepath, mmap_mode='r'))
+
+    def save(self, filepath):
+        """Salva os arrays do modelo compilado em disco (.npz)."""
+        np.savez(filepath, **self.to_arrays())
+
+    def save_shared(self, filepath):
+        """Salva os arrays sem compressão (.joblib), para uso com `load_shared` (mmap)."""
+        joblib.dump(self.to_arrays() | {'children': self.children}, filepath)
+
+    def to_arrays(self):
+        """Retorna o dicionário de arrays que define o modelo."""
+        return {
+            'feature_cols': np.asarray(self.feature_cols, dtype=str),
+            'medians': self.medians, 'mean': self.mean, 'scale': self.scale,
+            'roots': self.roots, 'feature': self.feature, 'threshold': self.threshold,
+            'left': self.left, 'right': self.right, 'missing_left': self.missing_left,
+            'value': self.value, 'max_depth': np.asarray(self.max_depth, dtype=np.intp),
+        }
+
+    def _to_matrix(self, X):
+        """Converte a entrada para uma matriz float64 (n_amostras, n_features) na ordem de `feature_cols`."""
+        if isinstance(X, pd.DataFrame):
+            return X[self.feature_cols].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.feature_cols):
+            raise ValueError(f"Esperadas {len(self.feature_cols)} features, recebidas {X.shape[1]}")
+        return X
+
+    def transform(self, X):
+        """
+        Aplica imputação pela mediana e padronização, como TemporalPreprocessor + DataFrameScaler.
+
+        Returns:
+            np.ndarray: Matriz float32 pronta para as árvores (mesma conversão feita pelo sklearn).
+        """
+        X = self._to_matrix(X)
+        X = np.where(np.isnan(X), self.medians, X)
+        X = (X - self.mean) / self.scale
+        if np.isinf(X).any():
+            raise ValueError("Input contains infinity or a value too large for dtype('float32').")
+        return X.astype(np.float32)
+
+    def predict_proba(self, X, timings=None):
+        """
+        Retorna a probabilidade da classe positiva (Risco).
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Dados de entrada (ndarray na ordem de `feature_cols`).
+            timings (dict, optional): Se informado, recebe a duração (s) das etapas
+                'imputer_scaler' e 'classifier' (mesmos nomes de `RiskModel.predict_proba`).
+
+        Returns:
+            np.ndarray: Array com as probabilidades da classe 1.
+        """
+        start = time.perf_counter()
+        Xt = self.transform(X)
+        if timings is not None:
+            timings['imputer_scaler'] = time.perf_counter() - start
+            start = time.perf_counter()
+        n_samples, n_features = Xt.shape
+        X_flat = Xt.ravel()
+        has_missing = np.isnan(X_flat).any()
+
+        # Índice linear do início de cada linha em X_flat, combinado com a feature de cada nó
+        row_offset = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n_samples, self.n_trees))
+
+        for _ in range(self.max_depth):
+            x = X_flat.take(row_offset + self.feature.take(node))
+            go_left = x <= self.threshold.take(node)
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left.take(node)
+            node = self.children.take(2 * node + go_left)
+
+        probabilities = self.value.take(node).sum(axis=1) / self.n_trees
+        if timings is not None:
+            timings['classifier'] = time.perf_counter() - start
+        return probabilities
+
+    def predict(self, X, threshold=0.5):
+        """
+        Realiza predições de classe (0 ou 1) a partir do limiar informado.
+
+        Returns:
+            np.ndarray: Array com as classes preditas.
+        """
+        return (self.predict_proba(X) >= threshold).astype(int)
@@ -1,8 +1,19 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+from sklearn.pipeline import Pipeline
+import copy
+import time
 import joblib
 from .config import RANDOM_STATE
+from .preprocessing import TemporalPreprocessor, DataFrameScaler, FusedPreprocessor
+
+# Nome de cada etapa do pipeline nas medições de latência (`RiskModel.predict_proba(timings=...)`)
+STAGE_NAMES = {
+    'TemporalPreprocessor': 'imputer',
+    'DataFrameScaler': 'scaler',
+    'FusedPreprocessor': 'imputer_scaler',
+}
 
 class RiskModel:
     """
@@ -14,7 +25,11 @@ class RiskModel:
     Attributes:
         model (RandomForestClassifier): O estimador subjacente.
         feature_cols (list): Lista de nomes das features utilizadas no treinamento.
+        accepts_arrays (bool): Se True, `predict_proba` aceita ndarrays na ordem de `feature_cols`
+            sem conversão para DataFrame (ver `fuse_preprocessing`).
     """
+    accepts_arrays = False
+
     def __init__(self, model=None, n_estimators=200, max_depth=5):
         if model:
             self.model = model
@@ -52,17 +67,34 @@ class RiskModel:
         """
         return self.model.predict(X)
         
-    def predict_proba(self, X):
+    def predict_proba(self, X, timings=None):
         """
         Retorna a probabilidade da classe positiva (Risco).
 
         Args:
             X (pd.DataFrame): Dados de entrada.
+            timings (dict, optional): Se informado, recebe a duração (s) de cada etapa do pipeline
+                ('imputer', 'scaler' ou 'imputer_scaler' quando fundidos, e 'classifier').
 
         Returns:
             np.ndarray: Array com as probabilidades da classe 1.
         """
-        return self.model.predict_proba(X)[:, 1]
+        if timings is None or not isinstance(self.model, Pipeline):
+            return self.model.predict_proba(X)[:, 1]
+
+        # Mesma sequência do Pipeline.predict_proba, medindo cada etapa
+        Xt = X
+        for name, step in self.model.steps[:-1]:
+            if step is None or step == 'passthrough':
+                continue
+            start = time.perf_counter()
+            Xt = step.transform(Xt)
+            timings[STAGE_NAMES.get(type(step).__name__, name)] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        probabilities = self.model.steps[-1][1].predict_proba(Xt)[:, 1]
+        timings['classifier'] = time.perf_counter() - start
+        return probabilities
     
     def save(self, filepath):
         """
@@ -83,3 +115,149 @@ class RiskModel:
         """
         self.model = joblib.load(filepath)
         print(f"Modelo carregado de {filepath}")
+
+    def fuse_preprocessing(self):
+        """
+        Cria uma versão do modelo para servir, com imputação e padronização fundidas.
+
+        O pipeline Imputer -> Scaler -> Classificador vira FusedPreprocessor -> Classificador, que
+        trabalha apenas com ndarrays (sem DataFrames por chamada). As probabilidades são idênticas
+        às do modelo original. O modelo original não é alterado.
+
+        Returns:
+            RiskModel: Novo wrapper com `accepts_arrays = True`.
+
+        Raises:
+            ValueError: Se o pipeline não seguir o formato TemporalPreprocessor -> DataFrameScaler -> clf.
+        """
+        steps = self.model.steps if isinstance(self.model, Pipeline) else []
+        if len(steps) != 3 or not isinstance(steps[0][1], TemporalPreprocessor) \
+                or not isinstance(steps[1][1], DataFrameScaler):
+            raise ValueError("Pipeline não suportado para fusão (esperado: preprocessor -> scaler -> clf)")
+
+        fused = FusedPreprocessor.from_steps(steps[0][1], steps[1][1])
+
+        # Cópia rasa do classificador sem os nomes das features: recebe ndarrays sem avisos do sklearn
+        clf = copy.copy(steps[2][1])
+        if hasattr(clf, 'feature_names_in_'):
+            del clf.feature_names_in_
+
+        serving = RiskModel(model=Pipeline([('preprocessor', fused), ('clf', clf)]))
+        serving.feature_cols = list(fused.feature_cols)
+        serving.accepts_arrays = True
+        return serving
+
+    def export_arrays(self):
+        """
+        Achata o pipeline treinado em arrays NumPy contíguos para inferência compilada.
+
+        Veja `export_model_arrays`.
+
+        Returns:
+            dict: Arrays e metadados do modelo (ver `src.inference.CompiledRiskModel`).
+        """
+        return export_model_arrays(self)
+
+    def export_compiled(self, filepath):
+        """
+        Salva o modelo achatado em disco (.npz), pronto para `CompiledRiskModel.load`.
+
+        Args:
+            filepath (str): Caminho de destino para o arquivo (.npz).
+        """
+        arrays = self.export_arrays()
+        np.savez(filepath, **arrays)
+        print(f"Modelo compilado salvo em {filepath}")
+
+
+def export_model_arrays(model):
+    """
+    Converte um RiskModel (ou Pipeline/estimador) treinado em arrays NumPy contíguos.
+
+    Suporta o pipeline padrão do projeto (TemporalPreprocessor -> DataFrameScaler -> floresta de
+    árvores), com as etapas de pré-processamento opcionais. Todas as árvores são concatenadas em
+    vetores únicos de nós; folhas apontam para si mesmas e possuem limiar +inf, de forma que a
+    descida pode ser feita por um número fixo de passos (profundidade máxima) para todas as árvores.
+
+    Args:
+        model (RiskModel | Pipeline | estimador): Modelo treinado.
+
+    Returns:
+        dict: Dicionário com `feature_cols`, `medians`, `mean`, `scale`, `roots`, `feature`,
+            `threshold`, `left`, `right`, `missing_left`, `value` e `max_depth`.
+
+    Raises:
+        ValueError: Se o classificador final não for uma floresta/árvore de decisão suportada,
+            ou se o modelo não estiver treinado.
+    """
+    estimator = model.model if isinstance(model, RiskModel) else model
+    steps = estimator.steps if isinstance(estimator, Pipeline) else [('clf', estimator)]
+
+    feature_cols = model.feature_cols if isinstance(model, RiskModel) else None
+    medians, mean, scale = None, None, None
+
+    for name, step in steps[:-1]:
+        if isinstance(step, TemporalPreprocessor):
+            medians = np.asarray(step.imputer.statistics_, dtype=np.float64)
+            feature_cols = list(step.feature_cols)
+        elif isinstance(step, DataFrameScaler):
+            scaler = step.scaler
+            mean = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_), dtype=np.float64)
+            scale = np.asarray(scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_), dtype=np.float64)
+            feature_cols = list(step.feature_cols)
+        else:
+            raise ValueError(f"Etapa '{name}' ({type(step).__name__}) não suportada pela exportação compilada")
+
+    clf = steps[-1][1]
+    if isinstance(clf, (RandomForestClassifier, ExtraTreesClassifier)):
+        trees = [est.tree_ for est in clf.estimators_]
+    elif hasattr(clf, 'tree_') and hasattr(clf, 'classes_'):
+        trees = [clf.tree_]
+    else:
+        raise ValueError(f"Classificador {type(clf).__name__} não suportado pela exportação compilada")
+
+    if list(clf.classes_) != [0, 1]:
+        raise ValueError(f"Esperadas as classes [0, 1], encontradas {list(clf.classes_)}")
+
+    if feature_cols is None:
+        feature_cols = list(getattr(clf, 'feature_names_in_', range(clf.n_features_in_)))
+    n_features = len(feature_cols)
+
+    if medians is not None and np.isnan(medians).any():
+        raise ValueError("Imputer possui features sem mediana (coluna vazia no treino)")
+
+    roots, feature, threshold, left, right, missing_left, value = [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+        ids = np.arange(offset, offset + n_nodes)
+
+        # Probabilidade da classe 1 em cada nó, normalizada como em DecisionTreeClassifier.predict_proba
+        proba = tree.value[:, 0, :2].astype(np.float64)
+        normalizer = proba.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        left.append(np.where(is_leaf, ids, tree.children_left + offset))
+        right.append(np.where(is_leaf, ids, tree.children_right + offset))
+        missing_left.append(np.asarray(tree.missing_go_to_left, dtype=bool))
+        value.append(proba[:, 1] / normalizer)
+        offset += n_nodes
+
+    return {
+        'feature_cols': np.asarray(feature_cols, dtype=str),
+        'medians': medians if medians is not None else np.full(n_features, np.nan),
+        'mean': mean if mean is not None else np.zeros(n_features),
+        'scale': scale if scale is not None else np.ones(n_features),
+        'roots': np.ascontiguousarray(roots, dtype=np.intp),
+        'feature': np.ascontiguousarray(np.concatenate(feature), dtype=np.intp),
+        'threshold': np.ascontiguousarray(np.concatenate(threshold), dtype=np.float64),
+        'left': np.ascontiguousarray(np.concatenate(left), dtype=np.intp),
+        'right': np.ascontiguousarray(np.concatenate(right), dtype=np.intp),
+        'missing_left': np.ascontiguousarray(np.concatenate(missing_left), dtype=bool),
+        'value': np.ascontiguousarray(np.concatenate(value), dtype=np.float64),
+        'max_depth': np.asarray(max(tree.max_depth for tree in trees), dtype=np.intp),
+    }
@@ -42,14 +42,17 @@ class TemporalPreprocessor(BaseEstimator, TransformerMixin):
         Aplica a imputação aos dados.
 
         Args:
-            X (pd.DataFrame): Dados para transformar.
+            X (pd.DataFrame | np.ndarray): Dados para transformar. Um ndarray deve estar na ordem
+                de `feature_cols` definida no fit.
 
         Returns:
-            pd.DataFrame: Novo DataFrame com valores imputados e colunas/índices preservados.
+            pd.DataFrame | np.ndarray: Novo DataFrame com valores imputados e colunas/índices
+                preservados, ou ndarray quando a entrada for ndarray (sem alocar DataFrames).
         """
+        if isinstance(X, np.ndarray):
+            return _impute_array(X, self.imputer.statistics_)
 
-        X_copy = X.copy()
-        X_imputed = self.imputer.transform(X_copy[self.feature_cols])
+        X_imputed = self.imputer.transform(X[self.feature_cols])
         return pd.DataFrame(X_imputed, columns=self.feature_cols, index=X.index)
 
 
@@ -69,8 +72,101 @@ class DataFrameScaler(BaseEstimator, TransformerMixin):
         return self
         
     def transform(self, X):
-        X_copy = X.copy()
-        X_scaled = self.scaler.transform(X_copy[self.feature_cols])
+        """
+        Aplica a padronização. Um ndarray (na ordem de `feature_cols`) retorna ndarray.
+        """
+        if isinstance(X, np.ndarray):
+            return _scale_array(X, self.scaler)
+
+        X_scaled = self.scaler.transform(X[self.feature_cols])
         return pd.DataFrame(X_scaled, columns=self.feature_cols, index=X.index)
 
 
+class FusedPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Imputação pela mediana e padronização fundidas em uma única passada afim sobre ndarrays.
+
+    Construído a partir de um TemporalPreprocessor e de um DataFrameScaler já ajustados
+    (`from_steps`). Valores ausentes recebem diretamente a mediana já padronizada,
+    pré-calculada; os demais passam por `(x - média) / escala`. O resultado é idêntico
+    ao das duas etapas em sequência, sem alocar DataFrames a cada chamada.
+
+    Attributes:
+        feature_cols (list): Ordem das features esperada na entrada.
+    """
+    def __init__(self, feature_cols=None, medians=None, mean=None, scale=None):
+        self.feature_cols = feature_cols
+        self.medians = medians
+        self.mean = mean
+        self.scale = scale
+
+    @classmethod
+    def from_steps(cls, preprocessor, scaler):
+        """
+        Cria o transformador fundido a partir das etapas ajustadas do pipeline.
+
+        Raises:
+            ValueError: Se as etapas usarem colunas diferentes ou houver features sem mediana.
+        """
+        if list(preprocessor.feature_cols) != list(scaler.feature_cols):
+            raise ValueError("Imputer e Scaler ajustados com colunas diferentes")
+
+        medians = np.asarray(preprocessor.imputer.statistics_, dtype=np.float64)
+        if np.isnan(medians).any():
+            raise ValueError("Imputer possui features sem mediana (coluna vazia no treino)")
+
+        n_features = len(medians)
+        mean = scaler.scaler.mean_ if scaler.scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scaler.scale_ if scaler.scaler.with_std else np.ones(n_features)
+        return cls(
+            feature_cols=list(preprocessor.feature_cols),
+            medians=medians,
+            mean=np.asarray(mean, dtype=np.float64),
+            scale=np.asarray(scale, dtype=np.float64)
+        )
+
+    def fit(self, X, y=None):
+        # Parâmetros vêm de etapas já ajustadas (ver from_steps)
+        return self
+
+    def transform(self, X):
+        """
+        Aplica imputação + padronização em uma única passada.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Dados de entrada (ndarray na ordem de `feature_cols`).
+
+        Returns:
+            np.ndarray: Matriz float64 imputada e padronizada.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_cols].to_numpy(dtype=np.float64)
+        else:
+            X = np.asarray(X, dtype=np.float64)
+        # (mediana - média) / escala: valor final de uma feature ausente
+        filled = (self.medians - self.mean) / self.scale
+        return np.where(np.isnan(X), filled, (X - self.mean) / self.scale)
+
+
+def _impute_array(X, statistics):
+    """Substitui NaN pela mediana de cada coluna, como SimpleImputer.transform, sem DataFrames."""
+    X = np.array(X, dtype=np.float64)
+    valid = ~np.isnan(statistics)
+    if not valid.all():
+        # SimpleImputer descarta colunas que estavam vazias no treino
+        X, statistics = X[:, valid], statistics[valid]
+    mask = np.isnan(X)
+    if mask.any():
+        X[mask] = np.take(statistics, np.nonzero(mask)[1])
+    return X
+
+def _scale_array(X, scaler):
+    """Aplica a padronização de um StandardScaler ajustado, sem validação/alocação de DataFrames."""
+    X = np.array(X, dtype=np.float64)
+    if scaler.with_mean:
+        X -= scaler.mean_
+    if scaler.with_std:
+        X /= scaler.scale_
+    return X
+
+
@@ -0,0 +1,145 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.config import FEATURE_COLS
+
+# Percentis guardados por feature (0, 1, ..., 100)
+QUANTILE_LEVELS = np.linspace(0, 1, 101)
+HISTOGRAM_BINS = 20
+PROFILE_SUFFIX = ".reference.npz"
+
+
+def profile_path_for(model_path):
+    """Caminho do perfil de referência salvo ao lado do artefato (`risk_model.joblib` -> `risk_model.reference.npz`)."""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.name.split(".")[0] + PROFILE_SUFFIX)
+
+
+class FeatureProfile:
+    """
+    Distribuição de referência de uma feature, pré-calculada no treino.
+
+    Attributes:
+        sorted_values (np.ndarray): Valores não nulos, em ordem crescente.
+        quantiles (np.ndarray): Valores nos percentis `QUANTILE_LEVELS`.
+        hist_counts (np.ndarray): Contagens do histograma.
+        hist_edges (np.ndarray): Bordas do histograma (`len(hist_counts) + 1`).
+        median (float): Mediana (mesmo valor usado pelo imputer do pipeline).
+        null_rate (float): Proporção de valores nulos.
+    """
+    def __init__(self, sorted_values, quantiles, hist_counts, hist_edges, median, null_rate):
+        self.sorted_values = sorted_values
+        self.quantiles = quantiles
+        self.hist_counts = hist_counts
+        self.hist_edges = hist_edges
+        self.median = float(median)
+        self.null_rate = float(null_rate)
+
+    @classmethod
+    def from_values(cls, values, bins=HISTOGRAM_BINS):
+        values = np.asarray(values, dtype=float)
+        valid = np.sort(values[~np.isnan(values)])
+        null_rate = float(np.isnan(values).mean()) if len(values) else 0.0
+        if len(valid) == 0:
+            empty = np.array([], dtype=float)
+            return cls(empty, empty, np.array([], dtype=np.int64), empty, np.nan, null_rate)
+        hist_counts, hist_edges = np.histogram(valid, bins=bins)
+        return cls(
+            valid, np.quantile(valid, QUANTILE_LEVELS), hist_counts, hist_edges,
+            np.median(valid), null_rate
+        )
+
+    @property
+    def size(self):
+        return len(self.sorted_values)
+
+
+class ReferenceProfile:
+    """
+    Perfil compacto dos dados de treino, salvo junto ao modelo (`.npz`, sem pickle).
+
+    Substitui a releitura do `reference_data.csv`: monitor de drift, auditoria de imputação e
+    dashboard carregam arrays já ordenados e agregados, e o arquivo acompanha cada versão do
+    modelo no registro (é copiado junto com o `risk_model.joblib` na publicação).
+
+    Attributes:
+        features (dict): `FeatureProfile` por feature, na ordem do treino.
+        n_rows (int): Quantidade de linhas dos dados de treino.
+    """
+    def __init__(self, features: dict, n_rows: int):
+        self.features = features
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_dataframe(cls, X: pd.DataFrame, feature_cols=FEATURE_COLS, bins=HISTOGRAM_BINS):
+        """Calcula o perfil das colunas de `feature_cols` presentes em `X`."""
+        features = {
+            col: FeatureProfile.from_values(pd.to_numeric(X[col], errors="coerce").to_numpy(dtype=float), bins=bins)
+            for col in feature_cols if col in X.columns
+        }
+        return cls(features, len(X))
+
+    def medians(self):
+        """Mediana por feature (para conferir os valores de imputação do modelo)."""
+        return {col: profile.median for col, profile in self.features.items()}
+
+    def save(self, path):
+        """
+        Salva o perfil em um `.npz` (gravação atômica).
+
+        Os arrays de todas as features são concatenados (valores ordenados + offsets) ou empilhados
+        em matrizes, para que a leitura abra poucas entradas do arquivo.
+
+        Args:
+            path (str | Path): Caminho de destino.
+        """
+        profiles = list(self.features.values())
+        bins = max((len(p.hist_counts) for p in profiles), default=0)
+        arrays = {
+            "features": np.array(list(self.features), dtype=str),
+            "n_rows": np.array(self.n_rows),
+            "offsets": np.cumsum([0] + [p.size for p in profiles]),
+            "sorted_values": np.concatenate([p.sorted_values for p in profiles]) if profiles else np.array([]),
+            "quantiles": np.array([_pad(p.quantiles, len(QUANTILE_LEVELS)) for p in profiles]),
+            "hist_counts": np.array([_pad(p.hist_counts, bins, fill=0) for p in profiles], dtype=np.int64),
+            "hist_edges": np.array([_pad(p.hist_edges, bins + 1) for p in profiles]),
+            "stats": np.array([[p.median, p.null_rate] for p in profiles]),
+        }
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Carrega um perfil salvo com `save`.
+
+        Raises:
+            FileNotFoundError: Se o arquivo não existir.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+
+        features = {}
+        offsets = arrays["offsets"]
+        for i, col in enumerate(arrays["features"].tolist()):
+            median, null_rate = arrays["stats"][i]
+            has_values = offsets[i + 1] > offsets[i]
+            features[col] = FeatureProfile(
+                arrays["sorted_values"][offsets[i]:offsets[i + 1]],
+                arrays["quantiles"][i] if has_values else np.array([]),
+                arrays["hist_counts"][i] if has_values else np.array([], dtype=np.int64),
+                arrays["hist_edges"][i] if has_values else np.array([]),
+                median, null_rate
+            )
+        return cls(features, int(arrays["n_rows"]))
+
+
+def _pad(values, length, fill=np.nan):
+    """Completa `values` até `length` (features sem valores válidos têm arrays vazios)."""
+    return values if len(values) == length else np.full(length, fill)
@@ -11,6 +11,7 @@ from src.preprocessing import TemporalPreprocessor, DataFrameScaler
 from src.modeling import RiskModel
 from src.utils import get_model_instance
 from src.evaluation import evaluate_model, print_reliability_report
+from src.reference_profile import ReferenceProfile, profile_path_for
 
 def main():
     # 1. Configurações básicas
@@ -75,6 +76,11 @@ def main():
     print(f"Salvando dados de referência em {ref_path}...")
     # Salvar features de treino como referência
     X_train.to_csv(ref_path, index=False)
+
+    # 10. Perfil de referência compacto, salvo junto ao modelo (usado pelo monitor de drift e dashboard)
+    profile_path = profile_path_for(MODEL_PATH)
+    print(f"Salvando perfil de referência em {profile_path}...")
+    ReferenceProfile.from_dataframe(X_train, feature_cols=train_cols).save(profile_path)
     
 if __name__ == "__main__":
     main()
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from app.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected
+
+
+def test_admission_limits_concurrency_and_queue():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=2, max_queue=1, queue_timeout=1.0)
+        await controller.acquire()
+        await controller.acquire()
+        assert controller.in_flight == 2
+
+        # Terceira requisição aguarda na fila; a quarta é rejeitada na hora
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire()
+        assert exc.value.reason == "queue_full"
+
+        # Ao liberar uma vaga, ela passa direto para quem estava na fila
+        controller.release()
+        await waiting
+        assert controller.in_flight == 2 and controller.queue_depth == 0
+
+    asyncio.run(scenario())
+
+def test_admission_queue_timeout():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=5, queue_timeout=0.01)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire()
+        assert exc.value.reason == "timeout"
+        assert controller.queue_depth == 0
+
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+def test_admission_middleware_rejects_with_retry_after():
+    async def scenario():
+        release = asyncio.Event()
+        calls = []
+
+        async def app(scope, receive, send):
+            calls.append(scope["path"])
+            await release.wait()
+
+        controller = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=0.01)
+        middleware = AdmissionMiddleware(app, controller, paths=["/predict"], retry_after=2)
+
+        sent = []
+        async def send(message):
+            sent.append(message)
+
+        first = asyncio.create_task(middleware({"type": "http", "path": "/predict"}, None, send))
+        await asyncio.sleep(0)
+        await middleware({"type": "http", "path": "/predict"}, None, send)
+        # Outras rotas não passam pelo controle
+        other = asyncio.create_task(middleware({"type": "http", "path": "/history"}, None, send))
+        await asyncio.sleep(0)
+
+        start = sent[0]
+        assert start["status"] == 429
+        assert (b"retry-after", b"2") in start["headers"]
+        assert calls == ["/predict", "/history"]
+
+        release.set()
+        await asyncio.gather(first, other)
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
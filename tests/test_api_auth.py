@@ -58,3 +58,29 @@ def test_predict_with_token():
     response = client.post("/predict", json=payload, headers=headers)
     
     assert response.status_code in [200, 503]
+
+def test_verified_token_cache_skips_signature_check():
+    from unittest.mock import patch
+    from app import auth
+    from datetime import timedelta
+
+    token = auth.create_access_token({"sub": "cache_user"}, expires_delta=timedelta(minutes=5))
+    auth.TOKEN_CACHE.clear()
+    with patch("app.auth.jwt.decode", wraps=auth.jwt.decode) as decode:
+        assert auth.decode_token(token)["sub"] == "cache_user"
+        assert auth.decode_token(token)["sub"] == "cache_user"
+    decode.assert_called_once()
+
+def test_verified_token_cache_expires_at_token_exp():
+    import time
+    from app.auth import VerifiedTokenCache
+
+    cache = VerifiedTokenCache(max_size=2)
+    cache.put("expired", {"sub": "a", "exp": time.time() - 1})
+    cache.put("no_exp", {"sub": "b"})
+    assert cache.get("expired") is None
+    assert cache.get("no_exp") is None
+
+    for i in range(3):
+        cache.put(f"t{i}", {"sub": "c", "exp": time.time() + 60})
+    assert len(cache) == 2 and cache.get("t0") is None
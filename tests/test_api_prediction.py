@@ -2,9 +2,11 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app import state
 from unittest.mock import MagicMock, patch
+import numpy as np
 import pandas as pd
 import pytest
 import os
+import json
 
 client = TestClient(app)
 
@@ -65,6 +67,23 @@ def test_predict_threshold_logic(mock_log, mock_model, auth_header):
     assert data["prediction"] == 0
     assert data["status"] == "Baixo Risco"
 
+@patch("app.router.log_prediction")
+def test_predict_computes_defasagem_from_idade_fase(mock_log, mock_model, auth_header):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    mock_model.predict_proba.return_value = np.array([[0.3, 0.7]])
+    payload = {"IAA": 5.0, "INDE": 5.0, "Defasagem": 0.0, "idade": 14, "fase": "Fase 3", "threshold": 0.5}
+    response = client.post("/predict", json=payload, headers=auth_header)
+    assert response.status_code == 200
+
+    # A Defasagem enviada é substituída pela calculada (14 anos -> fase ideal 4)
+    features = mock_model.predict_proba.call_args[0][0]
+    assert features["Defasagem"].iloc[0] == -1.0
+    entry = mock_log.call_args[0][0]
+    assert entry["Defasagem"] == -1.0
+    assert "idade" not in entry and "fase" not in entry
+
 def test_predict_history(auth_header):
     if not auth_header:
         pytest.skip("Auth não configurada")
@@ -74,3 +93,342 @@ def test_predict_history(auth_header):
     assert isinstance(response.json(), list)
     # Se houver dados, deve retornar no máximo 5
     assert len(response.json()) <= 5
+
+@patch("app.router.log_predictions")
+def test_predict_batch_order_and_row_errors(mock_log, mock_model, auth_header):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    # O modelo recebe apenas os registros válidos, em uma única chamada
+    mock_model.predict_proba.return_value = np.array([0.9, 0.2])
+
+    payload = {
+        "records": [
+            {"IAA": 5.0, "INDE": 6.0, "Defasagem": -1.0},
+            {"IAA": "texto"},  # Inválido: não deve derrubar o lote
+            {"IAA": 8.0, "INDE": 8.0, "Defasagem": 0.0},
+        ],
+        "threshold": 0.5
+    }
+    response = client.post("/predict/batch", json=payload, headers=auth_header)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total"] == 3
+    assert data["errors"] == 1
+    assert [r["index"] for r in data["results"]] == [0, 1, 2]
+    assert data["results"][0]["status"] == "Alto Risco"
+    assert data["results"][1]["error"] is not None
+    assert data["results"][1]["probability"] is None
+    assert data["results"][2]["prediction"] == 0
+
+    mock_model.predict_proba.assert_called_once()
+    assert len(mock_model.predict_proba.call_args[0][0]) == 2
+    # Apenas os registros pontuados são logados
+    assert len(mock_log.call_args[0][0]) == 2
+
+@patch("app.router.log_predictions")
+def test_predict_batch_isolates_model_errors(mock_log, mock_model, auth_header):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    def fake_predict_proba(df):
+        if df["IAA"].isin([9.9]).any():
+            raise ValueError("Input contains an unsupported value")
+        return np.full(len(df), 0.3)
+
+    mock_model.predict_proba.side_effect = fake_predict_proba
+
+    payload = {"records": [{"IAA": 1.0}, {"IAA": 9.9}, {"IAA": 2.0}], "threshold": 0.5}
+    response = client.post("/predict/batch", json=payload, headers=auth_header)
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    assert results[0]["probability"] == pytest.approx(0.3)
+    assert "unsupported value" in results[1]["error"]
+    assert results[2]["probability"] == pytest.approx(0.3)
+
+@patch("app.router.log_predictions")
+def test_predict_batch_computes_defasagem(mock_log, mock_model, auth_header):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    mock_model.predict_proba.return_value = np.array([0.2, 0.2, 0.2])
+    payload = {
+        "records": [
+            {"IAA": 5.0, "Defasagem": 0.0, "idade": 2010, "fase": "ALFA"},
+            {"IAA": 5.0, "Defasagem": 1.0, "idade": 12, "fase": "sem fase"},
+            {"IAA": 5.0, "Defasagem": 2.0},
+        ]
+    }
+    response = client.post("/predict/batch", json=payload, headers=auth_header)
+    assert response.status_code == 200
+
+    features = mock_model.predict_proba.call_args[0][0]
+    assert features["Defasagem"].iloc[0] < 0
+    # Sem regra aplicável (ou sem idade/fase), a Defasagem enviada é mantida
+    assert features["Defasagem"].tolist()[1:] == [1.0, 2.0]
+
+@pytest.mark.parametrize("value", ["inf", "nan", 11.0, -0.5])
+def test_predict_rejects_non_finite_and_out_of_range(mock_model, auth_header, value):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    response = client.post("/predict", json={"IAA": value}, headers=auth_header)
+    assert response.status_code == 422
+    mock_model.predict_proba.assert_not_called()
+
+@patch("app.router.log_predictions")
+def test_predict_batch_validates_ranges_like_columnar(mock_log, mock_model, auth_header):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    mock_model.predict_proba.return_value = np.array([0.2])
+    payload = {"records": [{"IAA": 5.0}, {"IAA": 11.0}, {"Defasagem": "-inf"}]}
+    response = client.post("/predict/batch", json=payload, headers=auth_header)
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    # Mesmas mensagens da rota columnar (validate_columns)
+    assert results[0]["error"] is None
+    assert results[1]["error"] == "IAA: fora da faixa [0.0, 10.5]"
+    assert results[2]["error"] == "Defasagem: valor não finito"
+    assert len(mock_model.predict_proba.call_args[0][0]) == 1
+
+def test_predict_batch_size_limit(mock_model, auth_header):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    with patch("app.router.MAX_BATCH_SIZE", 2):
+        payload = {"records": [{"IAA": 1.0}] * 3}
+        response = client.post("/predict/batch", json=payload, headers=auth_header)
+    assert response.status_code == 413
+
+def test_predict_history_stream(auth_header, tmp_path):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    from app.store import CSVPredictionStore
+    store = CSVPredictionStore(str(tmp_path / "logs.csv"))
+    store.write([{"IAA": float(i), "timestamp": f"2025-01-01T00:0{i}:00", "status": "Baixo Risco"} for i in range(5)])
+
+    with patch("app.router.get_store", return_value=store):
+        response = client.get("/history/stream?limit=2", headers=auth_header)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["IAA"] for r in lines] == [4.0, 3.0]
+
+        # Próxima página a partir do cursor
+        response = client.get(f"/history/stream?cursor={lines[-1]['_cursor']}", headers=auth_header)
+        assert [json.loads(line)["IAA"] for line in response.text.splitlines()] == [2.0, 1.0, 0.0]
+
+        # Cursor inválido é recusado antes de o streaming começar
+        for invalid in ("abc", "-1"):
+            response = client.get(f"/history/stream?cursor={invalid}", headers=auth_header)
+            assert response.status_code == 422
+
+def test_history_stream_lines_are_strict_json():
+    """NaN e infinitos do histórico viram null, para consumidores NDJSON estritos"""
+    from app.router import _ndjson_chunks
+
+    def reject(constant):
+        raise ValueError(f"JSON inválido: {constant}")
+
+    records = [(2, {"IAA": float("nan"), "IEG": float("inf"), "status": "Baixo Risco"}), (1, {"IAA": 1.0})]
+    body = b"".join(_ndjson_chunks(iter(records), limit=0)).decode("utf-8")
+    lines = [json.loads(line, parse_constant=reject) for line in body.splitlines()]
+    assert lines[0] == {"IAA": None, "IEG": None, "status": "Baixo Risco", "_cursor": 2}
+    assert lines[1]["IAA"] == 1.0
+
+@patch("app.router.log_prediction")
+@patch("app.router.log_predictions")
+def test_predict_uses_cache_across_thresholds(mock_log, mock_log_single, mock_model, auth_header):
+    if not auth_header:
+        pytest.skip("Auth não configurada")
+
+    from app.cache import PredictionCache
+    mock_model.predict_proba.return_value = np.array([[0.7]])
+    payload = {"IAA": 5.0, "INDE": 6.0, "threshold": 0.5}
+
+    with patch.object(state, "PREDICTION_CACHE", PredictionCache()):
+        first = client.post("/predict", json=payload, headers=auth_header).json()
+        payload["threshold"] = 0.8
+        second = client.post("/predict", json=payload, headers=auth_header).json()
+
+        # Lote com um registro já calculado e um novo
+        mock_model.predict_proba.return_value = np.array([0.2])
+        batch = client.post("/predict/batch", json={
+            "records": [{"IAA": 5.0, "INDE": 6.0}, {"IAA": 1.0}], "threshold": 0.5
+        }, headers=auth_header).json()
+
+    # Threshold é aplicado depois do cache
+    assert first["status"] == "Alto Risco"
+    assert second["status"] == "Baixo Risco"
+    assert second["probability"] == first["probability"]
+    assert [r["probability"] for r in batch["results"]] == [pytest.approx(0.7), pytest.approx(0.2)]
+    assert mock_model.predict_proba.call_count == 2
+    # Acertos do cache são marcados no log, para ficarem fora dos quantis de latência do modelo
+    assert [call[0][0]["cache_hit"] for call in mock_log_single.call_args_list] == [0, 1]
+    assert [entry["cache_hit"] for entry in mock_log.call_args[0][0]] == [1, 0]
+
+@patch("app.router.log_prediction")
+def test_predict_reports_model_version(mock_log, mock_model, auth_header):
+    with patch.object(state, "MODEL_VERSION", "v7"):
+        response = client.post("/predict", json={"IAA": 5.0}, headers=auth_header)
+        home = client.get("/")
+
+    assert response.json()["model_version"] == "v7"
+    assert response.headers["X-Model-Version"] == "v7"
+    assert mock_log.call_args[0][0]["model_version"] == "v7"
+    assert home.json()["model_version"] == "v7"
+
+    # Troca de modelo durante a requisição: o header continua com a versão que pontuou
+    def swap_during_scoring(features):
+        state.MODEL_VERSION = "v8"
+        return np.array([[0.3, 0.7]])
+
+    mock_model.predict_proba.side_effect = swap_during_scoring
+    with patch.object(state, "MODEL_VERSION", "v7"):
+        response = client.post("/predict", json={"IAA": 6.0}, headers=auth_header)
+    assert response.json()["model_version"] == "v7"
+    assert response.headers["X-Model-Version"] == "v7"
+
+@patch("app.router.log_prediction")
+def test_predict_sends_request_to_shadow(mock_log, mock_model, auth_header):
+    shadow = MagicMock()
+    with patch.object(state, "SHADOW_SCORER", shadow):
+        response = client.post("/predict", json={"IAA": 5.0}, headers=auth_header)
+
+    assert response.status_code == 200
+    entries = shadow.submit.call_args[0][0]
+    assert entries[0]["probability"] == pytest.approx(0.7)
+
+@patch("app.router.log_prediction")
+def test_predict_server_timing_header(mock_log, mock_model, auth_header):
+    response = client.post("/predict", json={"IAA": 5.0}, headers=auth_header)
+
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    for expected in ("auth", "validation", "frame", "classifier", "logging", "total"):
+        assert expected in stages
+
+def test_performance_stats_endpoint(auth_header):
+    from app.stats import PerformanceStats
+
+    with patch.object(state, "PERFORMANCE_STATS", None):
+        assert client.get("/stats/performance", headers=auth_header).status_code == 503
+
+    stats = PerformanceStats()
+    with patch.object(state, "PERFORMANCE_STATS", stats), patch("app.router.write_log_entries"):
+        from app.router import log_predictions
+        log_predictions([{"timestamp": "2099-01-01T00:00:00", "latency_ms": 5.0}])
+        response = client.get("/stats/performance", headers=auth_header)
+
+    assert response.status_code == 200
+    assert response.json()["total_requests"] == 1
+    assert response.json()["latency_ms"]["p50"] == pytest.approx(5.0, rel=0.01)
+
+def test_drift_endpoint(auth_header):
+    from app.drift import DriftMonitor
+
+    with patch.object(state, "DRIFT_MONITOR", None):
+        assert client.get("/drift", headers=auth_header).status_code == 503
+
+    reference = pd.DataFrame({"IAA": np.linspace(0, 10, 100), "IEG": np.linspace(0, 10, 100)})
+    monitor = DriftMonitor.from_dataframe(reference, feature_cols=["IAA", "IEG"])
+    with patch.object(state, "DRIFT_MONITOR", monitor), patch("app.router.write_log_entries"):
+        from app.router import log_predictions
+        log_predictions([{"IAA": 9.5, "IEG": None}, {"IAA": 9.9, "IEG": 5.0}])
+        response = client.get("/drift", headers=auth_header)
+
+    assert response.status_code == 200
+    features = response.json()["features"]
+    assert features["IAA"]["count"] == 2
+    assert features["IEG"]["null_rate"] == 0.5
+
+def test_predict_history_arrow_parquet_and_gzip(auth_header, tmp_path):
+    import io
+    pa = pytest.importorskip("pyarrow")
+    from app.store import CSVPredictionStore
+
+    store = CSVPredictionStore(str(tmp_path / "logs.csv"))
+    store.write([
+        {"IAA": float(i), "IPP": None if i % 2 else 1.0, "timestamp": f"2025-01-01T00:{i:02d}:00", "status": "Baixo Risco"}
+        for i in range(50)
+    ])
+
+    with patch("app.router.get_store", return_value=store):
+        arrow = client.get("/history?limit=3&format=arrow", headers=auth_header)
+        parquet = client.get("/history?limit=0&format=parquet", headers=auth_header)
+        gzipped = client.get("/history?limit=0", headers=auth_header | {"Accept-Encoding": "gzip"})
+
+    assert arrow.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    df = pa.ipc.open_stream(arrow.content).read_all().to_pandas()
+    assert df["IAA"].tolist() == [49.0, 48.0, 47.0]
+    assert pd.read_parquet(io.BytesIO(parquet.content))["IPP"].isna().sum() == 25
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    records = gzipped.json()
+    assert len(records) == 50 and records[0]["IPP"] is None
+
+    assert client.get("/history?format=xml", headers=auth_header).status_code == 422
+
+@patch("app.router.log_predictions")
+def test_predict_batch_arrow_format(mock_log, mock_model, auth_header):
+    pa = pytest.importorskip("pyarrow")
+
+    mock_model.predict_proba.return_value = np.array([0.9, 0.2])
+    payload = {"records": [{"IAA": 5.0}, {"IAA": "texto"}, {"IAA": 8.0}], "threshold": 0.5}
+    response = client.post("/predict/batch?format=arrow", json=payload, headers=auth_header)
+
+    assert response.status_code == 200
+    df = pa.ipc.open_stream(response.content).read_all().to_pandas()
+    assert df["index"].tolist() == [0, 1, 2]
+    assert df["status"].tolist()[::2] == ["Alto Risco", "Baixo Risco"]
+    assert df["error"].notna().tolist() == [False, True, False]
+
+@patch("app.router.log_predictions")
+def test_predict_batch_columnar(mock_log, mock_model, auth_header):
+    mock_model.predict_proba.return_value = np.array([0.9, 0.2])
+    payload = {"columns": {"IAA": [5.0, 11.0, 8.0], "INDE": [6.0, 6.0, None]}, "threshold": 0.5}
+    response = client.post("/predict/batch/columnar", json=payload, headers=auth_header)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["errors"] == 1
+    assert [r["index"] for r in data["results"]] == [0, 1, 2]
+    assert data["results"][0]["prediction"] == 1
+    assert data["results"][0]["status"] == "Alto Risco"
+    assert "fora da faixa" in data["results"][1]["error"]
+    assert data["results"][1]["probability"] is None
+    assert data["results"][2]["status"] == "Baixo Risco"
+
+    # O modelo recebe só as linhas válidas, com todas as features, em uma única chamada
+    features = mock_model.predict_proba.call_args[0][0]
+    assert list(features.columns) == ['IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN', 'INDE', 'Defasagem']
+    assert len(features) == 2
+    entries = mock_log.call_args[0][0]
+    assert len(entries) == 2
+    assert entries[1]["INDE"] is None
+    assert entries[1]["threshold"] == 0.5
+
+@patch("app.router.log_predictions")
+def test_predict_batch_columnar_npy_and_errors(mock_log, mock_model, auth_header):
+    import io
+
+    mock_model.predict_proba.return_value = np.array([0.4])
+    buffer = io.BytesIO()
+    np.save(buffer, np.full((1, 9), 5.0))
+    headers = {**auth_header, "Content-Type": "application/x-npy"}
+    response = client.post("/predict/batch/columnar?threshold=0.3", content=buffer.getvalue(), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["results"][0]["prediction"] == 1
+
+    headers = {**auth_header, "Content-Type": "text/csv"}
+    assert client.post("/predict/batch/columnar", content=b"IAA\n1", headers=headers).status_code == 415
+    bad = {"columns": {"IAA": [1.0, 2.0], "IEG": [1.0]}}
+    assert client.post("/predict/batch/columnar", json=bad, headers=auth_header).status_code == 422
+    with patch("app.router.MAX_BATCH_SIZE", 2):
+        big = {"columns": {"IAA": [1.0] * 3}}
+        assert client.post("/predict/batch/columnar", json=big, headers=auth_header).status_code == 413
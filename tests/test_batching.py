@@ -0,0 +1,115 @@
+import threading
+import pytest
+from app.batching import MicroBatcher
+
+def test_concurrent_requests_are_batched():
+    calls = []
+
+    def score_fn(rows, model=None):
+        calls.append(len(rows))
+        return [row["x"] * 2 for row in rows]
+
+    batcher = MicroBatcher(score_fn, max_batch_size=8, max_wait_ms=200)
+    batcher.start()
+
+    results = {}
+    def worker(i):
+        results[i] = batcher.predict({"x": i})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    # Cada chamador recebe o seu próprio resultado
+    assert results == {i: i * 2 for i in range(8)}
+    assert sum(calls) == 8
+    assert len(calls) < 8  # Pelo menos parte das requisições foi agrupada
+
+def test_batch_respects_max_size():
+    calls = []
+
+    def score_fn(rows, model=None):
+        calls.append(len(rows))
+        return [0.5] * len(rows)
+
+    batcher = MicroBatcher(score_fn, max_batch_size=3, max_wait_ms=100)
+    batcher.start()
+    futures = [batcher.submit({"x": i}) for i in range(7)]
+    assert [f.result(5) for f in futures] == [0.5] * 7
+    batcher.stop()
+
+    assert max(calls) <= 3
+
+def test_row_errors_are_isolated():
+    def score_fn(rows, model=None):
+        if any(row["x"] < 0 for row in rows):
+            raise ValueError("valor inválido")
+        return [0.1] * len(rows)
+
+    batcher = MicroBatcher(score_fn, max_batch_size=4, max_wait_ms=100)
+    batcher.start()
+    good, bad = batcher.submit({"x": 1}), batcher.submit({"x": -1})
+    assert good.result(5) == 0.1
+    with pytest.raises(ValueError):
+        bad.result(5)
+    batcher.stop()
+
+def test_submit_requires_running_batcher():
+    batcher = MicroBatcher(lambda rows, model=None: rows)
+    with pytest.raises(RuntimeError):
+        batcher.submit({"x": 1})
+
+def test_each_row_is_scored_by_its_own_model():
+    """Durante uma troca de modelo, cada registro usa o modelo obtido pela sua requisição"""
+    calls = []
+
+    def score_fn(rows, model):
+        calls.append((model, len(rows)))
+        return [model] * len(rows)
+
+    batcher = MicroBatcher(score_fn, max_batch_size=8, max_wait_ms=200)
+    batcher.start()
+    futures = [batcher.submit({"x": i}, model=0.1 if i % 2 else 0.9) for i in range(4)]
+    assert [f.result(5) for f in futures] == [0.9, 0.1, 0.9, 0.1]
+    batcher.stop()
+    assert sorted(calls) == [(0.1, 2), (0.9, 2)]
+
+def test_stop_fails_rows_left_in_queue():
+    release = threading.Event()
+
+    def score_fn(rows, model=None):
+        release.wait(5)
+        return [0.5] * len(rows)
+
+    batcher = MicroBatcher(score_fn, max_batch_size=1, max_wait_ms=0)
+    batcher.start()
+    first = batcher.submit({"x": 0})
+    import time
+    time.sleep(0.05)  # A thread já está pontuando o primeiro registro
+    queued = batcher.submit({"x": 1})
+
+    batcher.stop(timeout=0.1)
+    with pytest.raises(RuntimeError):
+        queued.result(1)
+    release.set()
+    assert first.result(5) == 0.5
+
+def test_batcher_stages_reach_the_request_timings():
+    from app.timing import start_request, stage, server_timing_header
+
+    def score_fn(rows, model=None):
+        with stage("classifier"):
+            return [0.5 for _ in rows]
+
+    batcher = MicroBatcher(score_fn, max_batch_size=4, max_wait_ms=1)
+    batcher.start()
+    timings = start_request()
+    assert batcher.predict({"x": 1}) == 0.5
+    batcher.stop()
+
+    # Etapas medidas na thread do micro-batcher aparecem no Server-Timing da requisição
+    assert {"queue_wait", "classifier"} <= set(timings)
+    assert "classifier;dur=" in server_timing_header(timings, 0.01)
@@ -0,0 +1,37 @@
+import time
+from unittest.mock import MagicMock
+from app.cache import PredictionCache, make_cache_key
+
+def test_make_cache_key_normalization():
+    a = make_cache_key({"IAA": 5, "IEG": None, "Defasagem": -0.0, "threshold": 0.3})
+    b = make_cache_key({"IAA": 5.0, "IEG": float("nan"), "Defasagem": 0.0, "threshold": 0.9})
+    assert a == b
+    assert len(a) == 9
+
+def test_cache_hit_miss_and_lru_eviction():
+    model = object()
+    cache = PredictionCache(max_size=2, ttl=0)
+
+    assert cache.get(model, ("a",)) is None
+    cache.put(model, ("a",), 0.1)
+    cache.put(model, ("b",), 0.2)
+    assert cache.get(model, ("a",)) == 0.1  # "a" passa a ser o mais recente
+
+    cache.put(model, ("c",), 0.3)  # Remove "b" (menos recente)
+    assert cache.get_many(model, [("a",), ("b",), ("c",)]) == [0.1, None, 0.3]
+
+def test_cache_ttl_expiration():
+    model = object()
+    cache = PredictionCache(max_size=10, ttl=0.01)
+    cache.put(model, ("a",), 0.5)
+    time.sleep(0.02)
+    assert cache.get(model, ("a",)) is None
+    assert len(cache) == 0
+
+def test_cache_invalidated_when_model_changes():
+    cache = PredictionCache()
+    old_model, new_model = MagicMock(), MagicMock()
+    cache.put(old_model, ("a",), 0.5)
+
+    assert cache.get(new_model, ("a",)) is None
+    assert len(cache) == 0
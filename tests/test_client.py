@@ -0,0 +1,123 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import numpy as np
+import pytest
+
+from app import state
+from app.main import app
+from client import AsyncRiskClient, RiskClientError
+
+
+@pytest.fixture
+def mock_model():
+    mock = MagicMock()
+    mock.predict_proba.side_effect = lambda df: np.full(len(df), 0.7)
+    original_model = state.MODEL
+    state.MODEL = mock
+    yield mock
+    state.MODEL = original_model
+
+
+class FakeServer:
+    """Servidor falso (httpx.MockTransport) que registra as chamadas e permite injetar falhas."""
+    def __init__(self, batch=True, max_batch=None, failures=None, delay=0):
+        self.batch = batch
+        self.delay = delay  # Mantém as chamadas abertas ao mesmo tempo (lotes concorrentes)
+        self.max_batch = max_batch
+        self.failures = list(failures or [])  # Respostas devolvidas antes das normais
+        self.calls = []
+        self.logins = 0
+
+    async def __call__(self, request):
+        self.calls.append(request.url.path)
+        await asyncio.sleep(self.delay)
+        if request.url.path == "/token":
+            self.logins += 1
+            return httpx.Response(200, json={"access_token": f"token-{self.logins}", "token_type": "bearer"})
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        body = json.loads(request.content)
+        if request.url.path == "/predict/batch":
+            if not self.batch:
+                return httpx.Response(404, json={"detail": "Not Found"})
+            if self.max_batch and len(body["records"]) > self.max_batch:
+                return httpx.Response(413, json={"detail": "Lote muito grande"})
+            results = [{"index": i, "prediction": 1, "probability": 0.7, "status": "Alto Risco", "error": None}
+                       for i in range(len(body["records"]))]
+            return httpx.Response(200, json={"results": results, "total": len(results), "errors": 0})
+        return httpx.Response(200, json={"prediction": 1, "probability": 0.7, "status": "Alto Risco"})
+
+
+def _run(server, records, **kwargs):
+    async def scenario():
+        async with AsyncRiskClient("http://api", "u", "p", transport=httpx.MockTransport(server), backoff=0, **kwargs) as api:
+            return await api.predict_many(records)
+    return asyncio.run(scenario())
+
+
+@patch("app.router.log_predictions")
+def test_predict_many_against_app_in_batches(mock_log, mock_model):
+    records = [{"IAA": 5.0, "INDE": float("nan")}, {"IAA": "texto"}, {"IAA": 8.0}, {"IAA": 1.0}, {"IAA": 2.0}]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with AsyncRiskClient("http://test", transport=transport, batch_size=2, concurrency=2) as api:
+            return await api.predict_many(records, threshold=0.5)
+
+    results = asyncio.run(scenario())
+
+    # Ordem preservada entre os lotes; o aluno inválido tem erro só na própria linha
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["status"] == "Alto Risco"
+    assert results[1]["error"] is not None
+    assert all(r["error"] is None for i, r in enumerate(results) if i != 1)
+    assert mock_model.predict_proba.call_count == 3
+
+def test_fallback_to_single_predict_when_batch_is_missing():
+    server = FakeServer(batch=False, delay=0.01)
+    results = _run(server, [{"IAA": 1.0}] * 8, batch_size=2, concurrency=4)
+
+    # Os 4 lotes recebem 404 ao mesmo tempo e todos passam a usar o /predict
+    assert [r["index"] for r in results] == list(range(8))
+    assert all(r["error"] is None and r["status"] == "Alto Risco" for r in results)
+    assert server.calls.count("/predict") == 8
+    # A rota de lote é testada uma única vez por lote em andamento, e o login acontece uma vez
+    assert server.calls.count("/predict/batch") == 4
+    assert server.logins == 1
+
+def test_retries_transient_errors_and_refreshes_token():
+    failures = [
+        httpx.Response(503, headers={"Retry-After": "0"}),
+        httpx.ConnectError("conexão recusada"),
+        httpx.Response(401, json={"detail": "Token expirado"}),
+    ]
+    server = FakeServer(failures=failures)
+    results = _run(server, [{"IAA": 1.0}, {"IAA": 2.0}])
+
+    assert all(r["error"] is None for r in results)
+    assert server.logins == 2
+    assert server.calls.count("/predict/batch") == 4
+
+def test_splits_batches_rejected_by_size():
+    server = FakeServer(max_batch=2)
+    results = _run(server, [{"IAA": float(i)} for i in range(5)], batch_size=5)
+
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert all(r["error"] is None for r in results)
+
+def test_exhausted_retries_become_row_errors_and_login_failure_raises():
+    server = FakeServer(failures=[httpx.Response(503)] * 3)
+    results = _run(server, [{"IAA": 1.0}], max_retries=2)
+    assert results[0]["error"] == "Erro API: 503"
+
+    def refuse(request):
+        return httpx.Response(401, json={"detail": "Incorrect username or password"})
+
+    with pytest.raises(RiskClientError):
+        _run(refuse, [{"IAA": 1.0}])
@@ -0,0 +1,91 @@
+import io
+import numpy as np
+import pytest
+
+from app.columnar import ColumnarInputError, parse_columns, validate_columns
+from src.config import FEATURE_COLS
+
+
+def _npy_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+def test_parse_json_columns_converts_nulls_to_nan():
+    body = b'{"columns": {"IAA": [5.5, null], "INDE": [6.0, 7.0]}, "threshold": 0.3}'
+    columns, threshold = parse_columns(body, "application/json; charset=utf-8")
+
+    assert threshold == 0.3
+    assert columns["IAA"].dtype == np.float64
+    assert np.isnan(columns["IAA"][1])
+    assert columns["INDE"].tolist() == [6.0, 7.0]
+
+def test_parse_rejects_unknown_and_mismatched_columns():
+    with pytest.raises(ColumnarInputError, match="desconhecidas"):
+        parse_columns(b'{"columns": {"XYZ": [1.0]}}', "application/json")
+    with pytest.raises(ColumnarInputError, match="tamanhos"):
+        parse_columns(b'{"columns": {"IAA": [1.0, 2.0], "IEG": [1.0]}}', "application/json")
+    with pytest.raises(ColumnarInputError, match="não numéricos"):
+        parse_columns(b'{"columns": {"IAA": ["texto"]}}', "application/json")
+
+def test_parse_unsupported_content_type_is_415():
+    with pytest.raises(ColumnarInputError) as excinfo:
+        parse_columns(b"IAA\n1.0", "text/csv")
+    assert excinfo.value.status_code == 415
+
+def test_parse_npy_structured_and_2d():
+    structured = np.zeros(3, dtype=[("IAA", "f4"), ("Defasagem", "i8")])
+    structured["IAA"] = [1.0, 2.0, 3.0]
+    structured["Defasagem"] = [-1, 0, 1]
+    columns, _ = parse_columns(_npy_bytes(structured), "application/x-npy")
+    assert columns["Defasagem"].tolist() == [-1.0, 0.0, 1.0]
+
+    matrix = np.arange(2 * len(FEATURE_COLS), dtype=float).reshape(2, -1)
+    columns, _ = parse_columns(_npy_bytes(matrix), "application/x-npy")
+    assert list(columns) == FEATURE_COLS
+    assert columns[FEATURE_COLS[1]].tolist() == [1.0, 1.0 + len(FEATURE_COLS)]
+
+    with pytest.raises(ColumnarInputError, match="formato"):
+        parse_columns(_npy_bytes(np.zeros((2, 3))), "application/x-npy")
+
+def test_parse_arrow_stream():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"IAA": pa.array([5.0, None]), "IEG": pa.array([7, 8])})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    columns, _ = parse_columns(sink.getvalue().to_pybytes(), "application/vnd.apache.arrow.stream")
+    assert np.isnan(columns["IAA"][1])
+    assert columns["IEG"].dtype == np.float64
+
+def test_validate_columns_marks_only_bad_rows():
+    columns = {
+        "IAA": np.array([5.0, 11.0, np.nan, np.inf]),
+        "Defasagem": np.array([0.0, -3.0, -20.0, 1.0]),
+    }
+    frame, errors = validate_columns(columns)
+
+    # Features ausentes viram NaN (imputadas pelo modelo)
+    assert list(frame.columns) == FEATURE_COLS
+    assert frame["IEG"].isna().all()
+
+    assert errors[0] is None
+    assert "IAA: fora da faixa" in errors[1]
+    assert "Defasagem: fora da faixa" in errors[2]
+    assert "IAA: valor não finito" in errors[3]
+
+def test_raw_idade_fase_compute_defasagem():
+    body = b'{"columns": {"idade": [14, 14, 10], "fase": ["Fase 3", "sem fase", 2], "Defasagem": [0, -2, null]}}'
+    columns, _ = parse_columns(body, "application/json")
+    # A fase chega como recebida (texto ou número), sem conversão para float
+    assert columns["fase"].dtype == object
+
+    frame, errors = validate_columns(columns)
+    # Fase não reconhecida mantém a Defasagem enviada
+    assert frame["Defasagem"].tolist() == [-1.0, -2.0, 0.0]
+    assert "idade" not in frame.columns
+    assert all(e is None for e in errors)
+
+    with pytest.raises(ColumnarInputError):
+        validate_columns({"idade": np.array([14], dtype=object)})
@@ -0,0 +1,54 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.data_cache import workbook_key, write_cache, read_cache
+
+
+def test_workbook_key_changes_with_content_and_mtime(tmp_path):
+    path = tmp_path / "planilha.xlsx"
+    path.write_bytes(b"conteudo")
+    key = workbook_key(path)
+    assert workbook_key(path) == key
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert workbook_key(path) != key
+
+def test_cache_round_trip_preserves_mixed_object_columns(tmp_path):
+    """Colunas com tipos misturados (como Idade e Fase nas abas do PEDE) voltam com os mesmos valores e tipos"""
+    df = pd.DataFrame({
+        "RA": ["RA-1", "RA-2", "RA-3"],
+        "Idade": [datetime(2011, 5, 1), 12, np.nan],
+        "Fase": [3, "ALFA", "FASE 2"],
+        "Nome": ["a", np.nan, "c"],
+        "INDE": [7.5, np.nan, 6.0],
+        "Ano": [2023, 2023, 2023],
+    })
+    source = tmp_path / "planilha.xlsx"
+    source.write_bytes(b"x")
+    key = workbook_key(source)
+
+    write_cache(source, key, {2023: df}, cache_root=tmp_path / "cache")
+    cached = read_cache(source, key, cache_root=tmp_path / "cache")[2023]
+
+    pd.testing.assert_frame_equal(cached, df)
+    for col in ("Idade", "Fase", "Nome"):
+        assert [type(v) for v in cached[col]] == [type(v) for v in df[col]]
+    assert cached["Idade"][0].year == 2011
+
+def test_read_cache_missing_or_corrupted(tmp_path, capsys):
+    source = tmp_path / "planilha.xlsx"
+    source.write_bytes(b"x")
+    key = workbook_key(source)
+    assert read_cache(source, key, cache_root=tmp_path / "cache") is None
+
+    directory = write_cache(source, key, {2024: pd.DataFrame({"RA": ["1"]})}, cache_root=tmp_path / "cache")
+    (directory / "PEDE2024.parquet").write_bytes(b"corrompido")
+    assert read_cache(source, key, cache_root=tmp_path / "cache") is None
+    assert "ignorado" in capsys.readouterr().out
@@ -2,8 +2,16 @@
 import pandas as pd
 import pytest
 import os
+from unittest.mock import patch
 from src.data_loader import load_data, _clean_numeric_cols
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Isola o cache em Parquet de cada teste em um diretório temporário"""
+    directory = tmp_path / "cache"
+    monkeypatch.setattr("src.data_cache.DATA_CACHE_DIR", directory)
+    return directory
+
 @pytest.fixture
 def mock_excel_file(tmp_path):
     """Cria um arquivo Excel temporário para teste"""
@@ -44,3 +52,82 @@ def test_file_not_found():
     """Testa erro se arquivo não existe"""
     with pytest.raises(FileNotFoundError):
         load_data("arquivo_inexistente.xlsx")
+
+def test_load_data_uses_parquet_cache(mock_excel_file, cache_dir):
+    """Segunda carga lê o Parquet, com os mesmos dados e sem abrir a planilha"""
+    pytest.importorskip("pyarrow")
+    first = load_data(mock_excel_file)
+    assert len(list(cache_dir.glob("*/PEDE2022.parquet"))) == 1
+
+    with patch("src.data_loader._run_tasks") as mock_parse:
+        second = load_data(mock_excel_file)
+    mock_parse.assert_not_called()
+    for year in first:
+        pd.testing.assert_frame_equal(first[year], second[year])
+
+def test_load_data_cache_invalidated_when_workbook_changes(mock_excel_file, cache_dir):
+    pytest.importorskip("pyarrow")
+    load_data(mock_excel_file)
+
+    df_24 = pd.DataFrame({'RA': ['1', '2', '3'], 'INDE 2024': [9, 9, 5]})
+    with pd.ExcelWriter(mock_excel_file) as writer:
+        df_24.to_excel(writer, sheet_name='PEDE2024', index=False)
+
+    data_dict = load_data(mock_excel_file)
+    assert list(data_dict) == [2024]
+    assert len(data_dict[2024]) == 3
+    # Apenas o cache da versão atual permanece
+    assert len([p for p in cache_dir.iterdir() if p.is_dir()]) == 1
+
+def test_load_data_without_cache(mock_excel_file, cache_dir):
+    data_dict = load_data(mock_excel_file, use_cache=False)
+    assert len(data_dict[2023]) == 2
+    assert not cache_dir.exists()
+
+def _write_workbook(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return str(path)
+
+def test_load_data_year_agnostic_sheets(tmp_path):
+    """Abas de anos novos seguem o esquema padrão; abas fora do padrão são ignoradas"""
+    path = _write_workbook(tmp_path / "novo.xlsx", {
+        'PEDE2025': pd.DataFrame({'RA': [' RA-1 '], 'INDE 2025': [7.1], 'INDE 24': [6.0]}),
+        'Resumo': pd.DataFrame({'x': [1]}),
+    })
+    data_dict = load_data(path)
+
+    assert list(data_dict) == [2025]
+    df = data_dict[2025]
+    assert df['INDE'].tolist() == [7.1]
+    assert df['RA'].tolist() == ['RA-1']
+    assert df['Ano'].tolist() == [2025]
+
+def test_load_data_many_workbooks_in_process_pool(mock_excel_file, tmp_path):
+    """Várias planilhas: as abas são lidas em paralelo e os anos iguais são concatenados"""
+    other = _write_workbook(tmp_path / "escola_b.xlsx", {
+        'PEDE2024': pd.DataFrame({'RA': ['3'], 'INDE 2024': [5]}),
+    })
+    sequential = load_data([mock_excel_file, other], use_cache=False, workers=1)
+    parallel = load_data([mock_excel_file, other], use_cache=False, workers=2)
+
+    assert list(parallel) == [2022, 2023, 2024]
+    assert parallel[2024]['RA'].tolist() == ['1', '2', '3']
+    for year in sequential:
+        pd.testing.assert_frame_equal(sequential[year], parallel[year])
+
+def test_load_data_cache_of_same_named_workbooks(mock_excel_file, tmp_path):
+    """Planilhas de mesmo nome em pastas diferentes não apagam o cache uma da outra"""
+    pytest.importorskip("pyarrow")
+    (tmp_path / "escola_b").mkdir()
+    other = _write_workbook(tmp_path / "escola_b" / "test_db.xlsx", {
+        'PEDE2024': pd.DataFrame({'RA': ['3'], 'INDE 2024': [5]}),
+    })
+    first = load_data([mock_excel_file, other])
+
+    with patch("src.data_loader._run_tasks") as mock_parse:
+        second = load_data([mock_excel_file, other])
+    mock_parse.assert_not_called()
+    for year in first:
+        pd.testing.assert_frame_equal(first[year], second[year])
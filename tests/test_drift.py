@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ks_2samp
+
+from app.drift import DriftMonitor, population_stability_index
+
+
+@pytest.fixture
+def reference():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "IAA": rng.normal(7, 1.5, 600),
+        "IEG": rng.uniform(0, 10, 600),
+        "Defasagem": rng.integers(-2, 2, 600).astype(float),
+    })
+
+def test_drift_ks_matches_scipy_on_reference_edges(reference):
+    monitor = DriftMonitor.from_dataframe(reference, feature_cols=["IAA", "IEG", "Defasagem"])
+    production = reference.sample(300, random_state=1).reset_index(drop=True)
+    production["IAA"] += 1.0
+    monitor.observe_many(production.to_dict("records"))
+
+    report = monitor.report()
+    assert report["production_size"] == 300
+    for col in ("IAA", "Defasagem"):
+        exact = ks_2samp(reference[col], production[col], method="asymp")
+        # Variáveis discretas: as bordas cobrem todos os valores, então o KS é exato
+        tolerance = 0 if col == "Defasagem" else 0.02
+        assert report["features"][col]["ks"] == pytest.approx(exact.statistic, abs=tolerance)
+    assert report["features"]["IAA"]["drift"] is True
+    assert report["features"]["IEG"]["drift"] is False
+    assert report["features"]["IAA"]["psi"] > 0.25
+
+def test_drift_null_rate_and_missing_reference_feature(reference):
+    monitor = DriftMonitor.from_dataframe(reference, feature_cols=["IAA", "IPP"])
+    monitor.observe_many([{"IAA": 7.0, "IPP": 5.0}, {"IAA": None}, {"IAA": "x", "IPP": float("nan")}])
+
+    features = monitor.report()["features"]
+    assert features["IAA"]["count"] == 1
+    assert features["IAA"]["null_rate"] == pytest.approx(2 / 3)
+    assert features["IAA"]["reference_null_rate"] == 0.0
+    # Feature ausente nos dados de referência: apenas a taxa de nulos é reportada
+    assert features["IPP"]["null_rate"] == pytest.approx(2 / 3)
+    assert features["IPP"]["reference_null_rate"] is None
+    assert features["IPP"]["ks"] is None and features["IPP"]["psi"] is None
+
+def test_drift_report_without_production_data(reference):
+    report = DriftMonitor.from_dataframe(reference, feature_cols=["IAA"]).report()
+    assert report["production_size"] == 0
+    assert report["features"]["IAA"]["ks"] is None
+
+def test_population_stability_index():
+    assert population_stability_index(np.array([0.5, 0.5]), np.array([0.5, 0.5])) == 0.0
+    assert population_stability_index(np.array([0.5, 0.5]), np.array([0.9, 0.1])) > 0.25
+
+def test_drift_monitor_from_profile_matches_dataframe(reference, tmp_path):
+    from src.reference_profile import ReferenceProfile
+
+    model_path = tmp_path / "risk_model.joblib"
+    ReferenceProfile.from_dataframe(reference).save(tmp_path / "risk_model.reference.npz")
+    from_profile = DriftMonitor.for_model(model_path, version="v1")
+    from_df = DriftMonitor.from_dataframe(reference)
+
+    assert from_profile.model_version == "v1"
+    for col in ("IAA", "IEG", "Defasagem"):
+        np.testing.assert_array_equal(from_profile.references[col].edges, from_df.references[col].edges)
+        np.testing.assert_array_equal(from_profile.references[col].ecdf, from_df.references[col].ecdf)
+    assert from_profile.references["IPP"].size == 0
+
+def test_hot_reload_reseeds_drift_monitor_from_history(reference, tmp_path, monkeypatch):
+    """A troca de modelo cria um monitor novo, preenchido com o histórico já registrado"""
+    import time
+    from app import state, main
+    from app.store import CSVPredictionStore
+    from src.reference_profile import ReferenceProfile
+
+    for version in ("v1", "v2"):
+        (tmp_path / version).mkdir()
+        ReferenceProfile.from_dataframe(reference).save(tmp_path / version / "risk_model.reference.npz")
+    store = CSVPredictionStore(str(tmp_path / "logs.csv"))
+    store.write([{"IAA": 7.0, "IEG": 5.0, "timestamp": f"2025-01-01T00:0{i}:00"} for i in range(5)])
+    monkeypatch.setattr(main, "get_store", lambda: store)
+    monkeypatch.setattr(state, "DRIFT_MONITOR", None)
+
+    main._load_drift_monitor(tmp_path / "v1" / "risk_model.joblib", "v1")
+    assert state.DRIFT_MONITOR.total == 0  # Na inicialização, quem carrega o histórico é o lifespan
+
+    main._load_drift_monitor(tmp_path / "v2" / "risk_model.joblib", "v2")
+    monitor = state.DRIFT_MONITOR
+    assert monitor.model_version == "v2"
+    deadline = time.time() + 5
+    while monitor.total < 5 and time.time() < deadline:
+        time.sleep(0.01)
+    assert monitor.total == 5
@@ -50,3 +50,63 @@ def test_age_cleaning_logic():
     
     # 13 anos -> Fase Ideal 3. Fase Real 3. Defasagem 0.
     assert df_new.iloc[0]['Defasagem'] == 0.0
+
+def _synthetic_frame(n, seed=0):
+    """Valores no estilo das abas do PEDE, incluindo os casos de fallback da regra"""
+    import numpy as np
+    from datetime import datetime
+
+    rng = np.random.default_rng(seed)
+    idades = [7, 10, 14, 18, 19, 25, 3, 0, 2009, 2012, datetime(1900, 1, 12), datetime(2011, 3, 4),
+              '12', 'doze', None, float('nan'), 15.7, float('inf')]
+    fases = ['ALFA', 'Fase 1', 'FASE 3', '5B', 'Fase 8', 'Universitário', '7', 3, 9, 'sem fase', None]
+    anos = [2022, 2023, 2024, None, 'x', '2023']
+    return pd.DataFrame({
+        'RA': [f'RA-{i}' for i in range(n)],
+        'Fase': [fases[i] for i in rng.integers(0, len(fases), n)],
+        'Idade': [idades[i] for i in rng.integers(0, len(idades), n)],
+        'Ano': [anos[i] for i in rng.integers(0, len(anos), n)],
+        'Defasagem': rng.choice([-2.0, -1.0, 0.0, 1.0, np.nan], n),
+    })
+
+@pytest.mark.parametrize("variant", ["mixed", "int_defasagem", "no_defasagem", "no_ano", "datetime_idade", "numeric_idade"])
+def test_vectorized_matches_rowwise(variant):
+    """A versão columnar produz exatamente o mesmo DataFrame que a implementação linha a linha"""
+    import numpy as np
+    from src.feature_engineering import _calculate_corrected_defasagem_rowwise
+
+    df = _synthetic_frame(2000)
+    if variant == "int_defasagem":
+        df['Defasagem'] = df['Defasagem'].fillna(0).astype(int)
+    elif variant == "no_defasagem":
+        df = df.drop(columns='Defasagem')
+    elif variant == "no_ano":
+        df = df.drop(columns='Ano')
+    elif variant == "datetime_idade":
+        df['Idade'] = pd.to_datetime(np.where(np.arange(len(df)) % 7 == 0, None, '2010-05-01'))
+    elif variant == "numeric_idade":
+        df['Idade'] = np.tile([9.0, 13.9, np.nan, 2011.0, 30.0, -1.0, np.inf], len(df) // 7 + 1)[:len(df)]
+
+    expected = _calculate_corrected_defasagem_rowwise(df)
+    pd.testing.assert_frame_equal(calculate_corrected_defasagem(df), expected)
+
+def test_vectorized_all_rows_without_correction():
+    from src.feature_engineering import _calculate_corrected_defasagem_rowwise
+
+    df = pd.DataFrame({'RA': ['1', '2'], 'Idade': [10, 12], 'Fase': ['x', None]})
+    pd.testing.assert_frame_equal(
+        calculate_corrected_defasagem(df), _calculate_corrected_defasagem_rowwise(df)
+    )
+
+def test_compute_defasagem_engine():
+    import numpy as np
+    from src.feature_engineering import compute_defasagem
+
+    # Escalar, lista e ano de nascimento convertido pelo ano de referência
+    assert compute_defasagem(14, 'Fase 3').tolist() == [-1.0]
+    assert compute_defasagem(2010, 'Fase 3', ano=2023).tolist() == [0.0]
+    assert compute_defasagem(2010, 'Fase 3', default_year=2024).tolist() == [-1.0]
+
+    result = compute_defasagem([6, 20, 14, None], ['ALFA', 'Universitário', 'sem fase', 'Fase 4'])
+    assert result[:2].tolist() == [0.0, 0.0]
+    assert np.isnan(result[2:]).all()
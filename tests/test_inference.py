@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from src.modeling import RiskModel
+from src.preprocessing import TemporalPreprocessor, DataFrameScaler
+from src.inference import CompiledRiskModel
+
+COLS = [f'col_{i}' for i in range(4)]
+
+@pytest.fixture
+def trained_model():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(5, 2, (300, 4)), columns=COLS)
+    X[X > 8] = np.nan  # Força imputação
+    y = pd.Series((X['col_0'].fillna(5) + rng.normal(0, 1, 300) > 5).astype(int))
+
+    pipeline = Pipeline([
+        ('preprocessor', TemporalPreprocessor(feature_cols=COLS)),
+        ('scaler', DataFrameScaler(feature_cols=COLS)),
+        ('clf', RandomForestClassifier(n_estimators=25, max_depth=5, random_state=0))
+    ])
+    model = RiskModel(model=pipeline)
+    model.train(X, y)
+    return model, X
+
+def test_compiled_matches_pipeline(trained_model):
+    model, X = trained_model
+    compiled = CompiledRiskModel.from_risk_model(model)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-9)
+    # Entrada em ndarray (na ordem de feature_cols) deve dar o mesmo resultado
+    np.testing.assert_allclose(compiled.predict_proba(X[COLS].to_numpy()), model.predict_proba(X), rtol=0, atol=1e-9)
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+
+def test_compiled_stage_timings(trained_model):
+    model, X = trained_model
+    compiled = CompiledRiskModel.from_risk_model(model)
+
+    timings = {}
+    np.testing.assert_array_equal(compiled.predict_proba(X, timings=timings), compiled.predict_proba(X))
+    assert set(timings) == {'imputer_scaler', 'classifier'}
+
+def test_compiled_ignores_extra_columns(trained_model):
+    model, X = trained_model
+    compiled = CompiledRiskModel.from_risk_model(model)
+
+    X_extra = X.assign(threshold=0.5)[['threshold'] + COLS[::-1]]
+    np.testing.assert_allclose(compiled.predict_proba(X_extra), model.predict_proba(X), rtol=0, atol=1e-9)
+
+def test_compiled_save_load(trained_model, tmp_path):
+    model, X = trained_model
+    path = tmp_path / "model.npz"
+    model.export_compiled(str(path))
+
+    loaded = CompiledRiskModel.load(str(path))
+    assert loaded.feature_cols == COLS
+    np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-9)
+
+def test_compiled_rejects_unsupported_model(trained_model):
+    _, X = trained_model
+    model = RiskModel(model=LogisticRegression())
+    model.train(X.fillna(0), pd.Series([0, 1] * 150))
+
+    with pytest.raises(ValueError):
+        CompiledRiskModel.from_risk_model(model)
+
+def test_compiled_shared_artifact_is_memory_mapped(trained_model, tmp_path):
+    model, X = trained_model
+    compiled = CompiledRiskModel.from_risk_model(model)
+    path = tmp_path / "model.arrays.joblib"
+    compiled.save_shared(str(path))
+
+    shared = CompiledRiskModel.load_shared(str(path))
+    assert not shared.feature.flags.owndata and not shared.feature.flags.writeable
+    np.testing.assert_array_equal(shared.predict_proba(X), compiled.predict_proba(X))
@@ -0,0 +1,89 @@
+import time
+from app.log_sink import PredictionLogSink
+
+class FakeWriter:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, entries):
+        self.batches.append(list(entries))
+
+    @property
+    def entries(self):
+        return [e for batch in self.batches for e in batch]
+
+def test_sink_flushes_in_batches_on_stop():
+    writer = FakeWriter()
+    sink = PredictionLogSink(writer, max_queue_size=100, batch_size=10, flush_interval=5.0)
+    sink.start()
+
+    for i in range(25):
+        assert sink.submit({"i": i})
+    sink.stop()
+
+    # Nada se perde no encerramento e a ordem é preservada
+    assert [e["i"] for e in writer.entries] == list(range(25))
+    assert all(len(batch) <= 10 for batch in writer.batches)
+
+def test_sink_flushes_on_time_trigger():
+    writer = FakeWriter()
+    sink = PredictionLogSink(writer, batch_size=1000, flush_interval=0.05)
+    sink.start()
+
+    sink.submit({"i": 1})
+    deadline = time.monotonic() + 2.0
+    while not writer.entries and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sink.stop()
+
+    assert writer.entries == [{"i": 1}]
+
+def test_sink_drops_when_queue_is_full():
+    writer = FakeWriter()
+    sink = PredictionLogSink(writer, max_queue_size=2)  # Thread não iniciada
+
+    assert sink.submit_many([{"i": 0}, {"i": 1}, {"i": 2}]) == 2
+    sink.stop()
+    assert len(writer.entries) == 2
+
+def test_sink_survives_writer_errors():
+    calls = []
+
+    def failing_writer(entries):
+        calls.append(len(entries))
+        raise IOError("disco cheio")
+
+    sink = PredictionLogSink(failing_writer, batch_size=5, flush_interval=0.01)
+    sink.start()
+    sink.submit({"i": 1})
+    time.sleep(0.1)
+    sink.submit({"i": 2})
+    sink.stop()
+
+    assert sum(calls) == 2
+
+def test_stop_does_not_drain_while_writer_is_busy():
+    """Com a thread ainda gravando após o timeout, o stop não vira um segundo escritor"""
+    import threading
+
+    release = threading.Event()
+    active, overlaps = [], []
+
+    def slow_writer(entries):
+        overlaps.append(len(active))
+        active.append(1)
+        release.wait(5)
+        active.pop()
+
+    sink = PredictionLogSink(slow_writer, batch_size=1, flush_interval=0.01)
+    sink.start()
+    sink.submit({"i": 0})
+    time.sleep(0.05)  # A thread já está no primeiro lote
+    sink.submit({"i": 1})
+
+    sink.stop(timeout=0.05)
+    assert sink.pending == 1  # O restante fica com a thread escritora
+    release.set()
+    sink.stop()
+    assert overlaps == [0, 0]
+    assert sink.pending == 0
@@ -6,6 +6,8 @@ import os
 from src.modeling import RiskModel
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
+from src.preprocessing import TemporalPreprocessor, DataFrameScaler
+import warnings
 
 @pytest.fixture
 def sample_data():
@@ -64,3 +66,53 @@ def test_risk_model_save_load(sample_data, tmp_path):
     # Previsões devem ser iguais
     assert np.array_equal(model.predict(X), new_model.predict(X))
 
+
+def test_risk_model_fuse_preprocessing(sample_data):
+    """Testa se o modelo fundido aceita ndarrays e mantém as probabilidades"""
+    X, y = sample_data
+    X.iloc[0, 0] = np.nan
+    cols = list(X.columns)
+
+    pipeline = Pipeline([
+        ('preprocessor', TemporalPreprocessor(feature_cols=cols)),
+        ('scaler', DataFrameScaler(feature_cols=cols)),
+        ('clf', RandomForestClassifier(n_estimators=10, random_state=0))
+    ])
+    model = RiskModel(model=pipeline)
+    model.train(X, y)
+
+    serving = model.fuse_preprocessing()
+    assert serving.accepts_arrays and not model.accepts_arrays
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # Sem avisos de nomes de features
+        probs = serving.predict_proba(X[cols].to_numpy())
+    assert np.array_equal(probs, model.predict_proba(X))
+
+def test_risk_model_fuse_requires_standard_pipeline(sample_data):
+    X, y = sample_data
+    model = RiskModel(n_estimators=5)
+    model.train(X, y)
+    with pytest.raises(ValueError):
+        model.fuse_preprocessing()
+
+def test_risk_model_predict_proba_stage_timings(sample_data):
+    """Testa se a medição por etapa não altera as probabilidades"""
+    X, y = sample_data
+    cols = list(X.columns)
+    pipeline = Pipeline([
+        ('preprocessor', TemporalPreprocessor(feature_cols=cols)),
+        ('scaler', DataFrameScaler(feature_cols=cols)),
+        ('clf', RandomForestClassifier(n_estimators=10, random_state=0))
+    ])
+    model = RiskModel(model=pipeline)
+    model.train(X, y)
+
+    timings = {}
+    probs = model.predict_proba(X, timings=timings)
+    assert np.array_equal(probs, model.predict_proba(X))
+    assert set(timings) == {'imputer', 'scaler', 'classifier'}
+
+    timings = {}
+    model.fuse_preprocessing().predict_proba(X[cols].to_numpy(), timings=timings)
+    assert set(timings) == {'imputer_scaler', 'classifier'}
@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 import pytest
-from src.preprocessing import TemporalPreprocessor
+from src.preprocessing import TemporalPreprocessor, DataFrameScaler, FusedPreprocessor
 from src.feature_engineering import create_temporal_dataset
 
 @pytest.fixture
@@ -67,3 +67,32 @@ def test_temporal_dataset_missing_target_col(mock_data_dict):
     
     df = create_temporal_dataset(mock_data_dict, 2022)
     assert df.empty
+
+def test_transformers_ndarray_path_matches_dataframe():
+    """Testa se ndarrays (ordem de feature_cols) produzem o mesmo resultado sem DataFrames"""
+    df = pd.DataFrame({
+        'col1': [1.0, np.nan, 3.0, 10.0],
+        'col2': [np.nan, 5.0, 6.0, 7.0]
+    })
+    prep = TemporalPreprocessor(feature_cols=['col1', 'col2']).fit(df)
+    scaler = DataFrameScaler(feature_cols=['col1', 'col2']).fit(prep.transform(df))
+
+    expected = scaler.transform(prep.transform(df))
+    result = scaler.transform(prep.transform(df.to_numpy()))
+
+    assert isinstance(result, np.ndarray)
+    assert np.array_equal(result, expected.to_numpy())
+
+def test_fused_preprocessor_matches_two_steps():
+    """Testa se a passada afim fundida é idêntica a Imputer + Scaler"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(5, 2, (50, 3)), columns=['a', 'b', 'c'])
+    df[df > 7] = np.nan
+
+    prep = TemporalPreprocessor(feature_cols=['a', 'b', 'c']).fit(df)
+    scaler = DataFrameScaler(feature_cols=['a', 'b', 'c']).fit(prep.transform(df))
+    fused = FusedPreprocessor.from_steps(prep, scaler)
+
+    expected = scaler.transform(prep.transform(df)).to_numpy()
+    assert np.array_equal(fused.transform(df.to_numpy()), expected)
+    assert np.array_equal(fused.transform(df[['c', 'b', 'a']]), expected)
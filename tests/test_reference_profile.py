@@ -0,0 +1,57 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+from src.reference_profile import ReferenceProfile, profile_path_for, QUANTILE_LEVELS
+
+MODEL_PATH = Path(__file__).resolve().parent.parent / "app" / "models" / "risk_model.joblib"
+
+
+@pytest.fixture
+def train_df():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"IAA": rng.normal(7, 1, 200), "IEG": rng.uniform(0, 10, 200), "IPP": np.nan})
+    df.loc[:19, "IEG"] = np.nan
+    return df
+
+def test_profile_path_next_to_model():
+    assert profile_path_for("app/models/risk_model.joblib") == Path("app/models/risk_model.reference.npz")
+
+def test_profile_contents(train_df):
+    profile = ReferenceProfile.from_dataframe(train_df)
+
+    assert list(profile.features) == ["IAA", "IEG", "IPP"]
+    ieg = profile.features["IEG"]
+    assert ieg.size == 180
+    assert np.all(np.diff(ieg.sorted_values) >= 0)
+    assert ieg.null_rate == pytest.approx(0.1)
+    assert ieg.median == pytest.approx(train_df["IEG"].median())
+    assert ieg.quantiles == pytest.approx(train_df["IEG"].quantile(QUANTILE_LEVELS).to_numpy())
+    assert ieg.hist_counts.sum() == 180
+    assert profile.features["IPP"].size == 0
+
+def test_profile_save_load_roundtrip(train_df, tmp_path):
+    profile = ReferenceProfile.from_dataframe(train_df)
+    path = tmp_path / "risk_model.reference.npz"
+    profile.save(path)
+
+    loaded = ReferenceProfile.load(path)
+    assert loaded.n_rows == 200
+    assert list(loaded.features) == list(profile.features)
+    for col, expected in profile.features.items():
+        actual = loaded.features[col]
+        np.testing.assert_array_equal(actual.sorted_values, expected.sorted_values)
+        np.testing.assert_array_equal(actual.quantiles, expected.quantiles)
+        np.testing.assert_array_equal(actual.hist_counts, expected.hist_counts)
+        np.testing.assert_array_equal(actual.hist_edges, expected.hist_edges)
+        assert actual.null_rate == expected.null_rate
+
+def test_shipped_profile_matches_model_imputer():
+    # O perfil versionado acompanha o modelo: as medianas são as mesmas usadas na imputação
+    profile = ReferenceProfile.load(profile_path_for(MODEL_PATH))
+    preprocessor = joblib.load(MODEL_PATH).model.steps[0][1]
+
+    expected = dict(zip(preprocessor.feature_cols, preprocessor.imputer.statistics_))
+    assert profile.medians() == pytest.approx(expected)
@@ -0,0 +1,95 @@
+import json
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from app import state
+from app.registry import ModelManager, publish_model, list_versions, GOLDEN_FILENAME
+
+ARTIFACT = Path(__file__).resolve().parent.parent / "app" / "models" / "risk_model.joblib"
+
+
+@pytest.fixture
+def active_model():
+    """Isola o modelo/versão globais durante o teste."""
+    with patch.object(state, "MODEL", None), patch.object(state, "MODEL_VERSION", None):
+        yield
+
+def test_publish_and_list_versions(tmp_path):
+    publish_model(ARTIFACT, "v2", registry_dir=tmp_path)
+    publish_model(ARTIFACT, "v1", registry_dir=tmp_path)
+
+    assert list_versions(tmp_path) == ["v1", "v2"]
+    golden = json.loads((tmp_path / "v1" / GOLDEN_FILENAME).read_text())
+    assert len(golden["probabilities"]) == len(golden["inputs"])
+
+    with pytest.raises(ValueError):
+        publish_model(ARTIFACT, "v1", registry_dir=tmp_path)
+
+def test_list_versions_sorts_numerically(tmp_path):
+    from app.registry import version_sort_key
+
+    for version in ("v9", "v10", "v2"):
+        publish_model(ARTIFACT, version, registry_dir=tmp_path)
+    assert list_versions(tmp_path) == ["v2", "v9", "v10"]
+    assert sorted(["v20250110-090000", "v20250109-235959", "v10", "legacy"], key=version_sort_key) == [
+        "legacy", "v10", "v20250109-235959", "v20250110-090000"
+    ]
+
+def test_manager_loads_latest_version(tmp_path, active_model):
+    publish_model(ARTIFACT, "v1", registry_dir=tmp_path)
+    publish_model(ARTIFACT, "v2", registry_dir=tmp_path)
+
+    manager = ModelManager(registry_dir=tmp_path)
+    manager.load_initial()
+    assert state.MODEL is not None
+    assert state.MODEL_VERSION == "v2"
+
+    manager.load_version("v1")
+    assert state.get_active_model()[1] == "v1"
+
+def test_watcher_does_not_override_pinned_version(tmp_path, active_model):
+    publish_model(ARTIFACT, "v1", registry_dir=tmp_path)
+    publish_model(ARTIFACT, "v2", registry_dir=tmp_path)
+
+    with patch("app.registry.MODEL_VERSION", "v1"):
+        manager = ModelManager(registry_dir=tmp_path, watch_interval=0.01)
+        manager.load_initial()
+        manager.start_watcher()
+    assert manager._watcher is None
+    assert state.MODEL_VERSION == "v1"
+
+def test_manager_falls_back_to_legacy_artifact(tmp_path, active_model):
+    manager = ModelManager(registry_dir=tmp_path / "empty", fallback_path=str(ARTIFACT))
+    manager.load_initial()
+
+    assert state.MODEL is not None
+    assert state.MODEL_VERSION.startswith("legacy-")
+
+def test_manager_rejects_version_failing_golden_check(tmp_path, active_model):
+    publish_model(ARTIFACT, "v1", registry_dir=tmp_path)
+    publish_model(ARTIFACT, "v2", registry_dir=tmp_path)
+    golden_path = tmp_path / "v2" / GOLDEN_FILENAME
+    golden = json.loads(golden_path.read_text())
+    golden["probabilities"] = [1 - p for p in golden["probabilities"]]
+    golden_path.write_text(json.dumps(golden))
+
+    manager = ModelManager(registry_dir=tmp_path)
+    manager.load_version("v1")
+    active = state.MODEL
+
+    with pytest.raises(ValueError):
+        manager.load_version("v2")
+    # Modelo anterior continua no ar
+    assert state.MODEL is active
+    assert state.MODEL_VERSION == "v1"
+    assert manager.status()["last_error"].startswith("v2")
+
+def test_publish_copies_reference_profile_and_notifies_activation(tmp_path, active_model):
+    publish_model(ARTIFACT, "v1", registry_dir=tmp_path)
+    assert (tmp_path / "v1" / "risk_model.reference.npz").is_file()
+
+    activated = []
+    manager = ModelManager(registry_dir=tmp_path, on_activate=lambda path, version: activated.append((path, version)))
+    manager.load_version("v1")
+    assert activated == [(tmp_path / "v1" / "risk_model.joblib", "v1")]
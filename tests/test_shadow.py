@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from app.shadow import ShadowScorer, load_shadow_model
+
+ARTIFACT = Path(__file__).resolve().parent.parent / "app" / "models" / "risk_model.joblib"
+
+
+def make_entry(probability, prediction, threshold=0.5):
+    return {
+        "IAA": 5.0, "IEG": 6.0, "threshold": threshold, "timestamp": "2024-01-01T00:00:00",
+        "prediction": prediction, "probability": probability, "status": "x",
+        "latency_ms": 1.5, "model_version": "v1"
+    }
+
+def test_shadow_scores_off_request_path_and_logs_side_by_side():
+    model = MagicMock()
+    model.predict_proba.side_effect = lambda X: np.array([0.8, 0.2])[:len(X)]
+    written = []
+    scorer = ShadowScorer(model, "candidate", written.extend, batch_size=10)
+
+    # Enfileira antes de iniciar para garantir um único lote
+    scorer.submit([make_entry(0.7, 1), make_entry(0.6, 1)])
+    scorer.start()
+    scorer.stop()
+
+    assert len(written) == 2
+    first, second = written
+    assert first["primary_probability"] == 0.7 and first["shadow_probability"] == 0.8
+    assert first["agreement"] == 1 and second["agreement"] == 0
+    assert first["primary_version"] == "v1" and first["shadow_version"] == "candidate"
+    assert first["abs_diff"] == pytest.approx(0.1)
+    model.predict_proba.assert_called_once()
+
+def test_shadow_drops_when_queue_is_full():
+    scorer = ShadowScorer(MagicMock(), "candidate", MagicMock(), max_queue_size=1)
+    assert scorer.submit([make_entry(0.7, 1), make_entry(0.7, 1)]) == 1
+
+def test_shadow_model_error_does_not_stop_worker():
+    model = MagicMock()
+    model.predict_proba.side_effect = RuntimeError("falhou")
+    writer = MagicMock()
+    scorer = ShadowScorer(model, "candidate", writer)
+    scorer.submit([make_entry(0.7, 1)])
+    scorer.start()
+    scorer.stop()
+
+    writer.assert_not_called()
+
+def test_load_shadow_model_from_path():
+    model, version = load_shadow_model(str(ARTIFACT))
+    assert version.startswith("shadow-")
+    assert model.predict_proba(np.full((1, len(model.feature_cols)), np.nan)).shape[0] == 1
+
+def test_load_shadow_model_missing():
+    with pytest.raises(FileNotFoundError):
+        load_shadow_model("versao-inexistente")
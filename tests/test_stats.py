@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+
+from app.stats import QuantileSketch, RunningMoments, PerformanceStats
+
+
+def test_quantile_sketch_relative_error():
+    values = np.random.default_rng(0).lognormal(mean=1.0, sigma=1.0, size=20000)
+    sketch = QuantileSketch(alpha=0.01)
+    for v in values:
+        sketch.add(v)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_running_moments_match_pandas():
+    values = np.random.default_rng(1).normal(10, 3, 500)
+    moments = RunningMoments()
+    for v in values:
+        moments.add(v)
+
+    assert moments.mean == pytest.approx(pd.Series(values).mean())
+    assert moments.std == pytest.approx(pd.Series(values).std())
+    assert moments.min == values.min() and moments.max == values.max()
+
+def test_performance_stats_window_series():
+    now = datetime.now()
+    old = (now - timedelta(hours=3)).isoformat()
+    recent = now.isoformat()
+    stats = PerformanceStats(window_minutes=60)
+    stats.observe_many([
+        {"timestamp": old, "latency_ms": 10.0},
+        {"timestamp": recent, "latency_ms": 2.0},
+        {"timestamp": recent, "latency_ms": 4.0},
+        {"timestamp": recent},  # Log antigo sem latência
+    ])
+
+    snapshot = stats.snapshot()
+    assert snapshot["total_requests"] == 4
+    assert snapshot["latency_ms"]["count"] == 3
+    assert snapshot["latency_ms"]["mean"] == pytest.approx(16 / 3)
+    # Apenas o minuto atual está dentro da janela
+    assert snapshot["series"] == [
+        {"minute": recent[:16], "requests": 3, "cache_hits": 0, "avg_latency_ms": 3.0, "max_latency_ms": 4.0}
+    ]
+    assert snapshot["requests_last_window"] == 3
+
+def test_performance_stats_keeps_cache_hits_out_of_model_latency():
+    now = datetime.now().isoformat()
+    stats = PerformanceStats()
+    stats.observe_many(
+        [{"timestamp": now, "latency_ms": 50.0, "cache_hit": 0}] * 10
+        + [{"timestamp": now, "latency_ms": 0.1, "cache_hit": 1}] * 90
+        + [{"timestamp": now, "latency_ms": 50.0}]  # Log antigo sem o campo: chamada ao modelo
+    )
+
+    snapshot = stats.snapshot()
+    assert snapshot["total_requests"] == 101
+    assert snapshot["latency_ms"]["count"] == 11
+    assert snapshot["latency_ms"]["p50"] == pytest.approx(50.0, rel=0.01)
+    assert snapshot["cache_hits"] == 90
+    assert snapshot["cache_hit_latency_ms"]["p95"] == pytest.approx(0.1, rel=0.01)
+    assert snapshot["series"][0]["requests"] == 101
+    assert snapshot["series"][0]["cache_hits"] == 90
+    assert snapshot["series"][0]["avg_latency_ms"] == 50.0
+
+def test_performance_stats_seed_skips_records_after_start():
+    now = datetime.now()
+    stats = PerformanceStats()
+    records = [
+        {"timestamp": (now - timedelta(minutes=2)).isoformat(), "latency_ms": 1.0},
+        {"timestamp": (now - timedelta(minutes=5)).isoformat(), "latency_ms": 3.0},
+        {"timestamp": (now + timedelta(minutes=1)).isoformat(), "latency_ms": 100.0},
+    ]
+    stats.seed(records, until=now.isoformat())
+
+    snapshot = stats.snapshot()
+    assert snapshot["total_requests"] == 2
+    assert [point["minute"] for point in snapshot["series"]] == sorted(point["minute"] for point in snapshot["series"])
+    assert snapshot["seeding"] is False
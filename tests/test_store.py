@@ -0,0 +1,133 @@
+import pandas as pd
+import pytest
+from app.store import CSVPredictionStore, SQLitePredictionStore, migrate_csv_to_sqlite
+
+def make_entries(n, start=0):
+    return [
+        {
+            "IAA": float(i), "timestamp": f"2025-01-01T00:{i:02d}:00",
+            "prediction": i % 2, "probability": i / 100,
+            "status": "Alto Risco" if i % 2 else "Baixo Risco"
+        }
+        for i in range(start, start + n)
+    ]
+
+@pytest.fixture(params=["csv", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "csv":
+        return CSVPredictionStore(str(tmp_path / "logs.csv"))
+    return SQLitePredictionStore(str(tmp_path / "logs.db"))
+
+def test_store_query_newest_first_with_pagination(store):
+    store.write(make_entries(10))
+
+    page1 = store.query(limit=3)
+    page2 = store.query(limit=3, offset=3)
+    assert [r["IAA"] for r in page1] == [9.0, 8.0, 7.0]
+    assert [r["IAA"] for r in page2] == [6.0, 5.0, 4.0]
+    assert len(store.query(limit=0)) == 10
+
+def test_store_filters(store):
+    store.write(make_entries(10))
+
+    high = store.query(limit=0, status="Alto Risco")
+    assert {r["status"] for r in high} == {"Alto Risco"}
+    assert len(high) == 5
+
+    window = store.query(limit=0, start="2025-01-01T00:02:00", end="2025-01-01T00:04:00")
+    assert [r["IAA"] for r in window] == [4.0, 3.0, 2.0]
+
+def test_store_schema_evolution(store):
+    store.write(make_entries(2))
+    new_entry = make_entries(1, start=2)[0] | {"latency_ms": 1.5}
+    store.write([new_entry])
+
+    rows = store.query(limit=0)
+    assert rows[0]["latency_ms"] == 1.5
+    assert rows[1]["latency_ms"] is None
+
+def test_empty_store(tmp_path):
+    assert CSVPredictionStore(str(tmp_path / "missing.csv")).query() == []
+    assert SQLitePredictionStore(str(tmp_path / "empty.db")).query() == []
+
+def test_migrate_csv_to_sqlite(tmp_path):
+    csv_path = tmp_path / "logs.csv"
+    pd.DataFrame(make_entries(7)).to_csv(csv_path, index=False)
+
+    total = migrate_csv_to_sqlite(str(csv_path), str(tmp_path / "logs.db"), chunk_size=3)
+    assert total == 7
+
+    rows = SQLitePredictionStore(str(tmp_path / "logs.db")).query(limit=0)
+    assert len(rows) == 7
+    assert rows[0]["IAA"] == 6.0
+    assert rows[0]["prediction"] == 0
+
+def test_store_iter_records_with_cursor_and_since(store):
+    store.write(make_entries(10))
+
+    records = list(store.iter_records())
+    assert [r["IAA"] for _, r in records] == [float(i) for i in range(9, -1, -1)]
+
+    # Página seguinte a partir do cursor do 3º registro
+    cursor = records[2][0]
+    assert [r["IAA"] for _, r in store.iter_records(cursor=cursor)] == [float(i) for i in range(6, -1, -1)]
+
+    # Apenas registros mais novos que `since`
+    newer = list(store.iter_records(since="2025-01-01T00:07:00"))
+    assert [r["IAA"] for _, r in newer] == [9.0, 8.0]
+
+    assert store.parse_cursor(str(cursor)) == cursor
+    for invalid in ("abc", "-1", "1.5"):
+        with pytest.raises(ValueError):
+            store.parse_cursor(invalid)
+
+def test_sqlite_iter_records_since_stops_without_scanning(tmp_path):
+    """Com `since`, a leitura para no primeiro registro antigo, sem filtrar por timestamp no SQL"""
+    store = SQLitePredictionStore(str(tmp_path / "logs.db"))
+    store.write(make_entries(50))
+    statements = []
+    store._connect().set_trace_callback(statements.append)
+
+    newer = list(store.iter_records(since="2025-01-01T00:46:00", chunk_size=10))
+    assert [r["IAA"] for _, r in newer] == [49.0, 48.0, 47.0]
+    selects = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1
+    assert "timestamp" not in selects[0]
+
+    # Sem `since`, um bloco incompleto encerra a leitura sem uma consulta extra
+    statements.clear()
+    assert len(list(store.iter_records(chunk_size=20))) == 50
+    assert len([sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]) == 3
+
+def test_csv_iter_records_ignores_partial_last_line(tmp_path):
+    store = CSVPredictionStore(str(tmp_path / "logs.csv"))
+    store.write(make_entries(3))
+    with open(store.path, "a", encoding="utf-8") as f:
+        f.write("99.0,2025-01-01T01:00:00,1")  # Linha ainda sendo gravada
+
+    assert [r["IAA"] for _, r in store.iter_records()] == [2.0, 1.0, 0.0]
+
+def test_sharded_csv_store_merges_workers_on_read(tmp_path):
+    from unittest.mock import patch
+    from app.store import ShardedCSVPredictionStore
+
+    store = ShardedCSVPredictionStore(str(tmp_path / "logs.csv"))
+    entries = make_entries(10)
+    # Dois workers gravando registros intercalados no tempo
+    for pid, worker_entries in ((101, entries[0::2]), (202, entries[1::2])):
+        with patch("app.store.os.getpid", return_value=pid):
+            store.write(worker_entries)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["logs.101.csv", "logs.202.csv"]
+
+    assert [r["IAA"] for r in store.query(limit=3, offset=1)] == [8.0, 7.0, 6.0]
+    assert len(store.query(limit=0, status="Alto Risco")) == 5
+
+    records = list(store.iter_records())
+    assert [r["IAA"] for _, r in records] == [float(i) for i in range(9, -1, -1)]
+    cursor = records[2][0]
+    assert [r["IAA"] for _, r in store.iter_records(cursor=cursor)] == [float(i) for i in range(6, -1, -1)]
+    assert [r["IAA"] for _, r in store.iter_records(since="2025-01-01T00:07:00")] == [9.0, 8.0]
+
+    for invalid in ("abc", "logs.101.csv", "logs.101.csv:x", ":12", "logs.101.csv:-1"):
+        with pytest.raises(ValueError):
+            store.parse_cursor(invalid)
@@ -11,7 +11,9 @@ from src.config import FEATURE_COLS
 @patch('src.train_pipeline.evaluate_model')
 @patch('src.train_pipeline.print_reliability_report')
 @patch('pandas.DataFrame.to_csv') # Mock do salvamento de arquivo
+@patch('src.train_pipeline.ReferenceProfile.save')
 def test_train_pipeline_main_success(
+    mock_profile_save,
     mock_to_csv,
     mock_print_report,
     mock_evaluate,
@@ -49,6 +51,8 @@ def test_train_pipeline_main_success(
     mock_evaluate.assert_called_once()
     mock_print_report.assert_called_once()
     mock_model_instance.save.assert_called_once()
+    mock_profile_save.assert_called_once()
+    assert str(mock_profile_save.call_args[0][0]).endswith("risk_model.reference.npz")
 
 @patch('src.train_pipeline.DATA_PATH')
 def test_train_pipeline_main_no_data(mock_data_path, capsys):